@@ -1,26 +1,88 @@
-from flask import Flask, redirect, request, session, render_template
-import requests
+from flask import Flask, redirect, request, session, render_template, make_response
+from werkzeug.http import is_resource_modified
 import os
-import subprocess
+import csv
+import datetime
+import hashlib
+import io
 from dotenv import load_dotenv
-from models import SessionLocal, User, Giveaway, Item, Winner
+from models import SessionLocal, User, Giveaway, Item
+import db_scope
+import web_metrics
+import request_profiler
+import item_import
+import giveaway_cleanup
+import web_actions
+from db_scope import db_session, pool_metrics
+from dashboard_queries import DASHBOARD_PAGE_SIZE, dashboard_page, recent_winners
+from item_queries import ITEM_PAGE_SIZE, item_page
+from page_cache import page_cache, user_tag, winner_tag
+from status_feed import STATUS_KEEPALIVE, StatusHub, format_event
+from twitch_api import TwitchAPIError, TwitchClient
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import joinedload
-import psutil
+import supervisor_client
+from supervisor_client import SupervisorError
+from web_actions import ActionError, find_or_create_user
+from log_config import configure_logging
+from metrics import registry
 
 # Load environment variables
 load_dotenv()
+configure_logging()
 
 # Flask application setup
+# Signs the session cookie, so every web process must share it; without it each
+# process picks its own and logins only work on a single process
+SECRET_KEY = os.getenv("SECRET_KEY")
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+app.secret_key = SECRET_KEY or os.urandom(24)
+db_scope.init_app(app)
+web_metrics.init_app(app)
+request_profiler.init_app(app)
+cleanup_worker = giveaway_cleanup.CleanupWorker()
+status_hub = StatusHub()
+
+def start_cleanup_worker():
+    """Purge archived giveaways on a timer when deletes are deferred, not only after this process archives one."""
+    if giveaway_cleanup.DELETE_MODE == "archive":
+        cleanup_worker.start()
+
+start_cleanup_worker()
 
 # Twitch API credentials
 CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
 CLIENT_SECRET = os.getenv("TWITCH_CLIENT_SECRET")
 REDIRECT_URI = "http://localhost:5000/auth/twitch/callback"
+twitch = TwitchClient(CLIENT_ID, CLIENT_SECRET)
 
-chatbot_processes = {}
+PROMETHEUS_TEXT = "text/plain; version=0.0.4; charset=utf-8"
+
+def cached_page(key, tag, render):
+    """
+    Serve a page through the page cache with conditional request support.
+
+    The ETag and Last-Modified come from `tag`'s data version, which every
+    write to that user's data bumps. A browser that already has the current
+    version gets a 304 before any query runs or any template renders.
+    """
+    version = page_cache.version(tag)
+    if version is None:
+        return page_cache.get_or_set(key, tag, render)
+
+    token, modified = version
+    etag = hashlib.sha1(f"{key}:{token}".encode()).hexdigest()[:20]
+    last_modified = datetime.datetime.fromtimestamp(int(modified), tz=datetime.timezone.utc)
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response(page_cache.get_or_set(key, tag, render))
+    else:
+        response = app.response_class(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Always revalidate; the page is per user
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 @app.route("/")
 def home():
@@ -40,66 +102,17 @@ def auth_twitch_callback():
         return "Authorization failed: missing code", 400
 
     try:
-        # Exchange the authorization code for an access token
-        token_response = requests.post(
-            "https://id.twitch.tv/oauth2/token",
-            data={
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-                "code": code,
-                "grant_type": "authorization_code",
-                "redirect_uri": REDIRECT_URI,
-            },
-        )
-        token_response.raise_for_status()  # Raise an error for HTTP errors
-        token_data = token_response.json()
-
-        # Check for access_token in the response
-        if "access_token" not in token_data:
-            app.logger.error("Twitch API response missing access_token.")
-            return "Authorization failed: missing access token", 400
-
-    except requests.exceptions.RequestException as e:
-        app.logger.error(f"Twitch API error during token exchange: {e}")
+        # Exchange the authorization code for an access token, then look up whose it is
+        user_info = twitch.log_in(code, REDIRECT_URI)
+    except TwitchAPIError as e:
+        app.logger.error("Twitch API error during login: %s", e)
         return "Authorization failed due to Twitch API error", 400
 
     try:
-        # Use the access token to fetch user data
-        user_response = requests.get(
-            "https://api.twitch.tv/helix/users",
-            headers={"Authorization": f"Bearer {token_data['access_token']}"},
-        )
-        user_response.raise_for_status()
-        user_data = user_response.json()
-
-        # Ensure user data contains the required fields
-        if "data" not in user_data or not user_data["data"]:
-            app.logger.error("Twitch user data is missing or empty.")
-            return "Authorization failed: unable to fetch user data", 400
-
-        user_info = user_data["data"][0]  # Extract the first user in the data list
-
         # Log the user in or create a new user in the database
-        db_session = SessionLocal()
-        user = db_session.query(User).filter_by(twitch_id=user_info["id"]).first()
-        if not user:
-            # Create a new user
-            user = User(
-                twitch_id=user_info["id"],
-                username=user_info["display_name"],
-            )
-            db_session.add(user)
-            db_session.commit()
-
-        # Store the user ID in the session
-        session["user_id"] = user.id
-        db_session.close()
-
-    except requests.exceptions.RequestException as e:
-        app.logger.error(f"Twitch API error while fetching user data: {e}")
-        return "Authorization failed due to Twitch API error", 400
+        session.update(web_actions.log_in(db_session, user_info))
     except Exception as e:
-        app.logger.error(f"Unexpected error: {e}")
+        app.logger.exception("Unexpected error: %s", e)
         return "Authorization failed due to an unexpected error", 400
 
     return redirect("/dashboard")
@@ -110,12 +123,26 @@ def dashboard():
     if not user_id:
         return redirect("/auth/twitch")
     
-    db_session = SessionLocal()
-    giveaways = db_session.query(Giveaway).filter_by(creator_id=user_id).all()
-    winners = db_session.query(Winner).join(Giveaway).filter(Giveaway.creator_id == user_id).all()
-    db_session.close()
+    after = request.args.get("after", type=int)
 
-    return render_template("dashboard.html", giveaways=giveaways, winners=winners)
+    def render():
+        giveaways, next_cursor = dashboard_page(db_session, user_id, after=after)
+        winners = recent_winners(db_session, [giveaway.id for giveaway in giveaways])
+        return render_template("dashboard.html", giveaways=giveaways, winners=winners, next_cursor=next_cursor)
+
+    return cached_page(f"dashboard:{user_id}:{after}", user_tag(user_id), render)
+
+@app.route("/api/dashboard")
+def dashboard_api():
+    """A page of the logged-in creator's giveaways with item and winner counts, as JSON."""
+    user_id = session.get("user_id")
+    if not user_id:
+        return {"error": "Not logged in."}, 401
+
+    after = request.args.get("after", type=int)
+    limit = request.args.get("limit", DASHBOARD_PAGE_SIZE, type=int)
+    giveaways, next_cursor = dashboard_page(db_session, user_id, after=after, limit=limit)
+    return {"giveaways": [row._asdict() for row in giveaways], "next": next_cursor}
 
 @app.route("/giveaway/create", methods=["GET", "POST"])
 def create_giveaway():
@@ -148,10 +175,8 @@ def create_giveaway():
         if len(title) > 255:
             return {"error": "Title exceeds the maximum length of 255 characters."}, 400
 
-        db_session = SessionLocal()
         user = db_session.query(User).filter_by(id=user_id).first()
         if not user:
-            db_session.close()
             return "User not found.", 403
 
         # Create a new Giveaway object
@@ -163,7 +188,7 @@ def create_giveaway():
         )
         db_session.add(giveaway)
         db_session.commit()
-        db_session.close()
+        page_cache.invalidate(user_tag(user.id))
 
         return redirect("/dashboard")
 
@@ -172,85 +197,66 @@ def create_giveaway():
 @app.route("/giveaways")
 def list_giveaways():
     user_id = session.get("user_id")
-    db_session = SessionLocal()
-    giveaways = db_session.query(Giveaway).filter_by(creator_id=user_id).all()
-    db_session.close()
 
-    return "<br>".join([f"ID: {g.id}, Title: {g.title}" for g in giveaways])
+    def render():
+        giveaways = db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(creator_id=user_id).all()
+        return "<br>".join([f"ID: {g.id}, Title: {g.title}" for g in giveaways])
+
+    return cached_page(f"giveaways:{user_id}", user_tag(user_id), render)
 
 @app.route("/giveaway/delete/<int:id>", methods=["POST", "GET"])
 def delete_giveaway(id):
     """
     Deletes a giveaway while retaining won items in the database.
-    Retained won items will keep their `giveaway_id`.
+    Retained won items and their Winner rows are detached (`giveaway_id` set to NULL).
+    With DELETE_MODE=archive the giveaway is only hidden here and the
+    cleanup worker deletes it in the background.
     """
     user_id = session.get("user_id")
     if not user_id:
         return redirect("/auth/twitch")
 
-    db_session = SessionLocal()
-    giveaway = db_session.query(Giveaway).filter_by(id=id, creator_id=user_id).first()
+    giveaway_id = db_session.execute(
+        select(Giveaway.id).where(Giveaway.id == id, Giveaway.creator_id == user_id, Giveaway.visible())
+    ).scalar()
 
-    if not giveaway:
-        db_session.close()
+    if not giveaway_id:
         return "Giveaway not found or you do not have permission to delete it.", 403
 
-    # Process non-won items: Delete them
-    non_won_items = db_session.query(Item).filter_by(giveaway_id=id, is_won=False).all()
-    for item in non_won_items:
-        db_session.delete(item)
-
-    # Log won items (but do not delete them or modify `giveaway_id`)
-    won_items = db_session.query(Item).filter_by(giveaway_id=id, is_won=True).all()
-    for won_item in won_items:
-        print(f"Retained won item: {won_item.name} (ID: {won_item.id})")
-
-    # Finally, delete the giveaway
-    db_session.delete(giveaway)
-
     try:
-        db_session.commit()
+        if giveaway_cleanup.DELETE_MODE == "archive":
+            giveaway_cleanup.archive_giveaway(db_session, id)
+            db_session.commit()
+            cleanup_worker.wake()
+            app.logger.info("Archived giveaway %s for background deletion", id)
+        else:
+            deleted, retained = giveaway_cleanup.delete_giveaway(db_session, id)
+            db_session.commit()
+            app.logger.info("Deleted giveaway %s: removed %d items, retained %d won items", id, deleted, retained)
+        page_cache.invalidate(user_tag(user_id))
     except IntegrityError as e:
         db_session.rollback()
-        print(f"Error during giveaway deletion: {str(e)}")
+        app.logger.error("Error during giveaway deletion: %s", e)
         return "Failed to delete giveaway due to database constraints.", 500
-    finally:
-        db_session.close()
 
     return redirect("/dashboard")
 
-@app.route("/giveaway/start/<int:giveaway_id>")
+@app.route("/giveaway/start/<int:giveaway_id>", methods=["POST"])
 def start_giveaway(giveaway_id):
-    """Start the giveaway and launch the chatbot."""
-    lock_file = "chatbot.lock"
-
-    # Check if the chatbot is already running
-    if os.path.exists(lock_file):
-        with open(lock_file, "r") as f:
-            pid = int(f.read().strip())
-        if psutil.pid_exists(pid):
-            return "A chatbot is already running. Please wait for it to finish.", 400
-        else:
-            print(f"Stale lock file found with PID: {pid}. Removing it.")
-            os.remove(lock_file)  # Clean up stale lock file
-
-
-    db_session = SessionLocal()
-    giveaway = db_session.query(Giveaway).filter_by(id=giveaway_id).first()
-    db_session.close()
-
-    if not giveaway:
-        return "Giveaway not found.", 404
+    """Start the giveaway on the chatbot supervisor."""
+    user_id = session.get("user_id")
+    if not user_id:
+        return redirect("/auth/twitch")
 
-    # Start chatbot with the giveaway ID
     try:
-        process = subprocess.Popen(["python", "chatbot.py", str(giveaway_id)])
-        chatbot_processes[giveaway_id] = process  # Track the process
-        with open(lock_file, "w") as f:
-            f.write(str(process.pid))
-        return redirect("/dashboard")
-    except Exception as e:
+        channel = web_actions.start_channel(db_session, giveaway_id, user_id)
+        web_actions.record_start(db_session, giveaway_id, supervisor_client.start_giveaway(giveaway_id, channel))
+    except ActionError as e:
+        return e.message, e.status
+    except SupervisorError as e:
+        app.logger.error("Could not start chatbot for giveaway %s: %s", giveaway_id, e)
         return f"Failed to start chatbot: {str(e)}", 500
+    return redirect("/dashboard")
 
 @app.route("/giveaway/edit/<int:id>", methods=["GET", "POST"])
 def edit_giveaway(id):
@@ -258,14 +264,11 @@ def edit_giveaway(id):
     if not user_id:
         return redirect("/auth/twitch")
 
-    db_session = SessionLocal()
-    giveaway = db_session.query(Giveaway).options(joinedload(Giveaway.items)).filter_by(id=id).first()
+    giveaway = db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(id=id).first()
     if not giveaway:
-        db_session.close()
         return "Giveaway not found.", 404
 
     if giveaway.creator_id != user_id:
-        db_session.close()
         return "Unauthorized to edit this giveaway.", 403
 
     if request.method == "POST":
@@ -273,41 +276,101 @@ def edit_giveaway(id):
         frequency = request.form.get("frequency", "").strip()
         threshold = request.form.get("threshold", "").strip()
         if not title or not frequency.isdigit() or not threshold.isdigit():
-            db_session.close()
             return "Invalid input. Ensure all fields are filled correctly.", 400
         giveaway.title = title
         giveaway.frequency = int(frequency)
         giveaway.threshold = int(threshold)
         db_session.commit()
-        db_session.close()
+        page_cache.invalidate(user_tag(user_id))
         return redirect("/dashboard")
 
-    db_session.close()
     return render_template("edit_giveaway.html", giveaway=giveaway)
 
+@app.route("/api/giveaway/<int:giveaway_id>/items")
+def giveaway_items_api(giveaway_id):
+    """
+    A page of a giveaway's items as JSON, for the edit page.
+    Query parameters: after (cursor from the previous page), limit,
+    q (name prefix), won (true/false) and codes=1 to include item codes.
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return {"error": "Not logged in."}, 401
+
+    giveaway = db_session.query(Giveaway.id).filter(Giveaway.visible()).filter_by(id=giveaway_id, creator_id=user_id).first()
+    if not giveaway:
+        return {"error": "Giveaway not found or you do not have permission to view it."}, 404
+
+    won = request.args.get("won")
+    include_codes = request.args.get("codes") == "1"
+    try:
+        items, next_cursor = item_page(
+            db_session,
+            giveaway_id,
+            after=request.args.get("after") or None,
+            limit=request.args.get("limit", ITEM_PAGE_SIZE, type=int),
+            search=request.args.get("q", "").strip() or None,
+            won={"true": True, "false": False}.get(won),
+            include_codes=include_codes,
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    return {"items": [row._asdict() for row in items], "next": next_cursor}
+
 @app.route("/giveaway/view/<int:giveaway_id>", methods=["GET"])
 def view_giveaway(giveaway_id):
     """
-    View a giveaway and handle active or expired states.
+    View a giveaway and handle active or expired states. A giveaway is
+    active while its chatbot runs, and the page follows its live status.
     """
     user_id = session.get("user_id")
     if not user_id:
         return redirect("/auth/twitch")
 
-    db_session = SessionLocal()
-    giveaway = db_session.query(Giveaway).filter_by(id=giveaway_id).first()
+    giveaway = db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(id=giveaway_id).first()
 
     if not giveaway:
-        db_session.close()
         return "Giveaway not found.", 404
 
     if not giveaway.active:
-        db_session.close()
         return "This giveaway is no longer active.", 400
 
-    db_session.close()
     return render_template("view_giveaway.html", giveaway=giveaway)
 
+@app.route("/giveaway/<int:giveaway_id>/events")
+def giveaway_events(giveaway_id):
+    """
+    Live status for view_giveaway.html as Server-Sent Events.
+
+    The status comes from the chatbot's memory through status_hub, which
+    shares one supervisor subscription between every viewer of a giveaway
+    in this process, so streaming it never touches the database. Anyone
+    logged in may watch a visible, running giveaway; that is checked when
+    the first viewer opens its feed, not on every connection.
+    """
+    if not session.get("user_id"):
+        return "Unauthorized", 401
+    if not status_hub.watching(giveaway_id) and not web_actions.live_giveaway(db_session, giveaway_id):
+        return "Giveaway not found.", 404
+
+    listener = status_hub.listen(giveaway_id)
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                message = listener.get(STATUS_KEEPALIVE)
+                # A comment line keeps proxies from closing a quiet stream
+                yield format_event(message) if message else ": keepalive\n\n"
+        finally:
+            status_hub.unlisten(listener)
+
+    response = app.response_class(stream(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Tell nginx not to buffer the stream
+    return response
+
 @app.route("/giveaway/add-item/<int:giveaway_id>", methods=["POST"])
 def add_item(giveaway_id):
     user_id = session.get("user_id")
@@ -323,19 +386,58 @@ def add_item(giveaway_id):
     if not code:
         return "Item code is required.", 400
 
-    db_session = SessionLocal()
-    giveaway = db_session.query(Giveaway).filter_by(id=giveaway_id).first()
+    giveaway = db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(id=giveaway_id).first()
     if not giveaway:
-        db_session.close()
         return "Giveaway not found.", 404
 
     item = Item(name=name, code=code, giveaway_id=giveaway_id)
     db_session.add(item)
     db_session.commit()
-    db_session.close()
+    page_cache.invalidate(user_tag(giveaway.creator_id))
 
     return redirect(f"/giveaway/edit/{giveaway_id}")
 
+@app.route("/giveaway/import-items/<int:giveaway_id>", methods=["POST"])
+def import_giveaway_items(giveaway_id):
+    """
+    Add many items at once from an uploaded file (`file`, CSV or JSON lines)
+    or pasted text (`items`, one "name, code" per line). Returns the number
+    imported and the rows that were rejected.
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return redirect("/auth/twitch")
+
+    giveaway = db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(id=giveaway_id, creator_id=user_id).first()
+    if not giveaway:
+        return {"error": "Giveaway not found or you do not have permission to edit it."}, 404
+
+    upload = request.files.get("file")
+    if upload and upload.filename:
+        lines = item_import.text_stream(upload)
+        fmt = request.form.get("format") or item_import.detect_format(upload.filename)
+    elif request.form.get("items", "").strip():
+        lines = io.StringIO(request.form["items"], newline="")
+        fmt = request.form.get("format") or "text"
+    else:
+        return {"error": "Upload a file or paste items to import."}, 400
+
+    if fmt not in item_import.FORMATS:
+        return {"error": f"Unknown format: {fmt}"}, 400
+
+    try:
+        result = item_import.import_items(db_session, giveaway_id, lines, fmt)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return {"error": f"Could not read the upload: {e}"}, 400
+
+    if result.imported:
+        page_cache.invalidate(user_tag(user_id))
+    app.logger.info(
+        "Imported %d items into giveaway %s (%d rows rejected)", result.imported, giveaway_id, result.error_count
+    )
+    status = 400 if result.error_count and not result.imported else 200
+    return result.to_dict(), status
+
 # Update: Enhancing the remove-item route to support AJAX requests.
 @app.route("/giveaway/remove-item/<int:item_id>", methods=["POST"])
 def remove_item(item_id):
@@ -343,7 +445,6 @@ def remove_item(item_id):
     if not user_id:
         return redirect("/auth/twitch")
 
-    db_session = SessionLocal()
     try:
         # Query for the item and ensure it belongs to a giveaway created by the logged-in user
         item = db_session.query(Item).join(Giveaway, Giveaway.id == Item.giveaway_id).filter(
@@ -351,45 +452,48 @@ def remove_item(item_id):
             Giveaway.creator_id == user_id
         ).first()
 
-        print(f"Queried item: {item}")
+        app.logger.debug("Queried item: %s", item)
 
 
         if not item:
             return "Item not found or permission denied.", 403
 
-        # Capture giveaway ID before deletion
+        # Capture giveaway ID and winner before deletion
         giveaway_id = item.giveaway_id
+        tags = [user_tag(user_id)]
+        if item.is_won and item.winner_username:
+            tags.append(winner_tag(item.winner_username))
         db_session.delete(item)
         db_session.commit()
+        page_cache.invalidate(*tags)
 
         return redirect(f"/giveaway/edit/{giveaway_id}")
     except Exception as e:
-        print(f"Error removing item: {e}")
+        app.logger.exception("Error removing item: %s", e)
         return "An error occurred while trying to remove the item.", 500
-    finally:
-        db_session.close()
 
 
-@app.route("/giveaway/stop/<int:giveaway_id>")
+@app.route("/giveaway/stop/<int:giveaway_id>", methods=["POST"])
 def stop_giveaway(giveaway_id):
-    """Stop the giveaway and terminate the chatbot."""
-    lock_file = "chatbot.lock"
-
-    # Check for a running chatbot process
-    if giveaway_id in chatbot_processes:
-        process = chatbot_processes.pop(giveaway_id)
-        process.terminate()
-        process.wait()  # Wait for the process to terminate
-        print(f"Terminated chatbot process for giveaway {giveaway_id}")
-
-    # Remove lock file if it exists
-    if os.path.exists(lock_file):
-        os.remove(lock_file)
-        print("Lock file removed successfully.")
-    else:
-        print("No lock file found.")
+    """Stop the giveaway and its chatbot on the supervisor."""
+    user_id = session.get("user_id")
+    if not user_id:
+        return redirect("/auth/twitch")
 
-    return "No running chatbot found for this giveaway.", 404
+    try:
+        web_actions.owned_giveaway(db_session, giveaway_id, user_id)
+        try:
+            result = supervisor_client.stop_giveaway(giveaway_id)
+        except SupervisorError as e:
+            # Nothing can be running if the supervisor itself is down
+            app.logger.warning("Could not reach chatbot supervisor to stop giveaway %s: %s", giveaway_id, e)
+            result = {"ok": False}
+        web_actions.record_stop(db_session, giveaway_id, result)
+    except ActionError as e:
+        return e.message, e.status
+
+    app.logger.info("Stopped chatbot for giveaway %s", giveaway_id)
+    return redirect("/dashboard")
 
 
 @app.route("/winnings")
@@ -398,15 +502,55 @@ def winnings():
     if not user_username:
         return redirect("/auth/twitch")
 
-    db_session = SessionLocal()
-    winnings = (
-        db_session.query(Item)
-        .filter(Item.is_won == True, Item.winner_username == user_username)
-        .all()
-    )
-    db_session.close()
+    def render():
+        winnings = (
+            db_session.query(Item)
+            .filter(Item.is_won == True, Item.winner_username == user_username)
+            .all()
+        )
+        return render_template("winnings.html", winnings=winnings)
+
+    return cached_page(f"winnings:{user_username}", winner_tag(user_username), render)
 
-    return render_template("winnings.html", winnings=winnings)
+
+@app.route("/health/cache")
+def cache_health():
+    """Page cache hit and miss counters."""
+    return page_cache.snapshot()
+
+
+@app.route("/health/status")
+def status_health():
+    """Live status feeds, viewers and backlogs replaced by snapshots in this process."""
+    return status_hub.snapshot()
+
+
+@app.route("/health/twitch")
+def twitch_health():
+    """Twitch user cache counters and whether an app token is cached."""
+    return twitch.snapshot()
+
+
+@app.route("/health/db")
+def database_health():
+    """Connection pool checkout and wait counters."""
+    return pool_metrics.snapshot()
+
+
+@app.route("/metrics")
+def metrics():
+    """Request, database and pool metrics of this process in the Prometheus text format."""
+    return app.response_class(registry.render(), mimetype=PROMETHEUS_TEXT)
+
+
+@app.route("/metrics/chatbot")
+def chatbot_metrics():
+    """The chatbot supervisor's metrics, passed through for scrapers that cannot reach its socket."""
+    try:
+        response = supervisor_client.metrics()
+    except SupervisorError as e:
+        return app.response_class(f"# {e}\n", status=503, mimetype=PROMETHEUS_TEXT)
+    return app.response_class(response["metrics"], mimetype=PROMETHEUS_TEXT)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
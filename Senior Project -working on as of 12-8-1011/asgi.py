@@ -0,0 +1,254 @@
+"""
+ASGI mode: the web app under an async server, e.g.
+    SECRET_KEY=<random string> uvicorn asgi:app --workers 4
+
+Every worker must sign session cookies with the same SECRET_KEY, or a login
+made on one worker is rejected by the others; with several workers and no
+SECRET_KEY the app refuses to start.
+
+Routes that spend their time waiting on another service are served here as
+coroutines, so a request waiting on Twitch or the chatbot supervisor holds
+no thread. Their checks and writes are the Flask views' own, from
+web_actions.py:
+    /auth/twitch/callback       Twitch OAuth and /users, via AsyncTwitchClient
+    /giveaway/start/<id>        (POST) chatbot supervisor, via send_command_async
+    /giveaway/stop/<id>         (POST)
+    /giveaway/<id>/events       live status stream, via StatusHub.listen_async
+Their database work is awaited on a thread pool sized to the connection
+pool (ChatbotDB). They are picked out by Flask endpoint from the app's own
+URL map, and read and write the session through its session interface.
+Every other request goes to the unchanged Flask app through asgiref's
+WsgiToAsgi, each on a thread of its own, at most ASGI_WSGI_THREADS at once.
+
+`python app.py` (WSGI) remains the default. benchmarks/asgi_vs_wsgi.py
+compares the two under a slow Twitch.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import HTTPException
+
+import app as web
+import supervisor_client
+import web_actions
+from chatbot_db import ChatbotDB
+from models import DB_POOL_SIZE
+from status_feed import STATUS_KEEPALIVE, format_event
+from supervisor_client import SupervisorError
+from twitch_api import AsyncTwitchClient, TwitchAPIError
+from web_actions import ActionError
+
+log = logging.getLogger("asgi")
+
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))  # Threads for routes served by Flask
+ASGI_DB_THREADS = int(os.getenv("ASGI_DB_THREADS", str(DB_POOL_SIZE)))  # Threads for the async routes' queries
+NATIVE_ROUTES = ("auth_twitch_callback", "start_giveaway", "stop_giveaway", "giveaway_events")  # Flask endpoints served as coroutines
+
+
+async def send_response(send, response):
+    """Send a complete Flask response from an async route."""
+    body = response.get_data()
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response.headers.items()],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def multiple_workers():
+    """Whether this process is one of several serving the app, e.g. under uvicorn --workers."""
+    return multiprocessing.parent_process() is not None or int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+
+
+class AsgiApp:
+    def __init__(self, flask_app=web.app, twitch=None, db=None, wsgi_threads=ASGI_WSGI_THREADS, status_hub=None):
+        self.flask_app = flask_app
+        self.status_hub = status_hub or web.status_hub
+        self.twitch = twitch or AsyncTwitchClient(web.CLIENT_ID, web.CLIENT_SECRET)
+        self.db = db or ChatbotDB(max_workers=ASGI_DB_THREADS, thread_name_prefix="asgi-db")
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.wsgi_slots = asyncio.Semaphore(wsgi_threads)
+        # Routes are looked up in Flask's own URL map, so paths and methods are declared once, in app.py
+        self.urls = flask_app.url_map.bind("localhost")
+        self.routes = {endpoint: getattr(self, endpoint) for endpoint in NATIVE_ROUTES}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return  # No websocket routes
+        try:
+            endpoint, values = self.urls.match(scope["path"], scope["method"])
+        except HTTPException:
+            endpoint = None  # Flask answers with its own 404, 405 or redirect
+        if endpoint in self.routes:
+            response = await self.routes[endpoint](scope, receive, send, **values)
+            if response is not None:
+                await send_response(send, response)
+            return
+        # Every Flask request runs on a thread of its own, at most wsgi_threads at once
+        async with self.wsgi_slots, ThreadSensitiveContext():
+            await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if not web.SECRET_KEY and multiple_workers():
+                    log.error("SECRET_KEY is not set; each worker would sign sessions with its own key")
+                    await send({"type": "lifespan.startup.failed", "message": "SECRET_KEY must be set to run several workers"})
+                    return
+                web.start_cleanup_worker()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                web.cleanup_worker.stop()
+                await self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def close(self):
+        await self.twitch.close()
+
+    def request(self, scope):
+        """A Flask request with the ASGI request's path, query string and headers, but no body."""
+        return self.flask_app.request_class.from_values(
+            scope["path"],
+            method=scope["method"],
+            query_string=scope.get("query_string", b"").decode("latin-1"),
+            headers=[(name.decode("latin-1"), value.decode("latin-1")) for name, value in scope.get("headers", [])],
+        )
+
+    def open_session(self, request):
+        """The request's session, opened by the Flask app's own session interface."""
+        return self.flask_app.session_interface.open_session(self.flask_app, request)
+
+    def respond(self, body, status):
+        """A plain response, as a Flask view returning (body, status) would give."""
+        return self.flask_app.response_class(body, status)
+
+    def redirect(self, location, session=None):
+        """A redirect to `location`, saving `session` into the cookie if given."""
+        response = self.flask_app.redirect(location)
+        if session is not None:
+            self.flask_app.session_interface.save_session(self.flask_app, session, response)
+        return response
+
+    async def auth_twitch_callback(self, scope, receive, send):
+        """Handle Twitch OAuth callback."""
+        request = self.request(scope)
+        code = request.args.get("code")
+        if not code:
+            return self.respond("Authorization failed: missing code", 400)
+
+        try:
+            user_info = await self.twitch.log_in(code, web.REDIRECT_URI)
+        except TwitchAPIError as e:
+            log.error("Twitch API error during login: %s", e)
+            return self.respond("Authorization failed due to Twitch API error", 400)
+
+        try:
+            login = await self.db.run(web_actions.log_in, user_info)
+        except Exception as e:
+            log.exception("Unexpected error: %s", e)
+            return self.respond("Authorization failed due to an unexpected error", 400)
+
+        session = self.open_session(request)
+        session.update(login)
+        return self.redirect("/dashboard", session)
+
+    async def start_giveaway(self, scope, receive, send, giveaway_id):
+        """Start the giveaway on the chatbot supervisor."""
+        user_id = self.open_session(self.request(scope)).get("user_id")
+        if not user_id:
+            return self.redirect("/auth/twitch")
+
+        try:
+            channel = await self.db.run(web_actions.start_channel, giveaway_id, user_id)
+            reply = await supervisor_client.send_command_async("start", giveaway_id=giveaway_id, channel=channel)
+            await self.db.run(web_actions.record_start, giveaway_id, reply)
+        except ActionError as e:
+            return self.respond(e.message, e.status)
+        except SupervisorError as e:
+            log.error("Could not start chatbot for giveaway %s: %s", giveaway_id, e)
+            return self.respond(f"Failed to start chatbot: {str(e)}", 500)
+        return self.redirect("/dashboard")
+
+    async def stop_giveaway(self, scope, receive, send, giveaway_id):
+        """Stop the giveaway and its chatbot on the supervisor."""
+        user_id = self.open_session(self.request(scope)).get("user_id")
+        if not user_id:
+            return self.redirect("/auth/twitch")
+
+        try:
+            await self.db.run(web_actions.owned_giveaway, giveaway_id, user_id)
+            try:
+                result = await supervisor_client.send_command_async("stop", giveaway_id=giveaway_id)
+            except SupervisorError as e:
+                # Nothing can be running if the supervisor itself is down
+                log.warning("Could not reach chatbot supervisor to stop giveaway %s: %s", giveaway_id, e)
+                result = {"ok": False}
+            await self.db.run(web_actions.record_stop, giveaway_id, result)
+        except ActionError as e:
+            return self.respond(e.message, e.status)
+
+        log.info("Stopped chatbot for giveaway %s", giveaway_id)
+        return self.redirect("/dashboard")
+
+    async def giveaway_events(self, scope, receive, send, giveaway_id):
+        """
+        Live status for view_giveaway.html as Server-Sent Events, like the
+        Flask view, but waiting in the event loop: an open stream holds no
+        Flask thread, however long the viewer keeps the page open. Returns
+        None once it has streamed the response itself.
+        """
+        if not self.open_session(self.request(scope)).get("user_id"):
+            return self.respond("Unauthorized", 401)
+        if not self.status_hub.watching(giveaway_id) and not await self.db.run(web_actions.live_giveaway, giveaway_id):
+            return self.respond("Giveaway not found.", 404)
+
+        listener = self.status_hub.listen_async(giveaway_id)
+        disconnected = asyncio.create_task(self._wait_disconnect(receive))
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),  # Tell nginx not to buffer the stream
+                ],
+            })
+            await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+            while True:
+                get = asyncio.ensure_future(listener.get(STATUS_KEEPALIVE))
+                await asyncio.wait({get, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    get.cancel()
+                    return
+                message = get.result()
+                # A comment line keeps proxies from closing a quiet stream
+                chunk = format_event(message) if message else ": keepalive\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+        except OSError as e:
+            log.debug("Client went away mid-stream: %s", e)
+        finally:
+            disconnected.cancel()
+            self.status_hub.unlisten(listener)
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+
+app = AsgiApp()
+
+if __name__ == "__main__":
+    import uvicorn  # Only needed for the ASGI mode: pip install uvicorn
+
+    uvicorn.run("asgi:app", host="127.0.0.1", port=5000)
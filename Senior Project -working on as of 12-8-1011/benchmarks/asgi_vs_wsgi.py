@@ -0,0 +1,120 @@
+"""
+Benchmark: Twitch logins under a slow Twitch, WSGI mode against ASGI mode.
+
+A burst of users hits /auth/twitch/callback at once while the local fake
+Twitch answers every call after a fixed delay. In WSGI mode each login holds
+one of a fixed number of worker threads (like gunicorn's sync workers) for
+both Twitch calls; in ASGI mode (asgi.py) the waits overlap on one event
+loop. Both apps are driven in-process, so the numbers compare the two
+concurrency models rather than any particular server. Every login is a
+first login and inserts a user.
+
+Run from the project directory:
+    python -m benchmarks.asgi_vs_wsgi [logins] [twitch delay ms] [wsgi threads]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The apps bind their database at import time
+handle, DB_PATH = tempfile.mkstemp(suffix=".db")
+os.close(handle)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import app as web  # noqa: E402
+import asgi  # noqa: E402
+import migrations  # noqa: E402
+import models  # noqa: E402
+from tests.fake_twitch import FakeTwitch  # noqa: E402
+from twitch_api import AsyncTwitchClient, TwitchClient  # noqa: E402
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def report(label, started, finished, statuses):
+    elapsed = max(finished) - started
+    latencies = [end - started for end in finished]
+    failed = sum(1 for status in statuses if status != 302)
+    print(
+        f"  {label:6} {len(finished) / elapsed:8.1f} logins/s   p50 {percentile(latencies, 0.5) * 1000:7.0f} ms"
+        f"   p99 {percentile(latencies, 0.99) * 1000:7.0f} ms   failed {failed}"
+    )
+
+
+def client_options(twitch):
+    return {"auth_url": f"{twitch.url}/oauth2", "api_url": f"{twitch.url}/helix", "retries": 0}
+
+
+def run_wsgi(twitch, codes, threads):
+    web.twitch = TwitchClient("client-id", "secret", **client_options(twitch))
+    web.app.config["TESTING"] = False
+
+    def login(code):
+        response = web.app.test_client().get(f"/auth/twitch/callback?code={code}")
+        return response.status_code, time.perf_counter()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(login, codes))
+    web.twitch.close()
+    report("WSGI", started, [end for _, end in results], [status for status, _ in results])
+
+
+async def asgi_login(app, code):
+    scope = {
+        "type": "http", "method": "GET", "path": "/auth/twitch/callback",
+        "query_string": f"code={code}".encode(), "headers": [], "http_version": "1.1", "scheme": "http",
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], time.perf_counter()
+
+
+def run_asgi(twitch, codes):
+    async def main():
+        app = asgi.AsgiApp(twitch=AsyncTwitchClient("client-id", "secret", **client_options(twitch)))
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*[asgi_login(app, code) for code in codes])
+        finally:
+            await app.close()
+        report("ASGI", started, [end for _, end in results], [status for status, _ in results])
+
+    asyncio.run(main())
+
+
+def main(logins=200, delay_ms=200, threads=8):
+    migrations.upgrade(models.engine)
+    try:
+        with FakeTwitch() as twitch:
+            twitch.delay = delay_ms / 1000
+            print(f"{logins} simultaneous logins, Twitch answering in {delay_ms} ms, {threads} WSGI threads")
+            for mode in ("wsgi", "asgi"):
+                codes = [f"{mode}-{i}" for i in range(logins)]
+                for code in codes:
+                    twitch.add_user(code, code, token=code)
+                if mode == "wsgi":
+                    run_wsgi(twitch, codes, threads)
+                else:
+                    run_asgi(twitch, codes)
+    finally:
+        models.engine.dispose()
+        os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    main(*args)
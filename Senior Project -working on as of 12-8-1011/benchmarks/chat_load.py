@@ -0,0 +1,178 @@
+"""
+Benchmark: the chatbot under a flood of Twitch chat.
+
+The bot connects over a real websocket to a local fake of Twitch chat
+(tests/fake_tmi.py) and runs a real giveaway from a temporary database,
+drawing a winner every few seconds. The fake then plays synthetic chat at
+a fixed rate: !enter from a pool of unique viewers mixed with normal chat,
+or a replayed chat log. Reports how many !enter commands the bot got
+through per second, command latency from the line's tmi-sent-ts to the end
+of its handling, lines never handled, and memory growth over the run.
+The fake runs on its own thread in this process, so its CPU time competes
+with the bot's and its memory is in the figures.
+
+Run from the project directory:
+    python -m benchmarks.chat_load [enters/min] [chat/min] [users] [seconds]
+    python -m benchmarks.chat_load --replay=chat.log [lines/min]
+
+A replay file has one "user: message" line per chat message; lines from
+the chatbot.messages log (LOG_SAMPLE_MESSAGES=1) work as they are.
+"""
+import asyncio
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+# The bot binds its database and win journal at import time
+WORK_DIR = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'chat_load.db')}"
+os.environ["WIN_JOURNAL_PATH"] = os.path.join(WORK_DIR, "wins.journal")
+
+import chatbot  # noqa: E402
+import migrations  # noqa: E402
+import models  # noqa: E402
+from log_config import configure_logging, stop_logging  # noqa: E402
+from models import Giveaway, Item, User  # noqa: E402
+from tests.fake_tmi import FakeTMI, replay, synthesize  # noqa: E402
+
+CHANNEL = "chat_load"
+CHAT_LOAD_DRAW_EVERY = int(os.getenv("CHAT_LOAD_DRAW_EVERY", "5"))  # Seconds between draws
+CHAT_LOAD_DRAIN = float(os.getenv("CHAT_LOAD_DRAIN", "5"))  # Seconds without progress before counting drops
+
+
+def rss_mb():
+    """Resident memory of this process, or the peak if /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0
+
+
+class MeasuredBot(chatbot.Bot):
+    """The real bot, counting every chat line it finishes handling."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.handled = 0
+        self.entered = 0  # !enter commands handled, new or duplicate
+        self.latencies = []  # Command latency in ms
+
+    async def event_message(self, message):
+        await super().event_message(message)
+        if message.echo:
+            return
+        self.handled += 1
+        if message.content.startswith(chatbot.BOT_PREFIX):
+            self.latencies.append(time.time() * 1000 - int(message.tags["tmi-sent-ts"]))
+            if message.content == "!enter":
+                self.entered += 1
+
+
+def seed_giveaway(items=10_000):
+    with models.engine.begin() as conn:
+        creator_id = conn.execute(
+            User.__table__.insert(), {"twitch_id": "chat-load", "username": CHANNEL}
+        ).inserted_primary_key[0]
+        giveaway_id = conn.execute(Giveaway.__table__.insert(), {
+            "title": "Chat Load Giveaway", "frequency": CHAT_LOAD_DRAW_EVERY, "threshold": 0,
+            "creator_id": creator_id, "active": True,
+        }).inserted_primary_key[0]
+        conn.execute(Item.__table__.insert(), [
+            {"name": f"Load Item {n}", "code": f"CHAT-{n}", "giveaway_id": giveaway_id} for n in range(items)
+        ])
+    return giveaway_id
+
+
+async def run(tmi, events, giveaway_id):
+    bot = MeasuredBot(giveaway_id=giveaway_id, channel=CHANNEL, exit_on_shutdown=False, irc_url=tmi.url)
+    await bot.connect()
+    while not bot.sessions.get(CHANNEL):
+        await asyncio.sleep(0.05)
+    session = bot.sessions.get(CHANNEL)
+
+    memory = [rss_mb()]
+    started = time.perf_counter()
+    playing = asyncio.wrap_future(tmi.play(CHANNEL, events))
+    while not playing.done():
+        await asyncio.sleep(0.5)
+        memory.append(rss_mb())
+    sent = playing.result()
+
+    # Let the bot catch up; whatever it still has not handled once it stops making progress was dropped
+    progress, last = time.perf_counter(), bot.handled
+    while bot.handled < sent and time.perf_counter() - progress < CHAT_LOAD_DRAIN:
+        await asyncio.sleep(0.1)
+        if bot.handled != last:
+            progress, last = time.perf_counter(), bot.handled
+    elapsed = time.perf_counter() - started
+    memory.append(rss_mb())
+
+    stats = {
+        "sent": sent, "handled": bot.handled, "entered": bot.entered, "elapsed": elapsed,
+        "entrants": len(session.entries), "draws": bot.journal.flushed + bot.journal.pending,
+        "latencies": bot.latencies, "memory": memory,
+    }
+    await bot.stop()
+    return stats
+
+
+def report(stats):
+    latencies = stats["latencies"]
+    memory = stats["memory"]
+    print(f"  sent       {stats['sent']:>10,} lines in {stats['elapsed']:.1f}s")
+    print(f"  handled    {stats['handled']:>10,}   dropped {stats['sent'] - stats['handled']:,}")
+    print(
+        f"  !enter     {stats['entered'] / stats['elapsed']:>10,.0f}/s   {stats['entrants']:,} in the giveaway,"
+        f" {stats['draws']} drawn"
+    )
+    print(
+        f"  latency    p50 {percentile(latencies, 0.5):.0f} ms   p95 {percentile(latencies, 0.95):.0f} ms"
+        f"   p99 {percentile(latencies, 0.99):.0f} ms   max {max(latencies, default=0):.0f} ms"
+    )
+    print(
+        f"  memory     {memory[0]:.1f} MB -> {memory[-1]:.1f} MB (peak {max(memory):.1f} MB,"
+        f" +{memory[-1] - memory[0]:.1f} MB)"
+    )
+
+
+def main(enters_per_minute=50_000, chat_per_minute=25_000, users=100_000, seconds=60, replay_path=None):
+    migrations.upgrade(models.engine)
+    giveaway_id = seed_giveaway()
+    if replay_path:
+        print(f"Replaying {replay_path} at {enters_per_minute:,} lines/min")
+        events = replay(replay_path, enters_per_minute)
+    else:
+        print(
+            f"{enters_per_minute:,} !enter/min from {users:,} viewers plus {chat_per_minute:,} chat/min"
+            f" for {seconds}s, drawing every {CHAT_LOAD_DRAW_EVERY}s"
+        )
+        events = synthesize(enters_per_minute, chat_per_minute, users, seconds)
+
+    devnull = open(os.devnull, "w")
+    configure_logging(level=logging.INFO, stream=devnull)
+    try:
+        with FakeTMI() as tmi:
+            report(asyncio.run(run(tmi, events, giveaway_id)))
+    finally:
+        stop_logging()
+        models.engine.dispose()
+        shutil.rmtree(WORK_DIR)
+
+
+if __name__ == "__main__":
+    replay_path = next((arg.split("=", 1)[1] for arg in sys.argv[1:] if arg.startswith("--replay=")), None)
+    args = [int(arg) for arg in sys.argv[1:] if not arg.startswith("--")]
+    if replay_path:
+        main(*args[:1], replay_path=replay_path)
+    else:
+        main(*args[:4])
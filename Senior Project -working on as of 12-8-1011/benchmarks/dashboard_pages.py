@@ -0,0 +1,117 @@
+"""
+Benchmark: /dashboard for a creator with 10,000 giveaways.
+
+Compares the old route (every giveaway and every winner loaded as ORM
+objects, item counts by lazy-loading each giveaway's items) with the keyset
+pages from dashboard_queries: the first page, a page deep in the list, and
+walking every page.
+
+Run from the project directory:
+    python -m benchmarks.dashboard_pages [giveaways]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+from dashboard_queries import dashboard_page, recent_winners
+from models import Giveaway, Item, User, Winner
+
+ITEMS_PER_GIVEAWAY = 5
+WON_PER_GIVEAWAY = 2
+
+
+def seed(engine, giveaways):
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": 1, "twitch_id": "t1", "username": "streamer"},
+            {"id": 2, "twitch_id": "t2", "username": "other"},
+        ])
+        # A second creator so the creator_id filter has something to skip
+        conn.execute(Giveaway.__table__.insert(), [
+            {"id": i, "title": f"Giveaway {i}", "frequency": 10, "threshold": 0, "creator_id": 1 + i % 2}
+            for i in range(1, giveaways * 2 + 1)
+        ])
+        items, winners = [], []
+        for giveaway_id in range(1, giveaways * 2 + 1):
+            for n in range(ITEMS_PER_GIVEAWAY):
+                item_id = len(items) + 1
+                won = n < WON_PER_GIVEAWAY
+                items.append({
+                    "id": item_id, "name": f"Key {item_id}", "code": "CODE", "giveaway_id": giveaway_id,
+                    "is_won": won, "winner_username": f"viewer_{item_id}" if won else None,
+                })
+                if won:
+                    winners.append({"giveaway_id": giveaway_id, "item_id": item_id})
+        conn.execute(Item.__table__.insert(), items)
+        conn.execute(Winner.__table__.insert(), winners)
+
+
+def old_dashboard(db_session, user_id):
+    # What /dashboard did before: everything, then counts from lazy loads
+    giveaways = db_session.query(Giveaway).filter_by(creator_id=user_id).all()
+    winners = db_session.query(Winner).join(Giveaway).filter(Giveaway.creator_id == user_id).all()
+    counts = [(len(g.items), sum(item.is_won for item in g.items)) for g in giveaways]
+    return giveaways, winners, counts
+
+
+def new_dashboard(db_session, user_id, after=None):
+    rows, next_cursor = dashboard_page(db_session, user_id, after=after)
+    recent_winners(db_session, [row.id for row in rows])
+    return rows, next_cursor
+
+
+def timed(label, func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    print(f"  {label:36} {(time.perf_counter() - start) / repeats * 1000:9.2f} ms")
+
+
+def main(giveaways=10_000):
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    engine = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(bind=engine)
+    try:
+        migrations.upgrade(engine)
+        seed(engine, giveaways)
+        print(f"{giveaways:,} giveaways for the creator, {ITEMS_PER_GIVEAWAY} items each")
+
+        def fresh(func, *args, **kwargs):
+            def run():
+                db_session = session_factory()
+                try:
+                    return func(db_session, *args, **kwargs)
+                finally:
+                    db_session.close()
+            return run
+
+        def walk_all_pages():
+            db_session = session_factory()
+            cursor, pages = None, 0
+            while True:
+                _, cursor = dashboard_page(db_session, 1, after=cursor)
+                pages += 1
+                if cursor is None:
+                    db_session.close()
+                    return pages
+
+        timed("old route (everything, lazy counts)", fresh(old_dashboard, 1), repeats=3)
+        timed("keyset first page + recent winners", fresh(new_dashboard, 1), repeats=50)
+        timed("keyset page near the end", fresh(new_dashboard, 1, after=200), repeats=50)
+        start = time.perf_counter()
+        pages = walk_all_pages()
+        print(f"  walking all {pages} pages                  {(time.perf_counter() - start) * 1000:9.2f} ms")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,62 @@
+"""
+Micro-benchmark: list-based entries vs. EntryRegistry.
+
+Simulates a raid where every entrant types !enter (plus a share of duplicate
+!enter spam), followed by a number of winner draws.
+
+Run from the project directory:
+    python -m benchmarks.entry_registry [entrants] [draws]
+"""
+import random
+import sys
+import time
+
+from entry_registry import EntryRegistry
+
+
+def run_list(names, draws):
+    entries = []
+    for name in names:
+        if name not in entries:
+            entries.append(name)
+    for _ in range(draws):
+        if not entries:
+            break
+        winner = random.choice(entries)
+        entries.remove(winner)
+    return len(entries)
+
+
+def run_registry(names, draws):
+    entries = EntryRegistry()
+    for name in names:
+        entries.add(name)
+    for _ in range(draws):
+        if entries.pop_random() is None:
+            break
+    return len(entries)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    remaining = func(*args)
+    return time.perf_counter() - start, remaining
+
+
+def main(entrants=100_000, draws=1_000):
+    random.seed(1)
+    names = [f"viewer_{i}" for i in range(entrants)]
+    # Roughly 10% of chat spams !enter a second time
+    names += random.sample(names, entrants // 10)
+
+    print(f"{entrants} entrants, {len(names)} !enter messages, {draws} draws")
+    registry_time, registry_left = timed(run_registry, names, draws)
+    print(f"EntryRegistry: {registry_time:.3f}s ({registry_left} left)")
+    list_time, list_left = timed(run_list, names, draws)
+    print(f"list:          {list_time:.3f}s ({list_left} left)")
+    print(f"speedup:       {list_time / registry_time:.0f}x")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,68 @@
+"""
+Benchmark: importing game keys into a giveaway.
+
+Compares one Item per request (add + commit, as /giveaway/add-item does)
+with item_import.import_items on a generated CSV, on a throwaway SQLite
+database using the production profile.
+
+Run from the project directory:
+    python -m benchmarks.item_import [items]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+import item_import
+import migrations
+from models import Giveaway, Item, User, make_engine
+
+ONE_BY_ONE = 2_000
+
+
+def make_csv(count):
+    lines = ["name,code"] + [f"Game {n},KEY-{n:08d}-ABCD" for n in range(count)]
+    return "\n".join(lines) + "\n"
+
+
+def main(items=100_000):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "import.db")
+    engine = make_engine(f"sqlite:///{path}", profile="production")
+    session_factory = sessionmaker(bind=engine)
+    try:
+        migrations.upgrade(engine)
+        db_session = session_factory()
+        db_session.add(User(id=1, twitch_id="t1", username="streamer"))
+        db_session.add_all([
+            Giveaway(id=1, title="One by one", frequency=10, threshold=0, creator_id=1),
+            Giveaway(id=2, title="Bulk", frequency=10, threshold=0, creator_id=1),
+        ])
+        db_session.commit()
+
+        start = time.perf_counter()
+        for n in range(ONE_BY_ONE):
+            db_session.add(Item(name=f"Game {n}", code=f"KEY-{n}", giveaway_id=1))
+            db_session.commit()
+        per_item = (time.perf_counter() - start) / ONE_BY_ONE
+        print(f"add + commit per item: {per_item * 1000:.2f} ms, so {items:,} items would take {per_item * items:.1f}s")
+
+        upload = make_csv(items)
+        start = time.perf_counter()
+        result = item_import.import_items(db_session, 2, io.StringIO(upload, newline=""), "csv")
+        elapsed = time.perf_counter() - start
+        print(f"import_items: {result.imported:,} items in {elapsed:.2f}s ({result.imported / elapsed:,.0f} items/s)")
+        db_session.close()
+    finally:
+        engine.dispose()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,74 @@
+"""
+Regression gate for Locust runs.
+
+locustfile.py writes a JSON summary of every run (LOAD_RESULTS, default
+load_results.json): per request name, the request and failure counts,
+throughput and latency percentiles. This compares a summary against a
+stored baseline from a known-good run and lists every endpoint that got
+slower or failed more than the tolerances allow.
+
+Run from the project directory:
+    python -m benchmarks.load_compare load_results.json benchmarks/load_baseline.json
+    python -m benchmarks.load_compare load_results.json benchmarks/load_baseline.json --update
+
+Exits with status 1 when there are regressions. --update stores the
+results as the new baseline instead.
+"""
+import json
+import os
+import shutil
+import sys
+
+LOAD_LATENCY_TOLERANCE = float(os.getenv("LOAD_LATENCY_TOLERANCE", "0.25"))  # Allowed p95 growth, as a fraction
+LOAD_FAILURE_TOLERANCE = float(os.getenv("LOAD_FAILURE_TOLERANCE", "0.01"))  # Allowed rise in failure rate
+LOAD_MIN_REQUESTS = 20  # Endpoints with fewer requests are too noisy to judge
+LATENCY_FLOOR_MS = 5  # Ignore p95 changes smaller than this, however large in relative terms
+
+
+def failure_rate(stats):
+    return stats["failures"] / stats["requests"] if stats["requests"] else 0.0
+
+
+def compare(results, baseline, latency_tolerance=LOAD_LATENCY_TOLERANCE, failure_tolerance=LOAD_FAILURE_TOLERANCE):
+    """Regressions of `results` against `baseline`, as human-readable lines. Empty means the run passes."""
+    regressions = []
+    for name, before in sorted(baseline["endpoints"].items()):
+        after = results["endpoints"].get(name)
+        if after is None:
+            regressions.append(f"{name}: not exercised in this run")
+            continue
+        if after["requests"] < LOAD_MIN_REQUESTS or before["requests"] < LOAD_MIN_REQUESTS:
+            continue
+
+        limit = before["p95"] * (1 + latency_tolerance)
+        if after["p95"] > limit and after["p95"] - before["p95"] > LATENCY_FLOOR_MS:
+            regressions.append(f"{name}: p95 {after['p95']:.0f} ms, baseline {before['p95']:.0f} ms")
+
+        if failure_rate(after) > failure_rate(before) + failure_tolerance:
+            regressions.append(
+                f"{name}: {failure_rate(after):.1%} failed, baseline {failure_rate(before):.1%}"
+            )
+    return regressions
+
+
+def main(results_path, baseline_path, update=False):
+    if update:
+        shutil.copyfile(results_path, baseline_path)
+        print(f"Stored {results_path} as the baseline in {baseline_path}")
+        return 0
+    with open(results_path) as f:
+        results = json.load(f)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print(f"{len(regressions)} regressions across {len(baseline['endpoints'])} endpoints")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    sys.exit(main(sys.argv[1], sys.argv[2], "--update" in sys.argv[3:]))
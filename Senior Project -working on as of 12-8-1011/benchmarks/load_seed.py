@@ -0,0 +1,105 @@
+"""
+Seed the app's database (DATABASE_URL) for the Locust suite in locustfile.py.
+
+Creates LOAD_CREATORS streamers with LOAD_GIVEAWAYS active giveaways each,
+LOAD_ITEMS items per giveaway, and LOAD_VIEWERS viewers who have won some
+of them. Seeded users have twitch_ids "load-creator-<n>" and
+"load-viewer-<n>", which are also the codes Locust logs in with through the
+fake Twitch. Running it again replaces the previous seed.
+
+Run from the project directory, after `python migrations.py`:
+    python -m benchmarks.load_seed [creators] [giveaways] [items] [viewers]
+"""
+import os
+import sys
+import time
+
+from sqlalchemy import delete, select
+
+from models import Giveaway, Item, User, Winner, engine
+
+LOAD_CREATORS = int(os.getenv("LOAD_CREATORS", "50"))
+LOAD_GIVEAWAYS = int(os.getenv("LOAD_GIVEAWAYS", "20"))  # Per creator
+LOAD_ITEMS = int(os.getenv("LOAD_ITEMS", "100"))  # Per giveaway
+LOAD_VIEWERS = int(os.getenv("LOAD_VIEWERS", "500"))
+WON_FRACTION = 0.2  # Share of seeded items already won
+
+
+def creator_code(n):
+    return f"load-creator-{n}"
+
+
+def viewer_code(n):
+    return f"load-viewer-{n}"
+
+
+def clear(conn):
+    """Remove a previous seed: its users, their giveaways, and those giveaways' items and winners."""
+    user_ids = select(User.id).where(User.twitch_id.like("load-%"))
+    giveaway_ids = select(Giveaway.id).where(Giveaway.creator_id.in_(user_ids))
+    conn.execute(delete(Winner).where(Winner.giveaway_id.in_(giveaway_ids)))
+    conn.execute(delete(Item).where(Item.giveaway_id.in_(giveaway_ids)))
+    conn.execute(delete(Giveaway).where(Giveaway.creator_id.in_(user_ids)))
+    conn.execute(delete(User).where(User.twitch_id.like("load-%")))
+
+
+def seed(creators=LOAD_CREATORS, giveaways=LOAD_GIVEAWAYS, items=LOAD_ITEMS, viewers=LOAD_VIEWERS, bind=engine):
+    with bind.begin() as conn:
+        clear(conn)
+        conn.execute(User.__table__.insert(), [
+            {"twitch_id": creator_code(n), "username": creator_code(n).replace("-", "_")} for n in range(creators)
+        ] + [
+            {"twitch_id": viewer_code(n), "username": viewer_code(n).replace("-", "_")} for n in range(viewers)
+        ])
+        creator_ids = conn.execute(
+            select(User.id).where(User.twitch_id.like("load-creator-%"))
+        ).scalars().all()
+        conn.execute(Giveaway.__table__.insert(), [
+            {"title": f"Load Giveaway {n}", "frequency": 60, "threshold": 0, "creator_id": creator_id, "active": True}
+            for creator_id in creator_ids for n in range(giveaways)
+        ])
+        giveaway_ids = conn.execute(
+            select(Giveaway.id).where(Giveaway.creator_id.in_(creator_ids))
+        ).scalars().all()
+
+        won_per_giveaway = int(items * WON_FRACTION)
+        rows = []
+        for position, giveaway_id in enumerate(giveaway_ids):
+            for n in range(items):
+                won = n < won_per_giveaway and viewers > 0
+                rows.append({
+                    "name": f"Load Item {n}",
+                    "code": f"CODE-{giveaway_id}-{n}",
+                    "giveaway_id": giveaway_id,
+                    "is_won": won,
+                    "winner_username": viewer_code((position + n) % viewers).replace("-", "_") if won else None,
+                })
+            if len(rows) >= 10_000:
+                conn.execute(Item.__table__.insert(), rows)
+                rows = []
+        if rows:
+            conn.execute(Item.__table__.insert(), rows)
+
+        won = conn.execute(
+            select(Item.id, Item.giveaway_id).where(Item.giveaway_id.in_(giveaway_ids), Item.is_won == True)
+        ).all()
+        if won:
+            conn.execute(Winner.__table__.insert(), [
+                {"giveaway_id": giveaway_id, "item_id": item_id} for item_id, giveaway_id in won
+            ])
+    return len(creator_ids), len(giveaway_ids)
+
+
+def main(creators=LOAD_CREATORS, giveaways=LOAD_GIVEAWAYS, items=LOAD_ITEMS, viewers=LOAD_VIEWERS):
+    start = time.perf_counter()
+    creator_count, giveaway_count = seed(creators, giveaways, items, viewers)
+    print(
+        f"Seeded {creator_count} creators, {giveaway_count} giveaways, {giveaway_count * items:,} items "
+        f"and {viewers} viewers in {time.perf_counter() - start:.1f}s"
+    )
+    print(f"Run Locust with LOAD_CREATORS={creators} LOAD_VIEWERS={viewers}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:5]]
+    main(*args)
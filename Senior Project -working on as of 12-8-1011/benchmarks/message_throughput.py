@@ -0,0 +1,99 @@
+"""
+Benchmark: chat messages per second through Bot.event_message with logging
+off, on (sampled, the default) and on without sampling.
+
+Feeds a mix of normal chat and !enter commands from unique viewers straight
+into the bot, with no Twitch connection. Log output goes to os.devnull so
+terminal speed does not skew the numbers.
+
+Run from the project directory:
+    python -m benchmarks.message_throughput [messages]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from twitchio import Message
+
+import chatbot
+from log_config import configure_logging, stop_logging
+
+
+class FakeWebsocket:
+    nick = chatbot.BOT_NICK
+    _cache = {}
+
+
+class FakeAuthor:
+    _ws = FakeWebsocket()
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeChannel:
+    name = chatbot.CHANNEL
+    _name = chatbot.CHANNEL
+
+    async def send(self, message):
+        pass
+
+
+class FakeGiveaway:
+    id = 0
+    title = "Benchmark Giveaway"
+
+
+def build_messages(count):
+    channel = FakeChannel()
+    messages = []
+    for i in range(count):
+        # Every third message is an !enter, the rest are normal chat
+        content = "!enter" if i % 3 == 0 else f"hype message number {i}"
+        messages.append(Message(content=content, author=FakeAuthor(f"viewer_{i}"), channel=channel, tags={}))
+    return messages
+
+
+async def run(messages):
+    bot = chatbot.Bot()
+    bot.sessions.open(chatbot.CHANNEL, FakeGiveaway())
+
+    start = time.perf_counter()
+    for message in messages:
+        await bot.event_message(message)
+    elapsed = time.perf_counter() - start
+
+    for batcher in bot._ack_batchers.values():
+        batcher.sender.channel = FakeChannel()
+    await bot.flush_acks()
+    return elapsed
+
+
+def main(count=60_000):
+    messages = build_messages(count)
+    devnull = open(os.devnull, "w")
+    modes = [
+        ("logging off", logging.CRITICAL, None),
+        ("logging on (sampled)", logging.INFO, None),
+        ("logging on (unsampled)", logging.INFO, 1),
+        ("debug", logging.DEBUG, 1),
+    ]
+
+    print(f"{count} messages, one in three is !enter")
+    for label, level, sample_every in modes:
+        configure_logging(level=level, stream=devnull)
+        default_messages, default_entries = chatbot.message_log.every, chatbot.entry_log.every
+        if sample_every:
+            chatbot.message_log.every = chatbot.entry_log.every = sample_every
+
+        elapsed = asyncio.run(run(messages))
+        stop_logging()
+        chatbot.message_log.every, chatbot.entry_log.every = default_messages, default_entries
+        print(f"{label:24} {count / elapsed:>10,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
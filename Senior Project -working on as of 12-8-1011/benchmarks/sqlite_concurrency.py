@@ -0,0 +1,152 @@
+"""
+Benchmark: the web app and N chatbots writing to one SQLite file at once,
+under each SQLite profile from models.SQLITE_PROFILES.
+
+One process plays the Flask app (create a giveaway, add an item, load the
+dashboard queries); N processes play chatbots (commit batches of wins via
+chatbot_db.apply_wins and re-read their open items). Reports operations per
+second, p99 latency and "database is locked" failures for each side.
+
+Run from the project directory:
+    python -m benchmarks.sqlite_concurrency [chatbots] [seconds]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import models
+from chatbot_db import apply_wins, _open_items
+from models import Base, Giveaway, Item, User, Winner
+
+ITEMS_PER_CHATBOT = 20_000
+WIN_BATCH = 20
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def web_worker(path, profile, seconds, results):
+    engine = models.make_engine(f"sqlite:///{path}", profile=profile)
+    session_factory = sessionmaker(bind=engine)
+    latencies, locked, i = [], 0, 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        start = time.perf_counter()
+        db_session = session_factory()
+        try:
+            giveaway = Giveaway(title=f"Web {i}", frequency=10, threshold=0, creator_id=1)
+            db_session.add(giveaway)
+            db_session.commit()
+            db_session.add(Item(name=f"Web Item {i}", code="CODE", giveaway_id=giveaway.id))
+            db_session.commit()
+            db_session.query(Giveaway).filter_by(creator_id=1).limit(50).all()
+            db_session.query(Winner).join(Giveaway).filter(Giveaway.creator_id == 1).limit(50).all()
+            latencies.append(time.perf_counter() - start)
+        except OperationalError:
+            db_session.rollback()
+            locked += 1
+        finally:
+            db_session.close()
+        i += 1
+    engine.dispose()
+    results.put(("web", latencies, locked))
+
+
+def chatbot_worker(path, profile, seconds, giveaway_id, results):
+    engine = models.make_engine(f"sqlite:///{path}", profile=profile)
+    session_factory = sessionmaker(bind=engine)
+    latencies, locked, n = [], 0, 0
+    deadline = time.time() + seconds
+    db_session = session_factory()
+    item_ids = [item.id for item in _open_items(db_session, giveaway_id)]
+    db_session.close()
+
+    while time.time() < deadline and n < len(item_ids):
+        batch = [
+            {"item_id": item_id, "giveaway_id": giveaway_id, "winner": f"viewer_{item_id}"}
+            for item_id in item_ids[n:n + WIN_BATCH]
+        ]
+        start = time.perf_counter()
+        db_session = session_factory()
+        try:
+            apply_wins(db_session, batch)
+            _open_items(db_session, giveaway_id)[:1]
+            latencies.append(time.perf_counter() - start)
+            n += WIN_BATCH
+        except OperationalError:
+            db_session.rollback()
+            locked += 1
+        finally:
+            db_session.close()
+    engine.dispose()
+    results.put(("chatbot", latencies, locked))
+
+
+def seed(path, chatbots):
+    engine = models.make_engine(f"sqlite:///{path}", profile="default")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": 1, "twitch_id": "t1", "username": "streamer"}])
+        conn.execute(Giveaway.__table__.insert(), [
+            {"id": g, "title": f"Chatbot {g}", "frequency": 1, "threshold": 0, "creator_id": 1}
+            for g in range(1, chatbots + 1)
+        ])
+        conn.execute(Item.__table__.insert(), [
+            {"name": f"Key {g}-{i}", "code": "CODE", "giveaway_id": g, "is_won": False}
+            for g in range(1, chatbots + 1) for i in range(ITEMS_PER_CHATBOT)
+        ])
+    engine.dispose()
+
+
+def run_profile(profile, chatbots, seconds):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.db")
+    seed(path, chatbots)
+
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=web_worker, args=(path, profile, seconds, results))]
+    workers += [
+        multiprocessing.Process(target=chatbot_worker, args=(path, profile, seconds, g, results))
+        for g in range(1, chatbots + 1)
+    ]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    print(f"\nprofile={profile}")
+    for role in ("web", "chatbot"):
+        latencies = [l for name, lats, _ in collected if name == role for l in lats]
+        locked = sum(count for name, _, count in collected if name == role)
+        print(
+            f"  {role:8} {len(latencies) / seconds:8.1f} ops/s"
+            f"  p50 {percentile(latencies, 0.5) * 1000:7.1f}ms"
+            f"  p99 {percentile(latencies, 0.99) * 1000:7.1f}ms"
+            f"  locked errors {locked}"
+        )
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.rmdir(directory)
+
+
+def main(chatbots=4, seconds=5):
+    print(f"1 web worker + {chatbots} chatbots for {seconds}s per profile")
+    for profile in models.SQLITE_PROFILES:
+        run_profile(profile, chatbots, seconds)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
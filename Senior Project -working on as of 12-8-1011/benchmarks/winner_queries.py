@@ -0,0 +1,127 @@
+"""
+Benchmark: /winnings and /dashboard queries with a million won items,
+before and after the winner-lookup indexes from migration 2.
+
+Builds a throwaway SQLite database, drops the new indexes to get the old
+schema, times the queries, runs migrations.upgrade and times them again.
+Prints SQLite's query plan for each step.
+
+Run from the project directory:
+    python -m benchmarks.winner_queries [won_items]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+from models import Base, Giveaway, Item, User, Winner
+
+CHUNK = 50_000
+
+
+def seed(engine, won_items, viewers=20_000, creators=100, giveaways_per_creator=10):
+    rng = random.Random(1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "twitch_id": f"t{i}", "username": f"viewer_{i}"} for i in range(1, viewers + 1)
+        ])
+        giveaways = [
+            {"id": i, "title": f"Giveaway {i}", "frequency": 10, "threshold": 0, "creator_id": (i % creators) + 1}
+            for i in range(1, creators * giveaways_per_creator + 1)
+        ]
+        conn.execute(Giveaway.__table__.insert(), giveaways)
+
+        for start in range(0, won_items, CHUNK):
+            items, winners = [], []
+            for item_id in range(start + 1, min(start + CHUNK, won_items) + 1):
+                viewer = rng.randint(1, viewers)
+                giveaway_id = rng.randint(1, len(giveaways))
+                items.append({
+                    "id": item_id, "name": f"Key {item_id}", "code": f"CODE{item_id}", "is_won": True,
+                    "giveaway_id": giveaway_id, "winner_username": f"viewer_{viewer}",
+                })
+                winners.append({"user_id": viewer, "giveaway_id": giveaway_id, "item_id": item_id})
+            conn.execute(Item.__table__.insert(), items)
+            conn.execute(Winner.__table__.insert(), winners)
+
+
+def winnings_query(db_session, username):
+    # Same query as the /winnings route
+    return db_session.query(Item).filter(Item.is_won == True, Item.winner_username == username)
+
+
+def dashboard_queries(db_session, user_id):
+    # Same queries as the /dashboard route
+    return [
+        db_session.query(Giveaway).filter_by(creator_id=user_id),
+        db_session.query(Winner).join(Giveaway).filter(Giveaway.creator_id == user_id),
+    ]
+
+
+def explain(db_session, query):
+    sql = str(query.statement.compile(db_session.bind, compile_kwargs={"literal_binds": True}))
+    rows = db_session.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def measure(session_factory, label, repeats=20):
+    db_session = session_factory()
+    print(f"\n{label}")
+    print("  /winnings plan: " + explain(db_session, winnings_query(db_session, "viewer_42")))
+    for query in dashboard_queries(db_session, 7):
+        print("  /dashboard plan: " + explain(db_session, query))
+
+    start = time.perf_counter()
+    for i in range(repeats):
+        winnings_query(db_session, f"viewer_{i + 1}").all()
+    winnings_ms = (time.perf_counter() - start) / repeats * 1000
+
+    start = time.perf_counter()
+    for i in range(repeats):
+        for query in dashboard_queries(db_session, i + 1):
+            query.all()
+    dashboard_ms = (time.perf_counter() - start) / repeats * 1000
+    db_session.close()
+
+    print(f"  /winnings  {winnings_ms:8.2f} ms per request")
+    print(f"  /dashboard {dashboard_ms:8.2f} ms per request")
+
+
+def main(won_items=1_000_000):
+    handle, path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    engine = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(bind=engine)
+    try:
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            # Start from the schema as it was before migration 2
+            for name in migrations.WINNER_INDEXES:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            migrations.version_metadata.create_all(bind=conn)
+            conn.execute(migrations.schema_version.insert().values(version=1))
+
+        start = time.perf_counter()
+        seed(engine, won_items)
+        print(f"Seeded {won_items:,} won items in {time.perf_counter() - start:.1f}s")
+
+        measure(session_factory, "Before migration 2 (no winner indexes)", repeats=3)
+
+        start = time.perf_counter()
+        migrations.upgrade(engine)
+        print(f"\nmigrations.upgrade built the indexes in {time.perf_counter() - start:.1f}s")
+
+        measure(session_factory, "After migration 2")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:2]]
+    main(*args)
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import deque
+
+# Twitch drops chat messages longer than this
+MAX_MESSAGE_LENGTH = 500
+
+
+class ChatBudget:
+    """
+    At most `messages_per_30s` messages in any 30 seconds.
+
+    Twitch counts messages per account, across every channel the account
+    posts in, so one budget is shared by all of a bot account's senders.
+    Slots are handed out in call order and never move.
+    """
+
+    PERIOD = 30.0
+
+    def __init__(self, messages_per_30s=20, clock=time.monotonic):
+        if messages_per_30s < 1:
+            raise ValueError("messages_per_30s must be at least 1.")
+        self.messages_per_30s = messages_per_30s
+        self._clock = clock
+        self._slots = deque()  # Send times (past or reserved) within the last period
+
+    def earliest(self, not_before=None):
+        """The earliest time at or after `not_before` that one more message fits, without reserving it."""
+        now = self._clock()
+        while self._slots and self._slots[0] <= now - self.PERIOD:
+            self._slots.popleft()
+
+        at = now if not_before is None else max(now, not_before)
+        if len(self._slots) >= self.messages_per_30s:
+            at = max(at, self._slots[-self.messages_per_30s] + self.PERIOD)
+        if self._slots:
+            at = max(at, self._slots[-1])
+        return at
+
+    def take(self, at):
+        """Reserve the slot at `at`, which must not be before any slot already reserved."""
+        self._slots.append(at)
+
+    def reserve(self, not_before=None):
+        """Reserve the earliest slot at or after `not_before` and return its time."""
+        at = self.earliest(not_before)
+        self.take(at)
+        return at
+
+    @property
+    def queued(self):
+        """Number of reserved slots that have not been reached yet."""
+        now = self._clock()
+        return sum(1 for at in self._slots if at > now)
+
+
+class RateLimitedSender:
+    """
+    Sends messages to a channel without exceeding `messages_per_30s`, nor
+    the `account` budget shared with the account's other channels.
+
+    Every send reserves the earliest slot that keeps both budgets, then
+    sleeps until that slot. Slots are handed out in call order, so each
+    channel's messages go out in the order they were queued, and channels
+    share the account budget in the order they asked for it.
+    """
+
+    def __init__(self, channel, messages_per_30s=20, clock=time.monotonic, sleep=asyncio.sleep, account=None):
+        self.channel = channel
+        self.account = account
+        self._budget = ChatBudget(messages_per_30s, clock)
+        self._clock = clock
+        self._sleep = sleep
+        self.sent = 0
+        self.waited = 0.0  # Total seconds spent waiting for budget
+
+    @property
+    def messages_per_30s(self):
+        return self._budget.messages_per_30s
+
+    def _reserve(self):
+        now = self._clock()
+        at = self._budget.earliest()
+        if self.account is not None:
+            at = self.account.reserve(not_before=at)
+        self._budget.take(at)
+        return at - now
+
+    @property
+    def queued(self):
+        """Number of this channel's messages waiting for their slot."""
+        return self._budget.queued
+
+    async def acquire(self):
+        """Wait until one more message fits in the budget."""
+        delay = self._reserve()
+        if delay > 0:
+            self.waited += delay
+            await self._sleep(delay)
+
+    async def send(self, message):
+        await self.acquire()
+        await self.channel.send(message)
+        self.sent += 1
+
+
+class AckBatcher:
+    """
+    Coalesces "you have been entered" replies into one message per window.
+
+    `add` is synchronous and cheap, so the !enter handler never waits on the
+    network. The first name added after a flush starts a timer; when it fires
+    and the sender has budget, every name collected so far is posted as e.g.
+    "Entered: a, b, c +412 more".
+    """
+
+    def __init__(self, sender, window=2.0, max_names=10, prefix="Entered", sleep=asyncio.sleep):
+        self.sender = sender
+        self.window = window
+        self.max_names = max_names
+        self.prefix = prefix
+        self._sleep = sleep
+        self._pending = []
+        self._flush_task = None
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def add(self, name):
+        """Queue an acknowledgement for `name`."""
+        self._pending.append(name)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+
+    def format(self, names):
+        """Build the aggregated message, staying under Twitch's length limit."""
+        shown = []
+        length = len(self.prefix) + 2
+        for name in names[:self.max_names]:
+            # Leave room for the ", " separator and a "+N more" suffix
+            if length + len(name) + 2 + 16 > MAX_MESSAGE_LENGTH:
+                break
+            shown.append(name)
+            length += len(name) + 2
+
+        message = f"{self.prefix}: {', '.join(shown)}"
+        remaining = len(names) - len(shown)
+        if remaining:
+            message += f" +{remaining} more"
+        return message
+
+    async def _flush_after_window(self):
+        await self._sleep(self.window)
+        await self.sender.acquire()
+        # Names that arrived while waiting for budget ride along in this message
+        names, self._pending = self._pending, []
+        self._flush_task = None
+        if names:
+            await self.sender.channel.send(self.format(names))
+            self.sender.sent += 1
+
+    async def close(self):
+        """Cancel the pending timer and send whatever is still queued."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._pending:
+            names, self._pending = self._pending, []
+            await self.sender.send(self.format(names))
@@ -1,36 +1,137 @@
+import aiohttp
+import twitchio.websocket
 from twitchio.ext import commands
-from models import SessionLocal, Giveaway, User, Item
-import random
+from chatbot_db import ChatbotDB
+from win_journal import WinJournal
+from giveaway_session import SessionRegistry
+from chat_ack import AckBatcher, ChatBudget, RateLimitedSender
+from draw_scheduler import DrawScheduler
 import asyncio
 import sys
 import os
-import threading
+import time
+import logging
+import weakref
+from log_config import configure_logging, sampled_logger
+from metrics import Counter, registry, snapshot_gauge
 
 # Twitch bot configuration
 BOT_NICK = "rafflebot_giveaways"  # Replace with your bot's Twitch username
 BOT_TOKEN = "4gpbhy6ub5fbrn69jsujrma5nkuhqw"  # Replace with your bot's Twitch OAuth token
 BOT_PREFIX = "!"  # Commands will start with this prefix
 CHANNEL = "rafflebot_giveaways"  # Replace with your Twitch channel name
-
-# Keep track of active giveaways
-active_giveaway = None
-entries = []
-giveaway_task = None  # Task for managing the active giveaway
-lock = threading.Lock()  # For thread-safe shared data
-
-def is_giveaway_owner(ctx, giveaway):
-    db_session = SessionLocal()
-    user = db_session.query(User).filter_by(username=ctx.author.name).first()
-    db_session.close()
+TWITCH_IRC_URL = os.getenv("TWITCH_IRC_URL", "")  # Chat server to use instead of Twitch's, e.g. tests/fake_tmi.py
+
+# Outbound chat settings
+CHAT_MESSAGES_PER_30S = int(os.getenv("CHAT_MESSAGES_PER_30S", "20"))  # Per bot account; Twitch allows 20 for non-moderators
+CHAT_CHANNEL_MESSAGES_PER_30S = int(os.getenv("CHAT_CHANNEL_MESSAGES_PER_30S", str(CHAT_MESSAGES_PER_30S)))  # One channel's share
+ACK_WINDOW = float(os.getenv("ACK_WINDOW", "3.0"))  # Seconds to collect !enter acknowledgements
+ACK_MAX_NAMES = int(os.getenv("ACK_MAX_NAMES", "10"))  # Names listed before "+N more"
+NO_GIVEAWAY_REPLY_INTERVAL = float(os.getenv("NO_GIVEAWAY_REPLY_INTERVAL", "30"))  # Seconds between "no active giveaway" replies
+
+# Logging: per-message and per-entry lines are sampled, one in every N is kept
+log = logging.getLogger("chatbot")
+message_log = sampled_logger("chatbot.messages", os.getenv("LOG_SAMPLE_MESSAGES", "100"))
+entry_log = sampled_logger("chatbot.entries", os.getenv("LOG_SAMPLE_ENTRIES", "20"))
+
+# Shared by every bot in the process so all chatbot DB work goes through one thread
+default_db = ChatbotDB()
+default_journal = WinJournal(default_db)
+# Likewise one timer heap wakes every giveaway's draws
+default_scheduler = DrawScheduler()
+# Every bot posts as BOT_NICK, and Twitch limits the account across all its channels
+default_chat_budget = ChatBudget(CHAT_MESSAGES_PER_30S)
+
+# Metrics, served by the supervisor's "metrics" command; per-channel queues are read at scrape time
+messages_total = registry.counter("chatbot_messages_total", "Chat messages received.", ["channel"])
+entries_total = registry.counter("chatbot_entries_total", "!enter commands by outcome.", ["channel", "result"])
+ENTRY_RESULTS = ("entered", "duplicate", "no_giveaway")  # Values of entries_total's result label
+event_loop_lag = registry.histogram("chatbot_event_loop_lag_seconds", "How late the event loop woke from a sleep.")
+_bots = weakref.WeakSet()  # Bots in this process, for the collector below
+
+
+@registry.collector
+def _bot_metrics():
+    bots = [bot for bot in _bots if not bot._closed]
+    senders = [(channel, sender) for bot in bots for channel, sender in bot._senders.items()]
+    batchers = [(channel, batcher) for bot in bots for channel, batcher in bot._ack_batchers.items()]
+    sessions = [session for bot in bots for session in bot.sessions]
+    databases = {id(bot.db): bot.db for bot in bots}.values()
+    journals = {id(bot.journal): bot.journal for bot in bots}.values()
+    return [
+        snapshot_gauge("chatbot_bots", "Running chatbots.", len(bots)),
+        snapshot_gauge(
+            "chatbot_entrants", "Entrants in each running giveaway.",
+            [((session.channel,), len(session.entries)) for session in sessions], ["channel"],
+        ),
+        snapshot_gauge(
+            "chatbot_ack_pending", "Entrants waiting for the next batched acknowledgement.",
+            [((channel,), batcher.pending) for channel, batcher in batchers], ["channel"],
+        ),
+        snapshot_gauge(
+            "chatbot_send_queue", "Chat messages waiting for rate-limit budget.",
+            [((channel,), sender.queued) for channel, sender in senders], ["channel"],
+        ),
+        snapshot_gauge(
+            "chatbot_sent_total", "Chat messages sent.",
+            [((channel,), sender.sent) for channel, sender in senders], ["channel"], kind=Counter,
+        ),
+        snapshot_gauge(
+            "chatbot_send_wait_seconds_total", "Time sends waited for rate-limit budget.",
+            [((channel,), sender.waited) for channel, sender in senders], ["channel"], kind=Counter,
+        ),
+        snapshot_gauge("chatbot_db_queue", "Calls queued or running on the DB thread.",
+                       sum(db.in_flight for db in databases)),
+        snapshot_gauge("chatbot_journal_pending", "Journaled wins not yet in the database.",
+                       sum(journal.pending for journal in journals)),
+    ]
+
+
+def forget_channel_metrics(channel):
+    """Drop a channel's labelled series once its bot has exited, so channels that come and go do not pile up."""
+    messages_total.remove(channel)
+    for result in ENTRY_RESULTS:
+        entries_total.remove(channel, result)
+
+
+async def is_giveaway_owner(ctx, giveaway, db=default_db):
+    user = await db.get_user_by_username(ctx.author.name)
     return user and user.id == giveaway.creator_id
 
 class Bot(commands.Bot):
 
-    def __init__(self, giveaway_id=None):
-        super().__init__(token=BOT_TOKEN, prefix=BOT_PREFIX, initial_channels=[CHANNEL])
+    def __init__(self, giveaway_id=None, channel=CHANNEL, exit_on_shutdown=True, db=None, journal=None,
+                 irc_url=TWITCH_IRC_URL, scheduler=None, chat_budget=None):
+        super().__init__(token=BOT_TOKEN, prefix=BOT_PREFIX, initial_channels=[channel])
+        self.irc_url = irc_url
         self.giveaway_id = giveaway_id
+        self.db = db or default_db
+        self.journal = journal or default_journal
+        self.scheduler = scheduler or default_scheduler
+        self.chat_budget = chat_budget or default_chat_budget
+        self.channel_name = channel
+        # When hosted by the supervisor, shutting down must not kill the whole process
+        self.exit_on_shutdown = exit_on_shutdown
+        self._closed = False
+
+        # Running giveaways, one per channel; several bots may share one process
+        self.sessions = SessionRegistry()
         self._connected_channels = []
         self._nick = BOT_NICK  # Use a private attribute for the nick property
+        self._senders = {}  # Channel name -> RateLimitedSender
+        self._ack_batchers = {}  # Channel name -> AckBatcher
+        self._no_giveaway_replied = {}  # Channel name -> when "no active giveaway" was last sent
+        _bots.add(self)
+
+    async def connect(self):
+        if self.irc_url:
+            # twitchio has no setting for its chat server, and a fake one cannot validate
+            # the token, so skip the validation call that would otherwise supply the nick
+            twitchio.websocket.HOST = self.irc_url
+            self._http.nick = BOT_NICK
+            if not self._http.session:
+                self._http.session = aiohttp.ClientSession()
+        await super().connect()
 
     @property
     def connected_channels(self):
@@ -40,6 +141,52 @@ class Bot(commands.Bot):
     def connected_channels(self, channels):
         self._connected_channels = channels
 
+    def get_sender(self, channel):
+        """Rate-limited sender shared by every message the bot posts to `channel`, within the account's budget."""
+        if channel.name not in self._senders:
+            self._senders[channel.name] = RateLimitedSender(
+                channel, messages_per_30s=CHAT_CHANNEL_MESSAGES_PER_30S, account=self.chat_budget
+            )
+        return self._senders[channel.name]
+
+    def get_ack_batcher(self, channel):
+        """Batcher that coalesces !enter acknowledgements for `channel`."""
+        if channel.name not in self._ack_batchers:
+            self._ack_batchers[channel.name] = AckBatcher(
+                self.get_sender(channel), window=ACK_WINDOW, max_names=ACK_MAX_NAMES
+            )
+        return self._ack_batchers[channel.name]
+
+    async def flush_acks(self):
+        """Send any acknowledgements still waiting for their window."""
+        for batcher in list(self._ack_batchers.values()):
+            try:
+                await batcher.close()
+            except Exception as e:
+                log.error("Error flushing entry acknowledgements: %s", e)
+
+    async def reply(self, ctx, message):
+        """Answer a command through the channel's rate-limited sender, like every other chat message."""
+        await self.get_sender(ctx.channel).send(message)
+
+    async def announce(self, session, message):
+        """Post `message` to the session's channel through its rate-limited sender."""
+        try:
+            channel = self.get_channel(session.channel)
+            if channel:
+                await self.get_sender(channel).send(message)
+            else:
+                log.warning("Channel object for '%s' not found. Skipping message: %s", session.channel, message)
+        except Exception as e:
+            log.error("Error sending message to channel '%s': %s", session.channel, e)
+
+    def begin_giveaway(self, channel_name, giveaway):
+        """Open a session for `giveaway` and start its draw loop, or return None if the channel is busy."""
+        session = self.sessions.open(channel_name, giveaway)
+        if session:
+            session.task = asyncio.create_task(self.manage_giveaways(session))
+        return session
+
     @property
     def nick(self):
         return self._nick
@@ -49,275 +196,273 @@ class Bot(commands.Bot):
         self._nick = value
 
     async def event_ready(self):
-        global active_giveaway, entries
-
-        print(f"Bot is online as {self.nick}!")
+        log.info("Bot is online as %s!", self.nick)
 
         # Fetch connected channels from the bot's inherited functionality
-        self.connected_channels = list(self.connected_channels) or [CHANNEL]  # Ensure it reflects the actual state
+        self.connected_channels = list(self.connected_channels) or [self.channel_name]  # Ensure it reflects the actual state
 
-        print(f"Connected channels: {self.connected_channels}")  # Log connected channels
+        log.info("Connected channels: %s", self.connected_channels)
 
         if not self.connected_channels:
-            print("Warning: Bot is not connected to any channels.")
+            log.warning("Bot is not connected to any channels.")
         
+        # Replays wins a crashed run journaled but never wrote to the database
+        await self.journal.start()
+
         if self.giveaway_id:
-            print(f"Auto-starting giveaway ID: {self.giveaway_id}")
-            db_session = SessionLocal()
-            giveaway = db_session.query(Giveaway).filter_by(id=self.giveaway_id).first()
-            db_session.close()
+            log.info("Auto-starting giveaway ID: %s", self.giveaway_id)
+            giveaway = await self.db.get_giveaway(self.giveaway_id)
 
             if giveaway:
-                active_giveaway = giveaway
-                entries = []
-                print(f"Giveaway '{giveaway.title}' is now active!")
-                asyncio.create_task(self.manage_giveaways(None, giveaway))
+                if self.begin_giveaway(self.channel_name, giveaway):
+                    log.info("Giveaway '%s' is now active!", giveaway.title)
+                else:
+                    log.warning("A giveaway is already active in #%s", self.channel_name)
             else:
-                print(f"No giveaway found with ID {self.giveaway_id}")
+                log.warning("No giveaway found with ID %s", self.giveaway_id)
 
     async def event_message(self, message):
         # Skip messages with no author (e.g., system messages)
         if message.author is None:
             return
 
-        print(f"{message.author.name}: {message.content}")
+        message_log.info("%s: %s", message.author.name, message.content)
 
         # Ensure the bot doesn't respond to itself
         if message.author.name.lower() == self.nick.lower():
             return
+        if message.channel is not None:
+            messages_total.labels(message.channel.name).inc()
 
         # Process commands
         await self.handle_commands(message)
 
     @commands.command(name="startgiveaway")
     async def start_giveaway(self, ctx, identifier: str = None):
-        global active_giveaway, entries, giveaway_task
-
-        if active_giveaway:
-            await ctx.send("A giveaway is already active!")
+        if self.sessions.get(ctx.channel.name):
+            await self.reply(ctx, "A giveaway is already active!")
             return
 
         if not identifier:
-            await ctx.send("Please provide a giveaway ID or title. Use !listgiveaways to see your options.")
+            await self.reply(ctx, "Please provide a giveaway ID or title. Use !listgiveaways to see your options.")
             return
 
-        db_session = SessionLocal()
-        giveaway = db_session.query(Giveaway).filter_by(id=int(identifier)).first()
-        db_session.close()
+        giveaway = await self.db.get_giveaway(int(identifier))
 
         if not giveaway:
-            await ctx.send("Invalid giveaway ID provided.")
+            await self.reply(ctx, "Invalid giveaway ID provided.")
+            return
+
+        if not self.begin_giveaway(ctx.channel.name, giveaway):
+            await self.reply(ctx, "A giveaway is already active!")
             return
 
-        active_giveaway = giveaway
-        entries = []
-        print(f"Starting giveaway: {giveaway.title}")
-        await ctx.send(f"A giveaway has started: {giveaway.title}! Type !enter to participate.")
-        giveaway_task = asyncio.create_task(self.manage_giveaways(ctx, giveaway))
+        log.info("Starting giveaway: %s", giveaway.title)
+        await self.reply(ctx, f"A giveaway has started: {giveaway.title}! Type !enter to participate.")
 
     @commands.command(name="enter")
     async def enter_giveaway(self, ctx):
-        global entries
-
-        if not active_giveaway:
-            print("No active giveaway found when entering.")
-            await ctx.send("There is no active giveaway to join.")
+        session = self.sessions.get(ctx.channel.name)
+        if not session:
+            entry_log.info("No active giveaway found when entering.")
+            entries_total.labels(ctx.channel.name, "no_giveaway").inc()
+            # One reply per interval answers a whole chat typing !enter at once
+            now = time.monotonic()
+            last = self._no_giveaway_replied.get(ctx.channel.name)
+            if last is None or now - last >= NO_GIVEAWAY_REPLY_INTERVAL:
+                self._no_giveaway_replied[ctx.channel.name] = now
+                await self.reply(ctx, "There is no active giveaway to join.")
             return
 
-        with lock:
-            if ctx.author.name not in entries:
-                entries.append(ctx.author.name)
-                print(f"{ctx.author.name} entered the giveaway. Current entries: {entries}")
-                await ctx.send(f"{ctx.author.name}, you have been entered into the giveaway!")
-            else:
-                print(f"{ctx.author.name} is already in the giveaway. Current entries: {entries}")
-                await ctx.send(f"{ctx.author.name}, you are already entered!")
+        if await session.enter(ctx.author.name):
+            entry_log.info("%s entered the giveaway. Current entries: %d", ctx.author.name, len(session.entries))
+            entries_total.labels(ctx.channel.name, "entered").inc()
+            # Acknowledged in the next batched "Entered: ..." message
+            self.get_ack_batcher(ctx.channel).add(ctx.author.name)
+        else:
+            # Duplicate !enter spam gets no reply so it cannot flood the channel
+            entry_log.info("%s is already in the giveaway. Current entries: %d", ctx.author.name, len(session.entries))
+            entries_total.labels(ctx.channel.name, "duplicate").inc()
 
     @commands.command(name="endgiveaway")
     async def end_giveaway(self, ctx):
-        global active_giveaway, entries, giveaway_task
-
         # Check if a giveaway is active
-        if not active_giveaway:
-            await ctx.send("There is no active giveaway to end.")
+        session = self.sessions.get(ctx.channel.name)
+        if not session:
+            await self.reply(ctx, "There is no active giveaway to end.")
             return
 
-        # Cancel the active giveaway task
-        if giveaway_task:
-            giveaway_task.cancel()
-            print("Giveaway task canceled.")
-            try:
-                await giveaway_task
-            except asyncio.CancelledError:
-                print("Giveaway task cleanup completed.")
-
-        # Pick a random winner
-        with lock:
-            if entries:
-                winner = random.choice(entries)
-                await ctx.send(f"The giveaway '{active_giveaway.title}' has ended! Congratulations to {winner}!")
-            else:
-                await ctx.send(f"The giveaway '{active_giveaway.title}' has ended with no participants.")
+        # Cancel the active giveaway task; an ended giveaway is not resumed on restart
+        await session.cancel()
+        log.info("Giveaway task canceled.")
+        await self.finish_giveaway(session.giveaway)
+
+        await self.flush_acks()
+
+        # Pick a random winner, then announce it without holding the session lock
+        winner = await session.pick_winner()
+        if winner:
+            await self.reply(ctx, f"The giveaway '{session.giveaway.title}' has ended! Congratulations to {winner}!")
+        else:
+            await self.reply(ctx, f"The giveaway '{session.giveaway.title}' has ended with no participants.")
 
         # Reset giveaway
-        active_giveaway = None
-        entries = []
+        self.sessions.close(session)
 
         # Shut down the bot
-        await ctx.send("Shutting down the giveaway bot. Thank you for participating!")
-        print("Initiating bot shutdown...")
+        await self.reply(ctx, "Shutting down the giveaway bot. Thank you for participating!")
+        log.info("Initiating bot shutdown...")
         await self.shutdown()
 
     @commands.command(name="listgiveaways")
     async def list_giveaways(self, ctx):
         # Retrieve the logged-in user from the database
-        db_session = SessionLocal()
-        user = db_session.query(User).filter_by(username=ctx.author.name).first()
+        # along with the giveaways created by this user
+        user, giveaways = await self.db.list_giveaways_for(ctx.author.name)
 
         if not user:
-            await ctx.send("You are not authorized to list giveaways.")
-            db_session.close()
+            await self.reply(ctx, "You are not authorized to list giveaways.")
             return
 
-        # List giveaways created by this user
-        giveaways = db_session.query(Giveaway).filter_by(creator_id=user.id).all()
-        db_session.close()
-
         if not giveaways:
-            await ctx.send("You have no giveaways available.")
+            await self.reply(ctx, "You have no giveaways available.")
             return
 
         giveaway_list = ", ".join([f"ID #{g.id}: {g.title}" for g in giveaways])
-        await ctx.send(f"Your giveaways: {giveaway_list}")
-
-    async def manage_giveaways(self, ctx, giveaway):
-        global active_giveaway, entries
+        await self.reply(ctx, f"Your giveaways: {giveaway_list}")
 
+    async def manage_giveaways(self, session):
+        giveaway = session.giveaway
+        cancelled = False
         try:
-            print(f"Managing giveaway: {giveaway.title}")
-            db_session = SessionLocal()
-            items = db_session.query(Item).filter_by(giveaway_id=giveaway.id, is_won=False).all()
-            print(f"Fetched items: {items}")
+            log.info("Managing giveaway: %s", giveaway.title)
+            items = await self.db.open_items(giveaway.id)
+            log.info("Fetched %d items", len(items))
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Fetched items: %s", [item.name for item in items])
 
             if not items:
-                print(f"No items found for giveaway '{giveaway.title}'. Ending giveaway.")
-                if self.connected_channels:
-                    try:
-                        channel = self.get_channel(self.connected_channels[0])
-                        if channel:
-                            await channel.send(
-                                f"No items are available for giveaway '{giveaway.title}'. The giveaway cannot proceed."
-                            )
-                        else:
-                            print(f"Channel object for '{self.connected_channels[0]}' not found. Skipping message.")
-                    except Exception as e:
-                        print(f"Error sending message to channel '{self.connected_channels[0]}': {e}")
+                log.info("No items found for giveaway '%s'. Ending giveaway.", giveaway.title)
+                await self.announce(
+                    session, f"No items are available for giveaway '{giveaway.title}'. The giveaway cannot proceed."
+                )
                 return
 
-            for item in items:
-                print(f"Processing item: {item.name} (ID: {item.id})")
+            # Draws fall on a fixed grid from the start, so slow sends and commits never push them back.
+            # A runner restarted mid-giveaway picks up the grid where the stored deadline left it.
+            deadline = giveaway.next_draw_at
+            if deadline:
+                log.info("Resuming giveaway '%s' with %d items left", giveaway.title, len(items))
+            else:
+                deadline = time.time() + giveaway.frequency
+
+            for index, item in enumerate(items):
+                log.info("Processing item: %s (ID: %s)", item.name, item.id)
+                session.current_item = item
+                session.items_left = len(items) - index
 
                 try:
                     # Announce the giveaway item
-                    message = f"Giving away: {item.name}!"
-                    if self.connected_channels:
-                        try:
-                            channel = self.get_channel(self.connected_channels[0])
-                            if channel:
-                                await channel.send(message)
-                            else:
-                                print(f"Channel object for '{self.connected_channels[0]}' not found. Skipping message.")
-                        except Exception as e:
-                            print(f"Error sending message to channel '{self.connected_channels[0]}': {e}")
+                    await self.announce(session, f"Giving away: {item.name}!")
+
+                    # Wait for this item's slot, or the next one still ahead if the lag policy skips
+                    deadline = self.scheduler.plan(deadline, giveaway.frequency, label=f"giveaway {giveaway.id}")
+                    await self.save_schedule(giveaway, deadline)
+                    session.next_draw_at = deadline
+                    await self.scheduler.wait_until(deadline)
+                    session.next_draw_at = None
+                    deadline += giveaway.frequency
+
+                    # Drawing removes the winner under the session lock; everything slow happens after
+                    winner_name = await session.draw_winner()
+                    if winner_name:
+                        log.info("Selected winner: %s", winner_name)
+
+                        # Journaled to disk now, written to the database in the next batch
+                        await self.journal.record(item.id, giveaway.id, winner_name)
+                        session.winners.append((winner_name, item.name))
+
+                        # Announce the winner
+                        await self.announce(session, f"Congratulations {winner_name}! You've won {item.name}!")
                     else:
-                        print(f"Connected channels not found. Skipping message: {message}")
-
-                    # Wait for the giveaway frequency period
-                    await asyncio.sleep(giveaway.frequency)
-
-                    with lock:
-                        # Check if there are entries
-                        if entries:
-                            winner_name = random.choice(entries)
-                            print(f"Selected winner: {winner_name}")
-
-                            # Find the winner in the database
-                            winner = db_session.query(User).filter_by(username=winner_name).first()
-
-                            # Mark item as won and associate with the winner
-                            item.is_won = True
-                            if winner:
-                                item.winner_id = winner.id  # Use the User ID if available
-                            item.winner_username = winner_name  # Always save the winner's username
-                            db_session.commit()
-
-                            # Announce the winner
-                            if self.connected_channels:
-                                try:
-                                    channel = self.get_channel(self.connected_channels[0])
-                                    if channel:
-                                        await channel.send(
-                                            f"Congratulations {winner_name}! You've won {item.name}!"
-                                        )
-                                    else:
-                                        print(f"Channel object for '{self.connected_channels[0]}' not found. Skipping message.")
-                                except Exception as e:
-                                    print(f"Error sending message to channel '{self.connected_channels[0]}': {e}")
-                            entries.remove(winner_name)
-                        else:
-                            print(f"No entries found for item: {item.name}")
-                            if self.connected_channels:
-                                try:
-                                    channel = self.get_channel(self.connected_channels[0])
-                                    if channel:
-                                        await channel.send(
-                                            f"No entries for {item.name}. It will be re-given in the next round."
-                                        )
-                                    else:
-                                        print(f"Channel object for '{self.connected_channels[0]}' not found. Skipping message.")
-                                except Exception as e:
-                                    print(f"Error sending message to channel '{self.connected_channels[0]}': {e}")
+                        log.info("No entries found for item: %s", item.name)
+                        await self.announce(session, f"No entries for {item.name}. It will be re-given in the next round.")
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
-                    print(f"Error processing item '{item.name}': {e}")
+                    log.exception("Error processing item '%s': %s", item.name, e)
 
             # Announce the conclusion of the giveaway
-            print(f"Giveaway '{giveaway.title}' concluded.")
-            if self.connected_channels:
-                try:
-                    channel = self.get_channel(self.connected_channels[0])
-                    if channel:
-                        await channel.send(
-                            f"The giveaway '{giveaway.title}' has ended. Thank you for participating!"
-                        )
-                    else:
-                        print(f"Channel object for '{self.connected_channels[0]}' not found. Skipping message.")
-                except Exception as e:
-                    print(f"Error sending message to channel '{self.connected_channels[0]}': {e}")
-            active_giveaway = None
+            log.info("Giveaway '%s' concluded.", giveaway.title)
+            await self.announce(session, f"The giveaway '{giveaway.title}' has ended. Thank you for participating!")
 
+        except asyncio.CancelledError:
+            # Cancelled by !endgiveaway or the supervisor, which handle shutdown themselves
+            cancelled = True
+            raise
         except Exception as e:
-            print(f"Error in managing giveaway: {e}")
+            log.exception("Error in managing giveaway: %s", e)
         finally:
-            db_session.close()
-            await self.shutdown()
+            if not cancelled:
+                await self.finish_giveaway(giveaway)
+                self.sessions.close(session)
+                if not self.sessions:
+                    await self.shutdown()
+
+
+    async def save_schedule(self, giveaway, next_draw_at):
+        """
+        Store when a giveaway draws next so a restarted runner resumes on time.
+        A failed write only costs that, so draws go on.
+        """
+        try:
+            await self.db.set_next_draw(giveaway.id, next_draw_at)
+        except Exception as e:
+            log.error("Error saving draw schedule for giveaway '%s': %s", giveaway.title, e)
 
+    async def finish_giveaway(self, giveaway):
+        """Mark a giveaway that ran out of items or was ended as inactive, so it is not resumed."""
+        try:
+            await self.db.end_giveaway(giveaway.id)
+        except Exception as e:
+            log.error("Error marking giveaway '%s' as ended: %s", giveaway.title, e)
+
+    async def stop(self):
+        """Cancel every running giveaway and shut down. Their draw schedules are kept for a restart."""
+        for session in self.sessions:
+            await session.cancel()
+            self.sessions.close(session)
+        log.info("Giveaway tasks cleanup completed.")
+        await self.shutdown()
 
     async def shutdown(self):
         """Shutdown the bot gracefully."""
-        print("Shutting down chatbot...")
+        if self._closed:
+            return
+        self._closed = True
+
+        log.info("Shutting down chatbot...")
+        await self.flush_acks()
+        try:
+            await self.journal.flush()
+        except Exception as e:
+            # The wins are still in the journal and will be replayed on the next start
+            log.error("Error flushing win journal during shutdown: %s", e)
         try:
             await self.close()  # Close Twitch bot connection
-            print("Bot connection closed.")
+            log.info("Bot connection closed.")
         except asyncio.CancelledError:
-            print("Suppressed asyncio.CancelledError during shutdown.")
+            log.info("Suppressed asyncio.CancelledError during shutdown.")
         except Exception as e:
-            print(f"Error during bot shutdown: {e}")
+            log.error("Error during bot shutdown: %s", e)
         finally:
-            print("Exiting system process.")
-            os._exit(0)  # Forcefully terminate the process
+            if self.exit_on_shutdown:
+                log.info("Exiting system process.")
+                os._exit(0)  # Forcefully terminate the process
 
 
 if __name__ == "__main__":
+    configure_logging()
     giveaway_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
     bot = Bot(giveaway_id=giveaway_id)
     bot.run()
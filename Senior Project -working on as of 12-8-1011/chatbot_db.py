@@ -0,0 +1,166 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from models import SessionLocal, Giveaway, User, Item, Winner
+from page_cache import page_cache, user_tag, winner_tag
+
+
+class ChatbotDB:
+    """
+    Awaitable data access for the chatbot.
+
+    Every query runs on one dedicated thread with its own short-lived
+    SQLAlchemy session, so a slow commit or a locked SQLite file stalls that
+    thread instead of the event loop that handles chat. A single thread also
+    serializes the chatbot's writes, which is what SQLite wants anyway.
+    Returned ORM objects are detached, with their columns already loaded.
+
+    The ASGI web tier uses it too, with `max_workers` sized to the
+    connection pool so requests can query in parallel.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_workers=1, thread_name_prefix="chatbot-db"):
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.in_flight = 0  # Calls queued or running on the DB thread
+
+    def _call(self, func, args):
+        db_session = self.session_factory()
+        try:
+            return func(db_session, *args)
+        except Exception:
+            db_session.rollback()
+            raise
+        finally:
+            db_session.close()
+
+    async def run(self, func, *args):
+        """Run `func(db_session, *args)` on the DB thread and return its result."""
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            return await loop.run_in_executor(self._executor, self._call, func, args)
+        finally:
+            self.in_flight -= 1
+
+    async def get_giveaway(self, giveaway_id):
+        return await self.run(_get_giveaway, giveaway_id)
+
+    async def get_user_by_username(self, username):
+        return await self.run(_get_user_by_username, username)
+
+    async def list_giveaways_for(self, username):
+        """Return (user, giveaways) for `username`; user is None if they never logged in."""
+        return await self.run(_list_giveaways_for, username)
+
+    async def open_items(self, giveaway_id):
+        """Items of a giveaway that have not been won yet."""
+        return await self.run(_open_items, giveaway_id)
+
+    async def set_next_draw(self, giveaway_id, next_draw_at):
+        """Store the Unix time of a giveaway's next draw, or None once its draw loop is over."""
+        return await self.run(_set_next_draw, giveaway_id, next_draw_at)
+
+    async def end_giveaway(self, giveaway_id):
+        """Mark a giveaway inactive with no next draw, once its draw loop is over for good."""
+        return await self.run(_end_giveaway, giveaway_id)
+
+    async def scheduled_giveaways(self):
+        """(giveaway_id, channel) for every giveaway whose draw loop was interrupted mid-schedule."""
+        return await self.run(_scheduled_giveaways)
+
+    async def apply_wins(self, wins):
+        """Persist a batch of journaled wins in a single transaction."""
+        return await self.run(apply_wins, wins)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def _get_giveaway(db_session, giveaway_id):
+    return db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(id=giveaway_id).first()
+
+
+def _get_user_by_username(db_session, username):
+    return db_session.query(User).filter_by(username=username).first()
+
+
+def _list_giveaways_for(db_session, username):
+    user = _get_user_by_username(db_session, username)
+    if not user:
+        return None, []
+    return user, db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(creator_id=user.id).all()
+
+
+def _open_items(db_session, giveaway_id):
+    return db_session.query(Item).filter_by(giveaway_id=giveaway_id, is_won=False).all()
+
+
+def _set_next_draw(db_session, giveaway_id, next_draw_at):
+    db_session.query(Giveaway).filter_by(id=giveaway_id).update({Giveaway.next_draw_at: next_draw_at})
+    db_session.commit()
+
+
+def _end_giveaway(db_session, giveaway_id):
+    giveaway = db_session.get(Giveaway, giveaway_id)
+    if not giveaway:
+        return
+    giveaway.active = False
+    giveaway.next_draw_at = None
+    db_session.commit()
+    page_cache.invalidate(user_tag(giveaway.creator_id))
+
+
+def _scheduled_giveaways(db_session):
+    # Giveaways run in their creator's channel, as the web app starts them
+    rows = (
+        db_session.query(Giveaway.id, User.username)
+        .join(User, User.id == Giveaway.creator_id)
+        .filter(Giveaway.visible(), Giveaway.next_draw_at.isnot(None))
+        .order_by(Giveaway.id)
+    )
+    return [(giveaway_id, username.lower()) for giveaway_id, username in rows]
+
+
+def apply_wins(db_session, wins):
+    """
+    Mark items as won and add their Winner rows, committing once.
+
+    `wins` are journal entries with item_id, giveaway_id and winner keys.
+    Replaying an entry that was already applied changes nothing, so a
+    journal can safely be re-applied after a crash. Returns the number of
+    items updated.
+    """
+    if not wins:
+        return 0
+
+    item_ids = {win["item_id"] for win in wins}
+    items = {item.id: item for item in db_session.query(Item).filter(Item.id.in_(item_ids))}
+    names = {win["winner"] for win in wins}
+    users = {user.username: user for user in db_session.query(User).filter(User.username.in_(names))}
+    recorded = {row.item_id for row in db_session.query(Winner.item_id).filter(Winner.item_id.in_(item_ids))}
+
+    updated = 0
+    for win in wins:
+        item = items.get(win["item_id"])
+        if not item:
+            continue
+        item.is_won = True
+        item.winner_username = win["winner"]  # Always save the winner's username
+        if item.id not in recorded:
+            user = users.get(win["winner"])
+            db_session.add(Winner(
+                user_id=user.id if user else None,  # Only viewers who have logged in have a User
+                giveaway_id=win["giveaway_id"],
+                item_id=item.id,
+            ))
+            recorded.add(item.id)
+        updated += 1
+
+    db_session.commit()
+
+    # Dashboards of the giveaways' creators and the winners' /winnings pages are now stale
+    giveaway_ids = {win["giveaway_id"] for win in wins}
+    creators = db_session.query(Giveaway.creator_id).filter(Giveaway.id.in_(giveaway_ids)).distinct()
+    page_cache.invalidate(*(user_tag(creator_id) for (creator_id,) in creators), *(winner_tag(name) for name in names))
+    return updated
@@ -0,0 +1,78 @@
+from sqlalchemy import func, select
+
+from models import Giveaway, Item, Winner
+
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_MAX_PAGE_SIZE = 200
+RECENT_WINNERS = 20
+
+
+def dashboard_page(db_session, user_id, after=None, limit=DASHBOARD_PAGE_SIZE):
+    """
+    One page of a creator's giveaways, newest first, with item, won item and
+    winner counts.
+
+    Keyset pagination over Giveaway.id: pass the `next` cursor from the
+    previous page as `after`. Each page is a single query that walks the
+    creator_id index and counts through the per-giveaway indexes, so the
+    cost of a page does not grow with the number of giveaways or with how
+    deep the page is. Returns (rows, next) where next is None on the last
+    page.
+    """
+    limit = max(1, min(limit, DASHBOARD_MAX_PAGE_SIZE))
+
+    item_count = (
+        select(func.count(Item.id)).where(Item.giveaway_id == Giveaway.id)
+        .correlate(Giveaway).scalar_subquery()
+    )
+    won_count = (
+        select(func.count(Item.id)).where(Item.giveaway_id == Giveaway.id, Item.is_won == True)
+        .correlate(Giveaway).scalar_subquery()
+    )
+    winner_count = (
+        select(func.count(Winner.id)).where(Winner.giveaway_id == Giveaway.id)
+        .correlate(Giveaway).scalar_subquery()
+    )
+
+    query = select(
+        Giveaway.id,
+        Giveaway.title,
+        Giveaway.frequency,
+        Giveaway.threshold,
+        Giveaway.active,
+        item_count.label("item_count"),
+        won_count.label("won_count"),
+        winner_count.label("winner_count"),
+    ).where(Giveaway.creator_id == user_id, Giveaway.visible())
+    if after is not None:
+        query = query.where(Giveaway.id < after)
+    # One extra row tells us whether there is a next page
+    rows = db_session.execute(query.order_by(Giveaway.id.desc()).limit(limit + 1)).all()
+
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def recent_winners(db_session, giveaway_ids, limit=RECENT_WINNERS):
+    """
+    The latest winners of the given giveaways (normally the current page),
+    with item and giveaway names. Bounding it by page keeps the sort small
+    instead of ordering every winner the creator has ever had.
+    """
+    if not giveaway_ids:
+        return []
+    query = (
+        select(
+            Winner.id,
+            Item.name.label("item_name"),
+            Item.winner_username,
+            Giveaway.id.label("giveaway_id"),
+            Giveaway.title.label("giveaway_title"),
+        )
+        .join(Giveaway, Giveaway.id == Winner.giveaway_id)
+        .join(Item, Item.id == Winner.item_id)
+        .where(Winner.giveaway_id.in_(giveaway_ids))
+        .order_by(Winner.id.desc())
+        .limit(limit)
+    )
+    return db_session.execute(query).all()
@@ -0,0 +1,251 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from flask.globals import app_ctx
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session
+
+from metrics import Counter, registry, snapshot_gauge
+from models import SessionLocal, engine
+
+log = logging.getLogger("db")
+
+# What to do when a request ends while still holding a pooled connection:
+# "warn" logs it, "raise" raises ConnectionLeakError (the default under app.testing)
+DB_LEAK_CHECK = os.getenv("DB_LEAK_CHECK")
+
+
+class ConnectionLeakError(RuntimeError):
+    """A request finished with a database connection still checked out."""
+
+
+class PoolMetrics:
+    """
+    Connection pool counters for one engine.
+
+    Checkouts, checkins and new connections come from pool events. The time
+    spent waiting in `pool.connect()` is measured by wrapping it, and the
+    wrapper is re-applied whenever the engine is disposed and gets a new
+    pool. Each checked-out connection remembers which thread took it, so a
+    request can tell whether it is leaving one behind.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.checkouts = 0
+        self.connects = 0
+        self.peak_checked_out = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.leaks = 0
+        self._held = {}  # Connection record -> (thread id, checkout number)
+        self._lock = threading.Lock()
+
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "engine_disposed", lambda _: self._time_waits(engine.pool))
+        self._time_waits(engine.pool)
+
+    def _time_waits(self, pool):
+        if getattr(pool.connect, "_timed", False):
+            return
+        connect = pool.connect
+
+        def timed_connect():
+            start = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                waited = time.perf_counter() - start
+                with self._lock:
+                    self.wait_total += waited
+                    self.wait_max = max(self.wait_max, waited)
+
+        timed_connect._timed = True
+        pool.connect = timed_connect
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._held[connection_record] = (threading.get_ident(), self.checkouts)
+            self.peak_checked_out = max(self.peak_checked_out, len(self._held))
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._held.pop(connection_record, None)
+
+    @property
+    def checked_out(self):
+        return len(self._held)
+
+    def mark(self):
+        """A checkout number to pass to `held_since` later."""
+        return self.checkouts
+
+    def held_since(self, mark):
+        """Connections the current thread checked out after `mark` and still holds."""
+        thread = threading.get_ident()
+        with self._lock:
+            return [
+                record for record, (owner, number) in self._held.items()
+                if owner == thread and number > mark
+            ]
+
+    def snapshot(self):
+        pool = self.engine.pool
+        with self._lock:
+            return {
+                "checked_out": len(self._held),
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "leaks": self.leaks,
+                "pool_size": pool.size() if hasattr(pool, "size") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            }
+
+
+class QueryRecorder:
+    """Queries one thread ran while the recorder was active: count, time, and optionally the SQL."""
+
+    def __init__(self, statements=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if statements else None  # (sql, seconds) in order
+
+    def add(self, statement, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        if self.statements is not None:
+            self.statements.append((statement, elapsed))
+
+
+class QueryMetrics:
+    """
+    Time of every SQL statement run on one engine, from SQLAlchemy's cursor
+    events, as the db_query_duration_seconds histogram by operation. Between
+    `begin` and `end` a QueryRecorder also sees the current thread's
+    statements, which is how a request learns how many queries it ran.
+    Recorders nest, so a test can count inside a request that is counting too.
+    """
+
+    def __init__(self, engine, histogram=None):
+        self.histogram = histogram or registry.histogram(
+            "db_query_duration_seconds", "Time to run one SQL statement.", ["operation"]
+        )
+        self._local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+            operation = "OTHER"
+        self.histogram.labels(operation).observe(elapsed)
+
+        for recorder in getattr(self._local, "recorders", ()):
+            recorder.add(statement, elapsed)
+
+    def begin(self, statements=False):
+        """Start a QueryRecorder for this thread's queries."""
+        recorder = QueryRecorder(statements)
+        if not hasattr(self._local, "recorders"):
+            self._local.recorders = []
+        self._local.recorders.append(recorder)
+        return recorder
+
+    def end(self, recorder):
+        """Stop `recorder`; it keeps what it saw."""
+        recorders = getattr(self._local, "recorders", [])
+        if recorder in recorders:
+            recorders.remove(recorder)
+        return recorder
+
+    @contextmanager
+    def count(self, statements=True):
+        """
+        Record the queries run on this thread inside the block, e.g. by a test
+        client request:
+
+            with query_metrics.count() as queries:
+                client.get("/dashboard")
+            assert queries.count <= 5
+        """
+        recorder = self.begin(statements)
+        try:
+            yield recorder
+        finally:
+            self.end(recorder)
+
+
+def _app_context_id():
+    return id(app_ctx._get_current_object())
+
+
+# One session per Flask app context, removed when the context ends.
+# Routes use it like a Session: db_session.query(...), db_session.commit()
+db_session = scoped_session(SessionLocal, scopefunc=_app_context_id)
+pool_metrics = PoolMetrics(engine)
+query_metrics = QueryMetrics(engine)
+
+
+@registry.collector
+def _pool_metrics():
+    snapshot = pool_metrics.snapshot()
+    gauges = [
+        ("db_pool_checked_out", "Connections currently checked out.", snapshot["checked_out"]),
+        ("db_pool_peak_checked_out", "Most connections checked out at once.", snapshot["peak_checked_out"]),
+        ("db_pool_size", "Connections the pool keeps open.", snapshot["pool_size"]),
+        ("db_pool_overflow", "Connections open beyond the pool size.", snapshot["overflow"]),
+    ]
+    counters = [
+        ("db_pool_checkouts_total", "Connection checkouts.", snapshot["checkouts"]),
+        ("db_pool_connects_total", "New database connections opened.", snapshot["connects"]),
+        ("db_pool_wait_seconds_total", "Time spent waiting for a pooled connection.", pool_metrics.wait_total),
+        ("db_connection_leaks_total", "Requests that ended holding a connection.", snapshot["leaks"]),
+    ]
+    # Pools without a fixed size (e.g. SQLite in memory) have no size or overflow
+    return [snapshot_gauge(*gauge) for gauge in gauges if gauge[2] is not None] + [
+        snapshot_gauge(*counter, kind=Counter) for counter in counters
+    ]
+
+
+def init_app(app):
+    """Close the request's session on teardown and check it did not leak a connection."""
+
+    @app.before_request
+    def mark_checkouts():
+        g.db_checkout_mark = pool_metrics.mark()
+        g.db_request_path = request.path
+
+    @app.teardown_appcontext
+    def remove_session(exc):
+        db_session.remove()
+        mark = g.pop("db_checkout_mark", None)
+        if mark is None:
+            return
+        leaked = pool_metrics.held_since(mark)
+        if not leaked:
+            return
+
+        pool_metrics.leaks += len(leaked)
+        path = g.pop("db_request_path", "?")
+        mode = app.config.get("DB_LEAK_CHECK") or DB_LEAK_CHECK or ("raise" if app.testing else "warn")
+        if mode == "raise":
+            raise ConnectionLeakError(f"{len(leaked)} database connection(s) still checked out after {path}")
+        log.warning("%d database connection(s) still checked out after %s", len(leaked), path)
@@ -0,0 +1,121 @@
+"""
+One timer for every giveaway's draws.
+
+Draw deadlines are absolute Unix times on a fixed grid, the giveaway's
+start plus a whole number of frequencies, so time spent announcing,
+drawing and journaling a winner never pushes the following draws back.
+The chatbot stores the next deadline on the giveaway (next_draw_at), so a
+runner restarted after a crash or a supervisor restart resumes the same
+grid instead of starting a new one.
+
+Every waiting draw loop parks on a future in one heap, and a single task
+sleeps until the earliest deadline, however many giveaways are running.
+
+A draw can come due late: the event loop was busy, or the runner is
+resuming after downtime. DRAW_LAG_POLICY decides what happens to the grid
+slots that were missed: "catch_up" draws every one of them, back to back;
+"skip" drops them and waits for the next slot still ahead. A slot missed
+by no more than DRAW_LAG_GRACE seconds is always drawn.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import time
+
+from metrics import registry
+
+log = logging.getLogger("chatbot.scheduler")
+
+DRAW_LAG_POLICY = os.getenv("DRAW_LAG_POLICY", "skip")  # "catch_up" or "skip"
+DRAW_LAG_GRACE = float(os.getenv("DRAW_LAG_GRACE", "1.0"))  # Seconds late a draw may run without being skipped
+LAG_POLICIES = ("catch_up", "skip")
+
+draw_lateness = registry.histogram(
+    "chatbot_draw_lateness_seconds", "How long after its deadline the scheduler woke a draw."
+)
+draws_skipped = registry.counter("chatbot_draws_skipped_total", "Draw slots dropped by the skip lag policy.")
+
+
+def next_deadline(deadline, frequency, now, policy=DRAW_LAG_POLICY, grace=DRAW_LAG_GRACE):
+    """
+    The draw slot to wait for when `deadline` is the next one on the grid and
+    the time is `now`. Returns `deadline` unless the skip policy drops it.
+    """
+    if policy not in LAG_POLICIES:
+        raise ValueError(f"Unknown draw lag policy {policy!r}; use one of {LAG_POLICIES}")
+    if policy == "catch_up" or deadline >= now - grace or frequency <= 0:
+        return deadline
+    missed = math.ceil((now - grace - deadline) / frequency)
+    return deadline + missed * frequency
+
+
+class DrawScheduler:
+    """
+    Wakes draw loops at their deadlines from one heap and one timer task.
+
+    Use it from a single event loop; the timer task starts with the first
+    wait. Waits cancelled before their deadline are dropped when it comes up.
+    """
+
+    def __init__(self, policy=DRAW_LAG_POLICY, grace=DRAW_LAG_GRACE, clock=time.time):
+        if policy not in LAG_POLICIES:
+            raise ValueError(f"Unknown draw lag policy {policy!r}; use one of {LAG_POLICIES}")
+        self.policy = policy
+        self.grace = grace
+        self.clock = clock
+        self._heap = []  # (deadline, sequence, future)
+        self._sequence = itertools.count()  # Breaks ties, so futures are never compared
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+    @property
+    def pending(self):
+        """Waits in the heap, including cancelled ones not yet dropped."""
+        return len(self._heap)
+
+    def plan(self, deadline, frequency, label=None):
+        """`next_deadline` under this scheduler's policy, logging and counting any skipped slots."""
+        now = self.clock()
+        planned = next_deadline(deadline, frequency, now, self.policy, self.grace)
+        if planned != deadline:
+            missed = round((planned - deadline) / frequency)
+            draws_skipped.inc(missed)
+            log.warning("Draw for %s is %.1fs late; skipping %d missed slot(s)", label or "giveaway", now - deadline, missed)
+        return planned
+
+    async def wait_until(self, deadline):
+        """Sleep until the Unix time `deadline`. Returns how late the wake-up was, in seconds."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Heap entries from a loop that has since closed can never be woken
+            self._loop = loop
+            self._heap = []
+            self._task = None
+            self._wake = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="draw-scheduler")
+
+        future = loop.create_future()
+        heapq.heappush(self._heap, (deadline, next(self._sequence), future))
+        if self._heap[0][2] is future:
+            self._wake.set()  # Earlier than whatever the timer is sleeping towards
+        return await future
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            now = self.clock()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, future = heapq.heappop(self._heap)
+                if not future.done():
+                    draw_lateness.observe(now - deadline)
+                    future.set_result(now - deadline)
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
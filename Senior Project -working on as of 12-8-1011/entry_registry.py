@@ -0,0 +1,70 @@
+import random
+
+
+class EntryRegistry:
+    """
+    Set of giveaway entrants with O(1) insert, membership, random draw and removal.
+
+    Names are kept in a list for uniform random access, plus a dict mapping
+    each name to its position in that list. Removal swaps the last name into
+    the removed slot so the list never has to shift.
+    """
+
+    def __init__(self, names=None, rng=None):
+        self._names = []
+        self._index = {}
+        self._rng = rng or random
+        for name in names or ():
+            self.add(name)
+
+    def add(self, name):
+        """Add an entrant. Returns False if they were already entered."""
+        if name in self._index:
+            return False
+        self._index[name] = len(self._names)
+        self._names.append(name)
+        return True
+
+    def remove(self, name):
+        """Remove an entrant. Returns False if they were not entered."""
+        position = self._index.pop(name, None)
+        if position is None:
+            return False
+        last = self._names.pop()
+        if position < len(self._names):
+            # Move the last entrant into the freed slot
+            self._names[position] = last
+            self._index[last] = position
+        return True
+
+    def draw(self):
+        """Pick a uniformly random entrant without removing them, or None if empty."""
+        if not self._names:
+            return None
+        return self._names[self._rng.randrange(len(self._names))]
+
+    def pop_random(self):
+        """Pick a uniformly random entrant and remove them, or None if empty."""
+        name = self.draw()
+        if name is not None:
+            self.remove(name)
+        return name
+
+    def clear(self):
+        self._names.clear()
+        self._index.clear()
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self._names)
+
+    def __bool__(self):
+        return bool(self._names)
+
+    def __iter__(self):
+        return iter(list(self._names))
+
+    def __repr__(self):
+        return f"<EntryRegistry entrants={len(self._names)}>"
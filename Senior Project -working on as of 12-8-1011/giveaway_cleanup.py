@@ -0,0 +1,138 @@
+"""
+Deleting giveaways.
+
+A giveaway is deleted with set-based statements: one DELETE for its unwon
+items, one COUNT for the won items that are kept, two UPDATEs that detach
+the won items and Winner rows from it, and one DELETE for the giveaway
+itself. Won items are never deleted; like their Winner rows they are left
+with a NULL giveaway_id, as the ORM relationships did before.
+
+With DELETE_MODE=archive the web request only stamps `archived_at`, which
+hides the giveaway everywhere, and a background CleanupWorker started
+with the web app does the deletion later. Archived giveaways can also be purged by hand:
+    python giveaway_cleanup.py
+"""
+import datetime
+import logging
+import os
+import threading
+
+from sqlalchemy import delete, func, select, update
+
+from models import Giveaway, Item, SessionLocal, Winner
+
+log = logging.getLogger("cleanup")
+
+DELETE_MODE = os.getenv("DELETE_MODE", "hard")  # "hard" deletes in the request, "archive" defers it
+CLEANUP_INTERVAL = float(os.getenv("CLEANUP_INTERVAL", "60"))  # Seconds between background purges
+CLEANUP_BATCH = int(os.getenv("CLEANUP_BATCH", "50"))  # Archived giveaways purged per transaction
+
+
+def delete_giveaway(db_session, giveaway_id):
+    """
+    Delete a giveaway and its unwon items, keeping won items. Does not
+    commit. Returns (deleted items, retained won items).
+    """
+    deleted = db_session.execute(
+        delete(Item).where(Item.giveaway_id == giveaway_id, Item.is_won == False)
+    ).rowcount
+    retained = db_session.execute(
+        select(func.count(Item.id)).where(Item.giveaway_id == giveaway_id, Item.is_won == True)
+    ).scalar()
+    # Nothing may reference the giveaway once it is gone; PostgreSQL enforces it
+    db_session.execute(update(Item).where(Item.giveaway_id == giveaway_id).values(giveaway_id=None))
+    db_session.execute(update(Winner).where(Winner.giveaway_id == giveaway_id).values(giveaway_id=None))
+    db_session.execute(delete(Giveaway).where(Giveaway.id == giveaway_id))
+    return deleted, retained
+
+
+def archive_giveaway(db_session, giveaway_id):
+    """Hide a giveaway until the cleanup worker deletes it. Does not commit."""
+    db_session.execute(
+        Giveaway.__table__.update()
+        .where(Giveaway.id == giveaway_id, Giveaway.visible())
+        .values(archived_at=datetime.datetime.utcnow())
+    )
+
+
+def purge_archived(db_session, batch_size=CLEANUP_BATCH):
+    """Delete up to `batch_size` archived giveaways, oldest first, in one transaction. Returns how many."""
+    giveaway_ids = db_session.execute(
+        select(Giveaway.id).where(Giveaway.archived_at.is_not(None))
+        .order_by(Giveaway.archived_at).limit(batch_size)
+    ).scalars().all()
+    for giveaway_id in giveaway_ids:
+        deleted, retained = delete_giveaway(db_session, giveaway_id)
+        log.info("Purged archived giveaway %s: deleted %d items, retained %d won items", giveaway_id, deleted, retained)
+    db_session.commit()
+    return len(giveaway_ids)
+
+
+def purge_all(session_factory=SessionLocal, batch_size=CLEANUP_BATCH):
+    """Purge archived giveaways batch by batch until none are left. Returns how many."""
+    total = 0
+    while True:
+        db_session = session_factory()
+        try:
+            purged = purge_archived(db_session, batch_size)
+        except Exception:
+            db_session.rollback()
+            raise
+        finally:
+            db_session.close()
+        total += purged
+        if purged < batch_size:
+            return total
+
+
+class CleanupWorker:
+    """
+    Background thread that purges archived giveaways every `interval`
+    seconds, or sooner when woken after an archive.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval=CLEANUP_INTERVAL, batch_size=CLEANUP_BATCH):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="giveaway-cleanup", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Purge soon, starting the thread if needed."""
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                purge_all(self.session_factory, self.batch_size)
+            except Exception as e:
+                log.error("Error purging archived giveaways, will retry: %s", e)
+
+
+if __name__ == "__main__":
+    from log_config import configure_logging
+
+    configure_logging()
+    print(f"Purged {purge_all()} archived giveaways.")
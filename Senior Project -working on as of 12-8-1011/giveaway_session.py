@@ -0,0 +1,108 @@
+import asyncio
+from collections import deque
+
+from entry_registry import EntryRegistry
+
+RECENT_WINNERS = 20  # Winners kept for the live status feed
+
+
+class GiveawaySession:
+    """
+    State for one running giveaway in one channel.
+
+    Entries are guarded by an asyncio.Lock. Every critical section is plain
+    synchronous work on the EntryRegistry, so nothing is ever awaited while
+    the lock is held and chat handling for other sessions keeps flowing.
+    """
+
+    def __init__(self, channel, giveaway):
+        self.channel = channel
+        self.giveaway = giveaway
+        self.giveaway_id = giveaway.id
+        self.entries = EntryRegistry()
+        self.task = None  # Task running the draw loop
+        self.current_item = None
+        self.items_left = 0
+        self.next_draw_at = None  # Unix time of the next draw, for the viewer countdown
+        self.winners = deque(maxlen=RECENT_WINNERS)  # (winner, item name), oldest first
+        self.lock = asyncio.Lock()
+
+    @property
+    def key(self):
+        return (self.channel, self.giveaway_id)
+
+    async def enter(self, name):
+        """Enter `name`. Returns False if they were already entered."""
+        async with self.lock:
+            return self.entries.add(name)
+
+    async def draw_winner(self):
+        """Pick a random entrant and remove them so they cannot win twice."""
+        async with self.lock:
+            return self.entries.pop_random()
+
+    async def pick_winner(self):
+        """Pick a random entrant without removing them, or None if empty."""
+        async with self.lock:
+            return self.entries.draw()
+
+    def status(self):
+        """Plain-data snapshot of the session for the live status feed."""
+        return {
+            "giveaway_id": self.giveaway_id,
+            "title": self.giveaway.title,
+            "channel": self.channel,
+            "active": True,
+            "entries": len(self.entries),
+            "current_item": self.current_item.name if self.current_item else None,
+            "items_left": self.items_left,
+            "next_draw_at": self.next_draw_at,
+            "winners": [{"winner": winner, "item": item} for winner, item in self.winners],
+        }
+
+    async def cancel(self):
+        """Cancel the draw loop and wait for it to clean up."""
+        if self.task and not self.task.done() and self.task is not asyncio.current_task():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def __repr__(self):
+        return f"<GiveawaySession channel={self.channel!r} giveaway_id={self.giveaway_id} entries={len(self.entries)}>"
+
+
+class SessionRegistry:
+    """Running giveaway sessions, keyed by (channel, giveaway_id), at most one per channel."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._by_channel = {}
+
+    def open(self, channel, giveaway):
+        """Create a session for `giveaway` in `channel`, or return None if the channel is busy."""
+        channel = channel.lower()
+        if channel in self._by_channel:
+            return None
+        session = GiveawaySession(channel, giveaway)
+        self._sessions[session.key] = session
+        self._by_channel[channel] = session
+        return session
+
+    def get(self, channel, giveaway_id=None):
+        """Session running in `channel`, optionally only if it is for `giveaway_id`."""
+        if giveaway_id is not None:
+            return self._sessions.get((channel.lower(), giveaway_id))
+        return self._by_channel.get(channel.lower())
+
+    def close(self, session):
+        if self._sessions.get(session.key) is session:
+            del self._sessions[session.key]
+            del self._by_channel[session.channel]
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,152 @@
+import csv
+import io
+import json
+import os
+
+from sqlalchemy import insert
+
+from models import Item
+
+IMPORT_CHUNK = int(os.getenv("IMPORT_CHUNK", "5000"))  # Rows per executemany
+MAX_REPORTED_ERRORS = 100  # Row errors returned to the user; the rest are only counted
+MAX_FIELD_LENGTH = 255
+FORMATS = ("csv", "jsonl", "text")
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []  # (line number, message), at most MAX_REPORTED_ERRORS
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def to_dict(self):
+        return {
+            "imported": self.imported,
+            "error_count": self.error_count,
+            "errors": [{"line": line, "error": message} for line, message in self.errors],
+        }
+
+
+def detect_format(filename):
+    """Guess the format from an upload's file name; anything unknown is pasted text."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "text"
+
+
+def _csv_rows(lines):
+    reader = csv.reader(lines)
+    for row in reader:
+        line = reader.line_num
+        if not row or not any(field.strip() for field in row):
+            continue
+        if line == 1 and [field.strip().lower() for field in row[:2]] == ["name", "code"]:
+            continue  # Header
+        if len(row) < 2:
+            yield line, None, "Expected name,code"
+            continue
+        yield line, (row[0], row[1]), None
+
+
+def _jsonl_rows(lines):
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError:
+            yield line, None, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield line, None, "Expected an object with name and code"
+            continue
+        yield line, (record.get("name"), record.get("code")), None
+
+
+def _text_rows(lines):
+    # One item per line: "name<TAB>code" or "name, code" (split on the last comma)
+    for line, text in enumerate(lines, start=1):
+        text = text.rstrip("\r\n")
+        if not text.strip():
+            continue
+        separator = "\t" if "\t" in text else ","
+        name, found, code = text.rpartition(separator)
+        if not found:
+            yield line, None, "Expected name and code separated by a comma or tab"
+            continue
+        yield line, (name, code), None
+
+
+_PARSERS = {"csv": _csv_rows, "jsonl": _jsonl_rows, "text": _text_rows}
+
+
+def parse_items(lines, fmt):
+    """
+    Parse an upload one line at a time, yielding (line, fields, error) where
+    fields is a {"name", "code"} dict for a valid row and error is None.
+    Rows follow the same rules as adding a single item: both fields are
+    required.
+    """
+    if fmt not in _PARSERS:
+        raise ValueError(f"Unknown import format: {fmt!r}")
+    for line, values, error in _PARSERS[fmt](lines):
+        if error:
+            yield line, None, error
+            continue
+        name, code = (str(value).strip() if value is not None else "" for value in values)
+        if not name:
+            yield line, None, "Item name is required."
+        elif not code:
+            yield line, None, "Item code is required."
+        elif len(name) > MAX_FIELD_LENGTH or len(code) > MAX_FIELD_LENGTH:
+            yield line, None, f"Name and code must be at most {MAX_FIELD_LENGTH} characters."
+        else:
+            yield line, {"name": name, "code": code}, None
+
+
+def import_items(db_session, giveaway_id, lines, fmt, chunk_size=None):
+    """
+    Insert every valid row of an upload into `giveaway_id` and report the
+    rest.
+
+    Rows are inserted with executemany in chunks of `chunk_size`, so memory
+    stays flat however large the upload is, and all chunks are committed as
+    one transaction: either every valid row is imported or none is.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK
+    result = ImportResult()
+    statement = insert(Item)
+    chunk = []
+    try:
+        for line, fields, error in parse_items(lines, fmt):
+            if error:
+                result.add_error(line, error)
+                continue
+            fields["giveaway_id"] = giveaway_id
+            fields["is_won"] = False
+            chunk.append(fields)
+            if len(chunk) >= chunk_size:
+                db_session.execute(statement, chunk)
+                result.imported += len(chunk)
+                chunk = []
+        if chunk:
+            db_session.execute(statement, chunk)
+            result.imported += len(chunk)
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    return result
+
+
+def text_stream(upload):
+    """Wrap an uploaded file so it can be read line by line as text."""
+    return io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import select, tuple_
+
+from models import Item
+
+ITEM_PAGE_SIZE = 50
+ITEM_MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, types):
+    """
+    Inverse of encode_cursor, for a cursor of one value of each of `types`.
+    Raises ValueError for a cursor we did not hand out.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    for value, kind in zip(values, types):
+        # bool is an int to isinstance, but never one we encoded
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise ValueError("Invalid cursor")
+    return values
+
+
+def item_page(db_session, giveaway_id, after=None, limit=ITEM_PAGE_SIZE, search=None, won=None, include_codes=False):
+    """
+    One page of a giveaway's items for the edit page.
+
+    Without `search`, items come in id order and the page is a range scan of
+    (giveaway_id, id). With `search`, items whose name starts with it come
+    in name order, read from the index on Item.name. `won` filters on won
+    status. Codes are secret and only selected when `include_codes` is set.
+    Returns (rows, next) where next is an opaque cursor, or None on the last
+    page.
+    """
+    limit = max(1, min(limit, ITEM_MAX_PAGE_SIZE))
+    columns = [Item.id, Item.name, Item.is_won, Item.winner_username]
+    if include_codes:
+        columns.append(Item.code)
+
+    query = select(*columns)
+    if won is not None:
+        query = query.where(Item.is_won == won)
+
+    if search:
+        # A prefix range rather than LIKE, so any backend can use the name index.
+        # "+ 0" keeps the planner off the giveaway_id indexes, which would have
+        # to sort every item of the giveaway to return them in name order.
+        query = query.where(
+            Item.giveaway_id + 0 == giveaway_id,
+            Item.name >= search,
+            Item.name < search + "\U0010ffff",
+        )
+        if after is not None:
+            name, item_id = decode_cursor(after, (str, int))
+            query = query.where(tuple_(Item.name, Item.id) > tuple_(name, item_id))
+        query = query.order_by(Item.name, Item.id)
+    else:
+        query = query.where(Item.giveaway_id == giveaway_id)
+        if after is not None:
+            (item_id,) = decode_cursor(after, (int,))
+            query = query.where(Item.id > item_id)
+        query = query.order_by(Item.id)
+
+    # One extra row tells us whether there is a next page
+    rows = db_session.execute(query.limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor([last.name, last.id] if search else [last.id])
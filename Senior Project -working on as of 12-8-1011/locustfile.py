@@ -1,16 +1,209 @@
-from locust import HttpUser, task
+"""
+Load test for the whole giveaway lifecycle.
 
-class WebsiteUser(HttpUser):
-    host = "http://localhost:5000"  # Replace with your Flask app's base URL
+Streamers log in, browse their dashboard, create, edit and delete
+giveaways, add and bulk-import items, and start and stop chatbots; viewers
+log in, watch giveaways and check their winnings. Logins go through the
+real OAuth callback against the fake Twitch, so every request after that
+is an authenticated one.
 
-    @task
+Setup, from the project directory:
+    python migrations.py
+    python -m benchmarks.load_seed 50 20 100 500
+    python -m tests.fake_twitch 5001
+    TWITCH_AUTH_URL=http://127.0.0.1:5001/oauth2 TWITCH_API_URL=http://127.0.0.1:5001/helix python app.py
+    python supervisor.py            # Only needed for the start/stop task
+
+Then:
+    locust --headless -u 200 -r 20 -t 5m --host http://localhost:5000
+    python -m benchmarks.load_compare load_results.json benchmarks/load_baseline.json
+
+Every run writes a JSON summary to LOAD_RESULTS. If LOAD_BASELINE names an
+existing baseline, Locust also exits with status 1 on a regression.
+Task weights can be changed with LOAD_WEIGHT_<TASK>, e.g.
+LOAD_WEIGHT_START_STOP=0 when no supervisor is running.
+"""
+import itertools
+import json
+import os
+import random
+
+from locust import HttpUser, between, events, task
+
+from benchmarks.load_compare import compare
+from benchmarks.load_seed import LOAD_CREATORS, LOAD_VIEWERS, creator_code, viewer_code
+
+LOAD_RESULTS = os.getenv("LOAD_RESULTS", "load_results.json")
+LOAD_BASELINE = os.getenv("LOAD_BASELINE", "")
+BULK_ITEMS = int(os.getenv("LOAD_BULK_ITEMS", "500"))  # Rows per bulk import
+
+_creators = itertools.count()
+_viewers = itertools.count()
+
+
+def weight(name, default):
+    return int(os.getenv(f"LOAD_WEIGHT_{name.upper()}", str(default)))
+
+
+class LoggedInUser(HttpUser):
+    abstract = True
+    wait_time = between(1, 3)
+
+    def log_in(self, code):
+        with self.client.get(
+            f"/auth/twitch/callback?code={code}", name="/auth/twitch/callback",
+            allow_redirects=False, catch_response=True,
+        ) as response:
+            if response.status_code != 302:
+                response.failure(f"Login failed with {response.status_code}")
+
+
+class StreamerUser(LoggedInUser):
+    weight = 1
+
+    def on_start(self):
+        # Each simulated streamer takes the next seeded creator, wrapping around
+        self.log_in(creator_code(next(_creators) % LOAD_CREATORS))
+        self.created = []  # Giveaways this user made; only these are deleted
+        self.giveaway_ids = []
+        self.refresh_giveaways()
+
+    def refresh_giveaways(self):
+        response = self.client.get("/api/dashboard?limit=200", name="/api/dashboard")
+        if response.ok:
+            self.giveaway_ids = [giveaway["id"] for giveaway in response.json()["giveaways"]]
+
+    def pick(self):
+        return random.choice(self.giveaway_ids) if self.giveaway_ids else None
+
+    @task(weight("dashboard", 10))
     def view_dashboard(self):
         self.client.get("/dashboard")
 
-    @task
+    @task(weight("giveaways", 4))
+    def list_giveaways(self):
+        self.client.get("/giveaways")
+
+    @task(weight("view", 5))
+    def view_giveaway(self):
+        giveaway_id = self.pick()
+        if giveaway_id:
+            self.client.get(f"/giveaway/view/{giveaway_id}", name="/giveaway/view/[id]")
+
+    @task(weight("edit", 4))
+    def edit_giveaway(self):
+        giveaway_id = self.pick()
+        if not giveaway_id:
+            return
+        self.client.get(f"/giveaway/edit/{giveaway_id}", name="/giveaway/edit/[id]")
+        self.client.get(f"/api/giveaway/{giveaway_id}/items", name="/api/giveaway/[id]/items")
+        if random.random() < 0.3:
+            self.client.post(
+                f"/giveaway/edit/{giveaway_id}", name="/giveaway/edit/[id] POST",
+                data={"title": f"Load Giveaway {giveaway_id}", "frequency": "60", "threshold": "0"},
+            )
+
+    @task(weight("add_item", 4))
+    def add_item(self):
+        giveaway_id = self.pick()
+        if giveaway_id:
+            self.client.post(
+                f"/giveaway/add-item/{giveaway_id}", name="/giveaway/add-item/[id]",
+                data={"name": "Load Added Item", "code": f"ADD-{random.getrandbits(32):08x}"},
+            )
+
+    @task(weight("bulk_items", 1))
+    def bulk_import(self):
+        giveaway_id = self.pick()
+        if giveaway_id:
+            items = "\n".join(f"Bulk Item {n}, BULK-{random.getrandbits(32):08x}" for n in range(BULK_ITEMS))
+            self.client.post(
+                f"/giveaway/import-items/{giveaway_id}", name="/giveaway/import-items/[id]",
+                data={"items": items, "format": "text"},
+            )
+
+    @task(weight("create", 2))
     def create_giveaway(self):
-        self.client.post("/giveaway/create", data={
+        response = self.client.post("/giveaway/create", data={
             "title": "Load Test Giveaway",
-            "frequency": "10",
-            "threshold": "5"
+            "frequency": "60",
+            "threshold": "0",
         })
+        if response.ok:
+            self.refresh_giveaways()
+            # The dashboard lists newest first
+            if self.giveaway_ids:
+                self.created.append(self.giveaway_ids[0])
+
+    @task(weight("delete", 1))
+    def delete_giveaway(self):
+        if self.created:
+            giveaway_id = self.created.pop(0)
+            self.client.post(f"/giveaway/delete/{giveaway_id}", name="/giveaway/delete/[id]")
+            if giveaway_id in self.giveaway_ids:
+                self.giveaway_ids.remove(giveaway_id)
+
+    @task(weight("start_stop", 1))
+    def start_and_stop(self):
+        giveaway_id = self.pick()
+        if not giveaway_id:
+            return
+        # 400 means another of this creator's giveaways already holds the channel
+        with self.client.post(
+            f"/giveaway/start/{giveaway_id}", name="/giveaway/start/[id]",
+            allow_redirects=False, catch_response=True,
+        ) as response:
+            if response.status_code in (302, 400):
+                response.success()
+        with self.client.post(
+            f"/giveaway/stop/{giveaway_id}", name="/giveaway/stop/[id]",
+            allow_redirects=False, catch_response=True,
+        ) as response:
+            if response.status_code in (302, 404):
+                response.success()
+
+
+class ViewerUser(LoggedInUser):
+    weight = 3
+
+    def on_start(self):
+        self.log_in(viewer_code(next(_viewers) % LOAD_VIEWERS))
+
+    @task(weight("winnings", 5))
+    def winnings(self):
+        self.client.get("/winnings")
+
+
+def summarize(stats):
+    """Machine-readable summary of a run: per request name, counts, throughput and latency in ms."""
+
+    def entry(stats_entry):
+        return {
+            "requests": stats_entry.num_requests,
+            "failures": stats_entry.num_failures,
+            "rps": round(stats_entry.total_rps, 2),
+            "avg": round(stats_entry.avg_response_time, 1),
+            "p50": stats_entry.get_response_time_percentile(0.5),
+            "p95": stats_entry.get_response_time_percentile(0.95),
+            "p99": stats_entry.get_response_time_percentile(0.99),
+        }
+
+    return {
+        "endpoints": {f"{method} {name}": entry(e) for (name, method), e in sorted(stats.entries.items())},
+        "total": entry(stats.total),
+    }
+
+
+@events.quitting.add_listener
+def write_results(environment, **kwargs):
+    results = summarize(environment.stats)
+    with open(LOAD_RESULTS, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    if LOAD_BASELINE and os.path.exists(LOAD_BASELINE):
+        with open(LOAD_BASELINE) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            environment.process_exit_code = 1
@@ -0,0 +1,139 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+# Standard LogRecord attributes; anything else on a record came from `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines (LOG_FORMAT=json) or as plain text with
+    `key=value` pairs for any fields passed through `extra=`.
+    """
+
+    def __init__(self, fmt="text"):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+        self.json = fmt == "json"
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+        if self.json:
+            payload = {
+                "ts": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                payload["exc"] = self.formatException(record.exc_info)
+            return json.dumps(payload, default=str)
+
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class SampledLogger:
+    """
+    Wraps a logger and keeps one in every `every` records below WARNING.
+
+    Use it for high-volume lines (one per chat message or entry) so busy
+    channels do not turn logging into the bottleneck. The sampling decision is
+    made before a LogRecord is built, so dropped lines cost one counter step.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, logger, every):
+        self.logger = logger
+        self.every = max(1, int(every))
+        self._counter = itertools.count()
+
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level, msg, *args, **kwargs):
+        if level < logging.WARNING:
+            if not self.logger.isEnabledFor(level) or next(self._counter) % self.every:
+                return
+        # Attribute the record to our caller rather than to this wrapper
+        kwargs.setdefault("stacklevel", 3)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller; drops records if the queue is full."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def sampled_logger(name, every):
+    """Return a SampledLogger for logger `name` keeping one in `every` records."""
+    return SampledLogger(logging.getLogger(name), every)
+
+
+def configure_logging(level=None, fmt=None, stream=None, queue_size=10000):
+    """
+    Route all logging through a background thread.
+
+    Records are put on a bounded queue by a QueueHandler on the root logger
+    and written by a QueueListener thread, so logging never waits on stderr.
+    Level and format default to the LOG_LEVEL and LOG_FORMAT environment
+    variables. Safe to call more than once; later calls replace the setup.
+    """
+    global _listener
+
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    fmt = fmt or os.getenv("LOG_FORMAT", "text")
+
+    stop_logging()
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(StructuredFormatter(fmt))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(_EnqueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return _listener
+
+
+def stop_logging():
+    """Flush and stop the background writer started by configure_logging."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
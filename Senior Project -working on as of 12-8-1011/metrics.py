@@ -0,0 +1,256 @@
+"""
+In-process metrics, rendered in the Prometheus text format.
+
+Counters, gauges and histograms live in a Registry and are updated from
+the hot paths with a dict lookup and a lock; nothing is sent anywhere. The
+web app serves the default registry at /metrics and the chatbot supervisor
+returns it for the "metrics" control command. Values that already exist
+elsewhere, such as pool or queue sizes, are read at scrape time by
+collector functions instead of being copied on every change.
+"""
+import asyncio
+import bisect
+import math
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)  # For per-request counts, e.g. queries
+EVENT_LOOP_INTERVAL = 0.5  # Seconds between event loop lag probes
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}  # Label values -> child
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, *values):
+        """The child for one combination of label values, created on first use."""
+        child = self._children.get(values)  # Fast path for string labels already seen
+        if child is not None:
+            return child
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values!r}")
+        values = tuple(str(value) for value in values)
+        with self._lock:
+            return self._children.setdefault(values, self._new_child())
+
+    def remove(self, *values):
+        """Forget one combination of label values, e.g. for a channel whose bot has stopped."""
+        self._children.pop(tuple(str(value) for value in values), None)
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels() first")
+        return self._children[()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """A count that only goes up. Rates such as messages per second come from rate() over it."""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount=1):
+        self._unlabelled().dec(amount)
+
+    def set(self, value):
+        self._unlabelled().set(value)
+
+
+class _Buckets:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def render(self, name, labelnames, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            le = _format_labels(labelnames, values, ("le", _format_value(float(bound))))
+            lines.append(f"{name}_bucket{le} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(float(bound) for bound in buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled().observe(value)
+
+
+class Registry:
+    """
+    The metrics of one process. `counter`, `gauge` and `histogram` return the
+    existing metric when the name is already registered, so modules can
+    declare what they update without coordinating import order.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def collector(self, func):
+        """
+        Register `func` to run at scrape time. It returns metrics built on the
+        spot (e.g. with `snapshot_gauge`) that are rendered once and dropped.
+        Usable as a decorator.
+        """
+        self._collectors.append(func)
+        return func
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for func in list(self._collectors):
+            for metric in func():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def snapshot_gauge(name, documentation, samples, labelnames=(), kind=Gauge):
+    """
+    A throwaway metric for a collector, from `samples`: a number, or a list
+    of (label values, number) pairs. Pass kind=Counter for running totals
+    kept elsewhere, such as a pool's checkout count.
+    """
+    metric = kind(name, documentation, labelnames)
+    if not labelnames:
+        metric.labels().set(samples)
+    else:
+        for values, value in samples:
+            metric.labels(*values).set(value)
+    return metric
+
+
+async def watch_event_loop(histogram, interval=EVENT_LOOP_INTERVAL):
+    """
+    Observe how late the running event loop wakes up from a sleep, every
+    `interval` seconds. Lag means a callback held the loop, delaying every
+    chat message and timer behind it. Runs until cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, loop.time() - start - interval))
+
+
+registry = Registry()
@@ -0,0 +1,118 @@
+"""
+Versioned schema migrations.
+
+The applied version is stored in the `schema_version` table. Each migration
+runs in its own transaction and is safe to re-run against a database whose
+schema was created by an older `Base.metadata.create_all`.
+
+Importing models no longer creates tables, so run `upgrade` once for every
+new database (SQLite or PostgreSQL, chosen by DATABASE_URL) and again after
+pulling schema changes.
+
+Usage, from the project directory:
+    python migrations.py            # upgrade to the latest version
+    python migrations.py status     # show the current version
+"""
+import logging
+import sys
+
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select, text
+
+from models import Base, Item, engine
+
+log = logging.getLogger("migrations")
+
+version_metadata = MetaData()
+schema_version = Table("schema_version", version_metadata, Column("version", Integer, nullable=False))
+
+# Indexes added for winner lookups on /winnings and /dashboard
+WINNER_INDEXES = {
+    "ix_items_winner_username_is_won",
+    "ix_items_giveaway_id_is_won",
+    "ix_giveaways_creator_id",
+    "ix_winners_user_id",
+    "ix_winners_giveaway_id",
+    "ix_winners_item_id",
+}
+
+
+def _create_tables(conn):
+    Base.metadata.create_all(bind=conn, checkfirst=True)
+
+
+def _add_winner_indexes(conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in WINNER_INDEXES:
+                index.create(bind=conn, checkfirst=True)
+
+
+def _add_giveaway_archive(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("giveaways")}
+    if "archived_at" not in columns:
+        conn.execute(text("ALTER TABLE giveaways ADD COLUMN archived_at TIMESTAMP"))
+
+
+def _add_item_page_index(conn):
+    for index in Item.__table__.indexes:
+        if index.name == "ix_items_giveaway_id_id":
+            index.create(bind=conn, checkfirst=True)
+
+
+def _add_draw_schedule(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("giveaways")}
+    if "next_draw_at" not in columns:
+        conn.execute(text("ALTER TABLE giveaways ADD COLUMN next_draw_at FLOAT"))
+
+
+MIGRATIONS = [
+    (1, "Create tables", _create_tables),
+    (2, "Index winner lookups", _add_winner_indexes),
+    (3, "Archive deleted giveaways", _add_giveaway_archive),
+    (4, "Index item pages", _add_item_page_index),
+    (5, "Persist draw schedules", _add_draw_schedule),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(select(schema_version.c.version)).scalar() or 0
+
+
+def upgrade(bind=engine, target=LATEST_VERSION):
+    """Apply every migration above the current version up to `target`. Returns the versions applied."""
+    applied = []
+    with bind.begin() as conn:
+        version_metadata.create_all(bind=conn, checkfirst=True)
+        version = current_version(conn)
+        if not conn.execute(select(schema_version.c.version)).first():
+            conn.execute(schema_version.insert().values(version=0))
+
+    for number, description, migrate in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        with bind.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_version.update().values(version=number))
+        log.info("Applied migration %s: %s", number, description)
+        applied.append(number)
+    return applied
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "status":
+        with engine.connect() as conn:
+            print(f"{engine.url.render_as_string(hide_password=True)}")
+            print(f"Schema version {current_version(conn)} (latest {LATEST_VERSION})")
+    elif command == "upgrade":
+        applied = upgrade()
+        for number, description, _ in MIGRATIONS:
+            if number in applied:
+                print(f"Applied migration {number}: {description}")
+        print(f"Schema is at version {LATEST_VERSION}.")
+    else:
+        sys.exit(f"Unknown command: {command}")
@@ -0,0 +1,353 @@
+"""
+Read-through cache for rendered pages.
+
+Entries expire after a TTL and the least recently used ones are evicted
+once the cache is full. Every entry carries a tag (for example "user:7")
+so writes can drop everything cached for that user in one call.
+
+Each tag also has a data version: an opaque token plus the time it last
+changed, bumped by every invalidation. Pages use it for ETag and
+Last-Modified headers, so an unchanged page can be answered with 304
+without touching the database.
+
+Backends, chosen with CACHE_BACKEND:
+    sqlite  one SQLite file shared by every process on the host, so gunicorn
+            workers and the chatbot supervisor see each other's
+            invalidations (default)
+    memory  per-process dict; only for a web app running without the
+            supervisor, whose winner commits would not reach it
+    none    no caching
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+log = logging.getLogger("cache")
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))  # Seconds an entry stays fresh
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+CACHE_PATH = os.getenv("CACHE_PATH", "page_cache.db")
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def to_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+
+class BaseCache:
+    """get/set/invalidate are implemented by backends; values must be JSON-serializable."""
+
+    name = "base"
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, clock=time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.stats = CacheStats()
+
+    def get_or_set(self, key, tag, produce, ttl=None):
+        """Return the cached value for `key`, or call `produce()`, cache it under `tag` and return it."""
+        try:
+            value = self.get(key)
+        except Exception as e:
+            # A broken cache must never take a page down; fall through to the database
+            self.stats.errors += 1
+            log.warning("Cache read failed for %s: %s", key, e)
+            return produce()
+        if value is not None:
+            self.stats.hits += 1
+            return value
+
+        self.stats.misses += 1
+        value = produce()
+        try:
+            self.set(key, tag, value, ttl)
+        except Exception as e:
+            self.stats.errors += 1
+            log.warning("Cache write failed for %s: %s", key, e)
+        return value
+
+    def version(self, tag):
+        """
+        (token, modified) for `tag`, where modified is a Unix time. A tag seen
+        for the first time gets a fresh random token.
+        """
+        try:
+            return self._version(tag)
+        except Exception as e:
+            self.stats.errors += 1
+            log.warning("Cache version lookup failed for %s: %s", tag, e)
+            return None
+
+    def _next_version(self, previous_modified=None):
+        # Last-Modified has one-second resolution; keep every bump in a later second
+        modified = self.clock()
+        if previous_modified is not None:
+            modified = max(modified, previous_modified + 1)
+        return uuid.uuid4().hex[:16], modified
+
+    def invalidate(self, *tags):
+        """Drop every entry cached under any of `tags` and bump their data versions."""
+        try:
+            self._invalidate(tags)
+        except Exception as e:
+            self.stats.errors += 1
+            log.warning("Cache invalidation failed for %s: %s", tags, e)
+            return
+        self.stats.invalidations += len(tags)
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, tag, value, ttl=None):
+        raise NotImplementedError
+
+    def _invalidate(self, tags):
+        raise NotImplementedError
+
+    def _version(self, tag):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def snapshot(self):
+        return {"backend": self.name, **self.stats.to_dict()}
+
+
+class NullCache(BaseCache):
+    name = "none"
+
+    def get(self, key):
+        return None
+
+    def set(self, key, tag, value, ttl=None):
+        pass
+
+    def _invalidate(self, tags):
+        pass
+
+    def _version(self, tag):
+        return None
+
+    def clear(self):
+        pass
+
+
+class MemoryCache(BaseCache):
+    """
+    In-process LRU cache; each gunicorn worker has its own. Versions are
+    kept apart from the entries and never expire, so a tag keeps its ETag
+    until it is invalidated; the least recently used ones are dropped once
+    there are more than four per entry.
+    """
+
+    name = "memory"
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._entries = OrderedDict()  # key -> (expires, tag, value), least recently used first
+        self._tags = {}  # tag -> set of keys
+        self._versions = OrderedDict()  # tag -> (token, modified), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, tag, value = entry
+            if expires <= self.clock():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, tag, value, ttl=None):
+        expires = self.clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires, tag, value)
+            self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def _remove(self, key):
+        _, tag, _ = self._entries.pop(key)
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def _invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                previous = self._versions.get(tag)
+                self._set_version(tag, previous[1] if previous else None)
+
+    def _version(self, tag):
+        with self._lock:
+            version = self._versions.get(tag)
+            if version is None:
+                return self._set_version(tag, None)
+            self._versions.move_to_end(tag)
+            return version
+
+    def _set_version(self, tag, previous_modified):
+        version = self._versions[tag] = self._next_version(previous_modified)
+        self._versions.move_to_end(tag)
+        while len(self._versions) > self.max_entries * 4:
+            self._versions.popitem(last=False)
+        return version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._versions.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in a SQLite file, shared by every process that opens it.
+    Each thread keeps its own connection. Hits refresh the entry's access
+    time, and sets evict the least recently accessed entries beyond
+    `max_entries`.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=CACHE_PATH, **options):
+        super().__init__(**options)
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, tag TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_tag ON cache (tag)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed ON cache (accessed)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS versions (tag TEXT PRIMARY KEY, token TEXT NOT NULL, modified REAL NOT NULL)"
+            )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        now = self.clock()
+        row = conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires <= now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key, tag, value, ttl=None):
+        conn = self._connection()
+        now = self.clock()
+        expires = now + (self.ttl if ttl is None else ttl)
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, tag, value, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, tag, json.dumps(value), expires, now),
+        )
+        excess = conn.execute("SELECT count(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)", (excess,)
+            )
+            self.stats.evictions += excess
+
+    def _invalidate(self, tags):
+        conn = self._connection()
+        conn.executemany("DELETE FROM cache WHERE tag = ?", [(tag,) for tag in tags])
+        for tag in tags:
+            row = conn.execute("SELECT modified FROM versions WHERE tag = ?", (tag,)).fetchone()
+            token, modified = self._next_version(row[0] if row else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO versions (tag, token, modified) VALUES (?, ?, ?)", (tag, token, modified)
+            )
+
+    def _version(self, tag):
+        conn = self._connection()
+        row = conn.execute("SELECT token, modified FROM versions WHERE tag = ?", (tag,)).fetchone()
+        if row is None:
+            # Another process may mint one at the same moment; whichever insert wins is used by both
+            conn.execute(
+                "INSERT OR IGNORE INTO versions (tag, token, modified) VALUES (?, ?, ?)",
+                (tag, *self._next_version()),
+            )
+            row = conn.execute("SELECT token, modified FROM versions WHERE tag = ?", (tag,)).fetchone()
+        return row[0], row[1]
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM cache")
+        conn.execute("DELETE FROM versions")
+
+    def __len__(self):
+        return self._connection().execute("SELECT count(*) FROM cache").fetchone()[0]
+
+
+def make_cache(backend=CACHE_BACKEND, **options):
+    if backend == "memory":
+        return MemoryCache(**options)
+    if backend == "sqlite":
+        return SQLiteCache(**options)
+    if backend == "none":
+        return NullCache(**options)
+    raise ValueError(f"Unknown cache backend: {backend!r}")
+
+
+def user_tag(user_id):
+    """Tag for everything cached for a creator: dashboard and giveaway list."""
+    return f"user:{user_id}"
+
+
+def winner_tag(username):
+    """Tag for a viewer's /winnings page."""
+    return f"winner:{username}"
+
+
+page_cache = make_cache()
@@ -0,0 +1,128 @@
+"""
+Developer profiling mode for the Flask app.
+
+With REQUEST_PROFILING=1 (or app.config["REQUEST_PROFILING"]) every request
+records each SQL statement it runs. Statements are grouped by shape, with
+literals and IN lists collapsed, and a shape that runs more than
+N_PLUS_ONE_THRESHOLD times in one request is logged as a likely N+1 lazy
+load. Responses carry X-Query-Count, X-Query-Time-Ms and X-Repeated-Queries.
+
+In this mode a request with ?profile=1 or an "X-Profile: 1" header also
+runs under cProfile and is dumped to PROFILE_DIR; the response's
+X-Profile-File header names the file. Asking for "pyinstrument" instead of
+1 writes an HTML report with pyinstrument, if it is installed.
+
+Profiling is off by default and costs nothing then.
+"""
+import cProfile
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+from flask import g, request
+
+from db_scope import query_metrics
+
+try:
+    import pyinstrument
+except ImportError:  # Optional; cProfile is always available
+    pyinstrument = None
+
+log = logging.getLogger("profiler")
+
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))  # Runs of one statement shape per request
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement):
+    """`statement` with literals, IN lists and spacing normalized, so repeats of one query compare equal."""
+    shape = _LITERALS.sub("?", statement)
+    shape = _PLACEHOLDER_LISTS.sub("(...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def repeated_statements(statements, threshold=N_PLUS_ONE_THRESHOLD):
+    """(shape, runs) for every shape run more than `threshold` times, most repeated first."""
+    counts = Counter(statement_shape(statement) for statement, _ in statements)
+    return [(shape, runs) for shape, runs in counts.most_common() if runs > threshold]
+
+
+def _enabled(app):
+    setting = app.config.get("REQUEST_PROFILING", REQUEST_PROFILING)
+    return str(setting).lower() not in ("", "0", "false", "off")
+
+
+def _profile_request():
+    return request.args.get("profile") or request.headers.get("X-Profile")
+
+
+def _profile_path(extension):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    endpoint = (request.endpoint or "unmatched").replace(".", "_")
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{time.time_ns() % 10**6:06d}.{extension}"
+    return os.path.join(PROFILE_DIR, name)
+
+
+def init_app(app):
+    @app.before_request
+    def start_recording():
+        if not _enabled(app):
+            return
+        g.profiler_queries = query_metrics.begin(statements=True)
+
+        mode = _profile_request()
+        if mode == "pyinstrument" and pyinstrument is not None:
+            g.profiler = pyinstrument.Profiler()
+            g.profiler.start()
+        elif mode:
+            if mode == "pyinstrument":
+                log.warning("pyinstrument is not installed; profiling %s with cProfile", request.path)
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def report(response):
+        queries = g.pop("profiler_queries", None)
+        if queries is None:
+            return response
+        query_metrics.end(queries)
+
+        profiler = g.pop("profiler", None)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = _profile_path("prof")
+            profiler.dump_stats(path)
+            response.headers["X-Profile-File"] = path
+        elif profiler is not None:
+            profiler.stop()
+            path = _profile_path("html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            response.headers["X-Profile-File"] = path
+
+        repeated = repeated_statements(queries.statements)
+        for shape, runs in repeated:
+            log.warning("Possible N+1: %s %s ran %d times: %s", request.method, request.path, runs, shape)
+        response.headers["X-Query-Count"] = str(queries.count)
+        response.headers["X-Query-Time-Ms"] = f"{queries.seconds * 1000:.1f}"
+        response.headers["X-Repeated-Queries"] = str(len(repeated))
+        return response
+
+    @app.teardown_request
+    def stop_recording(exc):
+        # A request that failed before producing a response never reached report()
+        queries = g.pop("profiler_queries", None)
+        if queries is not None:
+            query_metrics.end(queries)
+        profiler = g.pop("profiler", None)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        elif profiler is not None:
+            profiler.stop()
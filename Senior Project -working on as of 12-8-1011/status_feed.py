@@ -0,0 +1,343 @@
+"""
+Live giveaway status for view_giveaway.html: entry count, current item,
+countdown to the next draw and recent winners.
+
+The status lives in the chatbot's memory, so the feed never reads the
+database. It fans out in two stages:
+
+    supervisor  StatusPublisher samples each watched session every
+                STATUS_INTERVAL seconds and sends only the fields that
+                changed to every subscribed connection.
+    web app     StatusHub keeps one supervisor subscription per giveaway per
+                process and copies each message to every browser watching
+                it, as Server-Sent Events. Flask streams wait on a Listener
+                in a request thread; the ASGI mode's on an AsyncListener
+                in the event loop.
+
+So 2,000 viewers of one giveaway cost each web process one supervisor
+connection and one database read, to check the giveaway is live when its
+first viewer connects, and the supervisor one sample per interval. Viewers
+joining a feed that is already open are not checked again. Every subscriber
+has a bounded mailbox: a viewer that falls behind has its backlog replaced
+by a single full snapshot instead of holding an ever-growing queue.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import supervisor_client
+from supervisor_client import SupervisorError
+
+log = logging.getLogger("status")
+
+STATUS_INTERVAL = float(os.getenv("STATUS_INTERVAL", "1"))  # Seconds between samples; bursts of entries coalesce
+STATUS_QUEUE_SIZE = int(os.getenv("STATUS_QUEUE_SIZE", "32"))  # Messages a subscriber may fall behind
+STATUS_KEEPALIVE = float(os.getenv("STATUS_KEEPALIVE", "15"))  # Seconds of silence before a ping
+STATUS_RETRY = float(os.getenv("STATUS_RETRY", "3"))  # Seconds before reconnecting to the supervisor
+
+
+def diff(old, new):
+    """Fields of `new` that differ from `old`, as a dict."""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def snapshot_message(status):
+    return {"type": "snapshot", "status": status, "time": time.time()}
+
+
+def format_event(message):
+    """A status message as one Server-Sent Event."""
+    return f"event: {message['type']}\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
+
+
+class Mailbox:
+    """
+    Bounded queue of status messages for one subscriber. When it is full,
+    the queued deltas are dropped and replaced by a snapshot of the current
+    state, which is all a subscriber that fell behind needs.
+    """
+
+    def __init__(self, giveaway_id, maxsize=STATUS_QUEUE_SIZE):
+        self.giveaway_id = giveaway_id
+        self.maxsize = maxsize
+        self.dropped = 0  # Times the backlog was replaced by a snapshot
+        self._messages = deque()
+
+    def offer(self, message, snapshot):
+        if len(self._messages) >= self.maxsize:
+            self._messages.clear()
+            self.dropped += 1
+            message = snapshot
+        self._messages.append(message)
+
+    def __len__(self):
+        return len(self._messages)
+
+
+class Subscription(Mailbox):
+    """A supervisor connection watching one giveaway. Used inside the event loop."""
+
+    def __init__(self, giveaway_id, maxsize=STATUS_QUEUE_SIZE):
+        super().__init__(giveaway_id, maxsize)
+        self._ready = asyncio.Event()
+
+    def offer(self, message, snapshot):
+        super().offer(message, snapshot)
+        self._ready.set()
+
+    async def get(self):
+        while not self._messages:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._messages.popleft()
+
+
+class StatusPublisher:
+    """
+    Samples the status of every watched giveaway and publishes deltas to its
+    subscriptions. `lookup(giveaway_id)` returns the current status dict, or
+    None if the giveaway is not running. Sampling only runs while somebody
+    is subscribed.
+    """
+
+    def __init__(self, lookup, interval=STATUS_INTERVAL, queue_size=STATUS_QUEUE_SIZE):
+        self.lookup = lookup
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscriptions = {}  # giveaway_id -> set of Subscription
+        self._last = {}  # giveaway_id -> last published status
+        self._task = None
+
+    def current(self, giveaway_id):
+        return self.lookup(giveaway_id) or {"giveaway_id": giveaway_id, "active": False}
+
+    def subscribe(self, giveaway_id):
+        """Watch `giveaway_id`. The first message is always a full snapshot. Must be called inside the event loop."""
+        status = self._last.get(giveaway_id)
+        if status is None:
+            status = self._last[giveaway_id] = self.current(giveaway_id)
+        subscription = Subscription(giveaway_id, self.queue_size)
+        snapshot = snapshot_message(status)
+        subscription.offer(snapshot, snapshot)
+        self._subscriptions.setdefault(giveaway_id, set()).add(subscription)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscriptions = self._subscriptions.get(subscription.giveaway_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.giveaway_id]
+            self._last.pop(subscription.giveaway_id, None)
+        if not self._subscriptions and self._task:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self):
+        """Sample every watched giveaway once and send what changed."""
+        for giveaway_id, subscriptions in list(self._subscriptions.items()):
+            status = self.current(giveaway_id)
+            changes = diff(self._last.get(giveaway_id, {}), status)
+            if not changes:
+                continue
+            self._last[giveaway_id] = status
+            message = {"type": "delta", "changes": changes, "time": time.time()}
+            snapshot = snapshot_message(status)
+            for subscription in subscriptions:
+                subscription.offer(message, snapshot)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception as e:
+                log.error("Error sampling giveaway status: %s", e)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class Listener(Mailbox):
+    """One browser watching a giveaway. Used from the web app's request threads."""
+
+    def __init__(self, giveaway_id, maxsize=STATUS_QUEUE_SIZE):
+        super().__init__(giveaway_id, maxsize)
+        self._condition = threading.Condition()
+
+    def offer(self, message, snapshot):
+        with self._condition:
+            super().offer(message, snapshot)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Next message, or None if nothing arrived within `timeout` seconds."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._messages, timeout):
+                return None
+            return self._messages.popleft()
+
+
+class AsyncListener(Mailbox):
+    """
+    One browser watching a giveaway from a coroutine (the ASGI mode), so a
+    quiet stream holds no thread. Filled by the feed thread, read inside
+    the event loop it was created in.
+    """
+
+    def __init__(self, giveaway_id, maxsize=STATUS_QUEUE_SIZE):
+        super().__init__(giveaway_id, maxsize)
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._lock = threading.Lock()
+
+    def offer(self, message, snapshot):
+        with self._lock:
+            super().offer(message, snapshot)
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # The loop has closed; the stream is gone and will be unlistened
+
+    async def get(self, timeout=None):
+        """Next message, or None if nothing arrived within `timeout` seconds."""
+        while True:
+            with self._lock:
+                if self._messages:
+                    return self._messages.popleft()
+                self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+
+class StatusHub:
+    """
+    Web-side fan-out: one upstream feed thread per watched giveaway, shared by
+    every Listener of that giveaway in this process. A feed shuts down with
+    its connection once its last listener leaves.
+    """
+
+    def __init__(self, connect=None, queue_size=STATUS_QUEUE_SIZE, retry=STATUS_RETRY):
+        # Pings arrive every STATUS_KEEPALIVE seconds; twice that without one means the supervisor is gone
+        self.connect = connect or (
+            lambda giveaway_id: supervisor_client.subscribe(giveaway_id, timeout=STATUS_KEEPALIVE * 2)
+        )
+        self.queue_size = queue_size
+        self.retry = retry
+        self._feeds = {}  # giveaway_id -> _Feed
+        self._lock = threading.Lock()
+
+    def watching(self, giveaway_id):
+        """Whether a feed for `giveaway_id` is open, i.e. a viewer was already let in to watch it."""
+        with self._lock:
+            return giveaway_id in self._feeds
+
+    def listen(self, giveaway_id):
+        return self._add(Listener(giveaway_id, self.queue_size))
+
+    def listen_async(self, giveaway_id):
+        """An AsyncListener for `giveaway_id`. Must be called inside the event loop that reads it."""
+        return self._add(AsyncListener(giveaway_id, self.queue_size))
+
+    def _add(self, listener):
+        with self._lock:
+            feed = self._feeds.get(listener.giveaway_id)
+            if feed is None:
+                feed = self._feeds[listener.giveaway_id] = _Feed(self, listener.giveaway_id)
+                feed.start()
+            return feed.add_listener(listener)
+
+    def unlisten(self, listener):
+        with self._lock:
+            feed = self._feeds.get(listener.giveaway_id)
+            if feed is not None:
+                feed.listeners.discard(listener)
+
+    def _retire(self, feed):
+        """Remove `feed` if nobody is listening. Returns True if it should stop."""
+        with self._lock:
+            if feed.listeners:
+                return False
+            if self._feeds.get(feed.giveaway_id) is feed:
+                del self._feeds[feed.giveaway_id]
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "feeds": len(self._feeds),
+                "listeners": sum(len(feed.listeners) for feed in self._feeds.values()),
+                "dropped": sum(feed.dropped for feed in self._feeds.values()),
+            }
+
+
+class _Feed(threading.Thread):
+    def __init__(self, hub, giveaway_id):
+        super().__init__(name=f"status-feed-{giveaway_id}", daemon=True)
+        self.hub = hub
+        self.giveaway_id = giveaway_id
+        self.listeners = set()
+        self.status = None  # Latest full status, None until the first snapshot
+        self.dropped = 0
+
+    def add_listener(self, listener):
+        """Called with the hub lock held."""
+        if self.status is not None:
+            snapshot = snapshot_message(dict(self.status))
+            listener.offer(snapshot, snapshot)
+        self.listeners.add(listener)
+        return listener
+
+    def run(self):
+        while True:
+            try:
+                messages = self.hub.connect(self.giveaway_id)
+                try:
+                    for message in messages:
+                        if not self._deliver(message):
+                            return
+                finally:
+                    messages.close()
+            except SupervisorError as e:
+                log.warning("Status feed for giveaway %s lost: %s", self.giveaway_id, e)
+            except Exception as e:
+                # A broken socket or a garbled message must not strand the viewers on a dead feed
+                log.exception("Status feed for giveaway %s failed: %s", self.giveaway_id, e)
+            if self.hub._retire(self):
+                return
+            time.sleep(self.hub.retry)
+
+    def _deliver(self, message):
+        """Apply `message` and copy it to every listener. Returns False once nobody is listening."""
+        with self.hub._lock:
+            if not self.listeners:
+                if self.hub._feeds.get(self.giveaway_id) is self:
+                    del self.hub._feeds[self.giveaway_id]
+                return False
+            if message["type"] == "snapshot":
+                self.status = dict(message["status"])
+            elif message["type"] == "delta" and self.status is not None:
+                self.status.update(message["changes"])
+            else:
+                return True  # Pings only prove the connection is alive
+            snapshot = snapshot_message(dict(self.status))
+            for listener in self.listeners:
+                before = listener.dropped
+                listener.offer(message, snapshot)
+                self.dropped += listener.dropped - before
+            return True
@@ -0,0 +1,240 @@
+"""
+Long-lived process that hosts many giveaway chatbots as asyncio tasks.
+
+One Bot runs per Twitch channel. The Flask app controls it through a local
+TCP socket speaking newline-delimited JSON (see supervisor_client.py):
+
+    {"command": "start", "giveaway_id": 3, "channel": "somestreamer"}
+    {"command": "stop", "giveaway_id": 3}
+    {"command": "status"}
+    {"command": "metrics"}
+    {"command": "subscribe", "giveaway_id": 3}
+
+"metrics" replies {"ok": true, "metrics": "<Prometheus text>"} with the
+chatbots' message, entry, queue and event loop lag metrics (see metrics.py).
+
+"subscribe" turns the connection into a one-way feed of live status
+messages for the web app (see status_feed.py).
+
+On start it also restarts every giveaway whose draw loop was interrupted
+by a crash or a shutdown, on its stored draw schedule (see draw_scheduler.py).
+
+Run it once per node, next to the web app:
+    python supervisor.py
+"""
+import asyncio
+import json
+import logging
+import time
+
+from chatbot import Bot, CHANNEL, default_db, default_journal, event_loop_lag, forget_channel_metrics
+from log_config import configure_logging
+from metrics import registry, watch_event_loop
+from page_cache import page_cache
+from status_feed import STATUS_KEEPALIVE, StatusPublisher
+from supervisor_client import SUPERVISOR_HOST, SUPERVISOR_PORT
+
+log = logging.getLogger("supervisor")
+
+# How long a stop command waits for a bot to disconnect
+STOP_TIMEOUT = 10
+
+
+def check_page_cache(cache=page_cache):
+    """
+    Refuse a page cache private to this process: the winners and ended
+    giveaways it invalidates would stay cached in the web app until the TTL.
+    """
+    if cache.name == "memory":
+        raise RuntimeError("CACHE_BACKEND=memory cannot be invalidated from the supervisor; use sqlite")
+
+
+class Runner:
+    """A hosted bot and the task driving its Twitch connection."""
+
+    def __init__(self, giveaway_id, channel, bot):
+        self.giveaway_id = giveaway_id
+        self.channel = channel
+        self.bot = bot
+        self.task = None
+        self.started_at = time.time()
+
+    def status(self):
+        session = self.bot.sessions.get(self.channel, self.giveaway_id)
+        return {
+            "giveaway_id": self.giveaway_id,
+            "channel": self.channel,
+            "active": session is not None,
+            "entries": len(session.entries) if session else 0,
+            "uptime": round(time.time() - self.started_at, 1),
+        }
+
+
+class Supervisor:
+    def __init__(self, bot_factory=Bot, journal=default_journal, db=default_db):
+        self.bot_factory = bot_factory
+        self.journal = journal
+        self.db = db
+        self.runners = {}  # Channel name -> Runner
+        self.publisher = StatusPublisher(self.live_status)
+
+    def find_runner(self, giveaway_id):
+        for runner in self.runners.values():
+            if runner.giveaway_id == giveaway_id:
+                return runner
+        return None
+
+    def live_status(self, giveaway_id):
+        """Status of a running giveaway session for the live feed, or None."""
+        runner = self.find_runner(giveaway_id)
+        session = runner.bot.sessions.get(runner.channel, giveaway_id) if runner else None
+        return session.status() if session else None
+
+    def start(self, giveaway_id, channel=None):
+        """Start a bot for `giveaway_id` in `channel`. Must be called inside the event loop."""
+        channel = (channel or CHANNEL).lower()
+        if giveaway_id is None:
+            return {"ok": False, "error": "A giveaway ID is required."}
+        if self.find_runner(giveaway_id):
+            return {"ok": False, "error": "This giveaway is already running."}
+        if channel in self.runners:
+            return {"ok": False, "error": f"A chatbot is already running in #{channel}. Please wait for it to finish."}
+
+        bot = self.bot_factory(giveaway_id=giveaway_id, channel=channel, exit_on_shutdown=False)
+        runner = Runner(giveaway_id, channel, bot)
+        self.runners[channel] = runner
+        runner.task = asyncio.create_task(self._run(runner))
+        log.info("Started chatbot for giveaway %s in #%s", giveaway_id, channel)
+        return {"ok": True, **runner.status()}
+
+    async def _run(self, runner):
+        try:
+            await runner.bot.start()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.exception("Chatbot for giveaway %s crashed: %s", runner.giveaway_id, e)
+        finally:
+            # A bot that finished its giveaway frees the channel for the next one
+            if self.runners.get(runner.channel) is runner:
+                del self.runners[runner.channel]
+                forget_channel_metrics(runner.channel)
+            log.info("Chatbot for giveaway %s in #%s exited", runner.giveaway_id, runner.channel)
+
+    async def resume_scheduled(self):
+        """Start a bot for every giveaway left with a next draw time. Returns the giveaway IDs started."""
+        resumed = []
+        for giveaway_id, channel in await self.db.scheduled_giveaways():
+            result = self.start(giveaway_id, channel)
+            if result["ok"]:
+                resumed.append(giveaway_id)
+            else:
+                log.warning("Could not resume giveaway %s in #%s: %s", giveaway_id, channel, result["error"])
+        if resumed:
+            log.info("Resumed %d interrupted giveaways", len(resumed))
+        return resumed
+
+    async def stop(self, giveaway_id):
+        runner = self.find_runner(giveaway_id)
+        if not runner:
+            return {"ok": False, "error": "No running chatbot found for this giveaway."}
+
+        try:
+            await asyncio.wait_for(runner.bot.stop(), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning("Chatbot for giveaway %s did not stop in time; cancelling", giveaway_id)
+        if not runner.task.done():
+            runner.task.cancel()
+        try:
+            await runner.task
+        except asyncio.CancelledError:
+            pass
+        return {"ok": True, "giveaway_id": giveaway_id, "channel": runner.channel}
+
+    def status(self):
+        return {"ok": True, "runners": [runner.status() for runner in self.runners.values()]}
+
+    async def dispatch(self, request):
+        command = request.get("command")
+        if command == "start":
+            return self.start(request.get("giveaway_id"), request.get("channel"))
+        if command == "stop":
+            return await self.stop(request.get("giveaway_id"))
+        if command == "status":
+            return self.status()
+        if command == "metrics":
+            return {"ok": True, "metrics": registry.render()}
+        return {"ok": False, "error": f"Unknown command: {command!r}"}
+
+    async def handle_client(self, reader, writer):
+        """Serve control commands from one connection until it closes."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if request.get("command") == "subscribe":
+                        await self.stream_status(request.get("giveaway_id"), writer)
+                        break
+                    response = await self.dispatch(request)
+                except ValueError:
+                    response = {"ok": False, "error": "Malformed request."}
+                except Exception as e:
+                    log.exception("Error handling control command: %s", e)
+                    response = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def stream_status(self, giveaway_id, writer):
+        """Send status messages for `giveaway_id` until the client hangs up."""
+        subscription = self.publisher.subscribe(giveaway_id)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), STATUS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Lets both ends notice a dead connection on a quiet giveaway
+                    message = {"type": "ping"}
+                writer.write((json.dumps(message) + "\n").encode("utf-8"))
+                # A slow reader blocks here while its mailbox absorbs the backlog
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.publisher.unsubscribe(subscription)
+
+    async def shutdown(self):
+        """Stop every hosted bot and write out their remaining wins."""
+        for runner in list(self.runners.values()):
+            await self.stop(runner.giveaway_id)
+        await self.publisher.close()
+        if self.journal:
+            await self.journal.close()
+
+    async def serve(self, host=SUPERVISOR_HOST, port=SUPERVISOR_PORT):
+        check_page_cache()
+        if self.journal:
+            # Recover wins from a crashed run before taking new giveaways
+            await self.journal.start()
+        await self.resume_scheduled()
+        server = await asyncio.start_server(self.handle_client, host, port)
+        log.info("Chatbot supervisor listening on %s:%s", host, port)
+        lag_watcher = asyncio.create_task(watch_event_loop(event_loop_lag))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            lag_watcher.cancel()
+            await self.shutdown()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    try:
+        asyncio.run(Supervisor().serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import socket
+
+# Where the chatbot supervisor listens for control commands
+SUPERVISOR_HOST = os.getenv("SUPERVISOR_HOST", "127.0.0.1")
+SUPERVISOR_PORT = int(os.getenv("SUPERVISOR_PORT", "8765"))
+SUPERVISOR_TIMEOUT = float(os.getenv("SUPERVISOR_TIMEOUT", "5"))
+MAX_REPLY_BYTES = 16 * 2**20  # A metrics reply for many channels is far over asyncio's 64 KiB line limit
+
+
+class SupervisorError(Exception):
+    """The chatbot supervisor could not be reached or sent an invalid reply."""
+
+
+def send_command(command, host=None, port=None, timeout=None, **params):
+    """
+    Send one control command to the supervisor and return its JSON reply.
+
+    The protocol is one JSON object per line in each direction, e.g.
+    {"command": "start", "giveaway_id": 3, "channel": "somestreamer"}.
+    """
+    request = json.dumps({"command": command, **params}) + "\n"
+    address = (host or SUPERVISOR_HOST, port or SUPERVISOR_PORT)
+    try:
+        with socket.create_connection(address, timeout=timeout or SUPERVISOR_TIMEOUT) as conn:
+            conn.sendall(request.encode("utf-8"))
+            with conn.makefile("r", encoding="utf-8") as reader:
+                line = reader.readline()
+    except OSError as e:
+        raise SupervisorError(f"Chatbot supervisor unavailable: {e}") from e
+
+    if not line:
+        raise SupervisorError("Chatbot supervisor closed the connection without replying.")
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise SupervisorError(f"Invalid reply from chatbot supervisor: {line!r}") from e
+
+
+async def send_command_async(command, host=None, port=None, timeout=None, **params):
+    """send_command for asyncio code: waits for the supervisor without blocking the event loop."""
+    request = json.dumps({"command": command, **params}) + "\n"
+    timeout = timeout or SUPERVISOR_TIMEOUT
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host or SUPERVISOR_HOST, port or SUPERVISOR_PORT, limit=MAX_REPLY_BYTES), timeout
+        )
+        try:
+            writer.write(request.encode("utf-8"))
+            await writer.drain()
+            line = await asyncio.wait_for(reader.readline(), timeout)
+        finally:
+            writer.close()
+    except (OSError, asyncio.TimeoutError) as e:
+        raise SupervisorError(f"Chatbot supervisor unavailable: {e!r}") from e
+
+    if not line:
+        raise SupervisorError("Chatbot supervisor closed the connection without replying.")
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise SupervisorError(f"Invalid reply from chatbot supervisor: {line!r}") from e
+
+
+def subscribe(giveaway_id, host=None, port=None, timeout=None):
+    """
+    Watch a giveaway's live status. Yields one message dict per line: a full
+    snapshot first, then deltas and pings. Raises SupervisorError when the
+    connection fails, closes, or stays silent for `timeout` seconds.
+    """
+    request = json.dumps({"command": "subscribe", "giveaway_id": giveaway_id}) + "\n"
+    address = (host or SUPERVISOR_HOST, port or SUPERVISOR_PORT)
+    try:
+        with socket.create_connection(address, timeout=timeout or SUPERVISOR_TIMEOUT) as conn:
+            conn.sendall(request.encode("utf-8"))
+            with conn.makefile("r", encoding="utf-8") as reader:
+                for line in reader:
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        raise SupervisorError(f"Invalid status from chatbot supervisor: {line!r}") from e
+    except OSError as e:
+        raise SupervisorError(f"Chatbot supervisor unavailable: {e}") from e
+    raise SupervisorError("Chatbot supervisor closed the status feed.")
+
+
+def start_giveaway(giveaway_id, channel=None):
+    return send_command("start", giveaway_id=giveaway_id, channel=channel)
+
+
+def stop_giveaway(giveaway_id):
+    return send_command("stop", giveaway_id=giveaway_id)
+
+
+def status():
+    return send_command("status")
+
+
+def metrics():
+    return send_command("metrics")
@@ -1,3 +1,18 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Everything the app writes goes to a scratch directory, so tests never touch the
+# tracked giveaway.db or leave a journal, page cache or profiles in the project.
+# Set here because this package is imported before conftest.py and anything in it.
+_scratch = tempfile.mkdtemp(prefix="raffle-tests-")
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'giveaway.db')}")
+os.environ.setdefault("WIN_JOURNAL_PATH", os.path.join(_scratch, "wins.journal"))
+os.environ.setdefault("CACHE_PATH", os.path.join(_scratch, "page_cache.db"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_scratch, "profiles"))
+
 from models import Base, engine
 
 def setup_module(module):
@@ -1,6 +1,14 @@
+import os
+
 import pytest
+
+# Fail any test whose request ends with a database connection still checked out
+os.environ.setdefault("DB_LEAK_CHECK", "raise")
+
 from app import app as flask_app
+from sqlalchemy import text
 from models import Base, engine, SessionLocal
+from page_cache import page_cache
 
 
 @pytest.fixture(scope="session")
@@ -25,7 +33,8 @@ def db_setup():
 def reset_database(db_setup):
     session = SessionLocal()
     for table in reversed(Base.metadata.sorted_tables):
-        session.execute(f"DELETE FROM {table.name}")
+        session.execute(text(f"DELETE FROM {table.name}"))
     session.commit()
     session.close()
+    page_cache.clear()
 
@@ -0,0 +1,208 @@
+import asyncio
+import itertools
+import random
+import socket
+import threading
+import time
+from collections import deque
+
+from aiohttp import WSMsgType, web
+
+WELCOME = (  # Twitch's reply to NICK; twitchio waits for 001 and the end of the MOTD (376)
+    "001 {nick} :Welcome, GLHF!",
+    "002 {nick} :Your host is tmi.twitch.tv",
+    "003 {nick} :This server is rather new",
+    "004 {nick} :-",
+    "375 {nick} :-",
+    "372 {nick} :You are in a maze of twisty passages, all alike.",
+    "376 {nick} :>",
+)
+BATCH_INTERVAL = 0.01  # Seconds of due chat sent together in one websocket frame, as Twitch does under load
+BATCH_LINES = 500  # Largest frame, in lines
+CHAT_LINES = ("PogChamp", "let's go", "good luck everyone", "what are we giving away?", "hype hype hype", "LUL")
+
+
+def privmsg(channel, user, text, msg_id=0):
+    """A chat line as Twitch's IRC server sends it, with the tags twitchio reads."""
+    return (
+        f"@badge-info=;badges=;color=;display-name={user};emotes=;first-msg=0;flags=;id={msg_id};mod=0;"
+        f"returning-chatter=0;room-id=1;subscriber=0;tmi-sent-ts={int(time.time() * 1000)};turbo=0;"
+        f"user-id={msg_id};user-type= :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{channel} :{text}"
+    )
+
+
+def synthesize(enters_per_minute, chat_per_minute, users, seconds, seed=0):
+    """
+    Chat with Poisson arrivals: !enter from random viewers out of `users`
+    unique ones, mixed with normal chat. Yields (seconds from start, user,
+    text) lazily so long runs need no memory for the script.
+    """
+    rng = random.Random(seed)
+    rate = (enters_per_minute + chat_per_minute) / 60
+    enter_share = enters_per_minute / (enters_per_minute + chat_per_minute)
+    at = 0.0
+    while True:
+        at += rng.expovariate(rate)
+        if at >= seconds:
+            return
+        user = f"viewer_{rng.randrange(users)}"
+        yield at, user, "!enter" if rng.random() < enter_share else rng.choice(CHAT_LINES)
+
+
+def replay(path, per_minute):
+    """Chat from a file of "user: message" lines, evenly spaced at `per_minute`."""
+    interval = 60 / per_minute
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f):
+            line = line.rstrip("\n").split(" chatbot.messages ", 1)[-1]
+            user, sep, text = line.partition(": ")
+            if sep and user and " " not in user:
+                yield n * interval, user.lower(), text
+
+
+class FakeTMI:
+    """
+    A local stand-in for Twitch chat (irc-ws.chat.twitch.tv), serving the
+    IRC-over-websocket protocol on 127.0.0.1. It accepts any token, answers
+    the login, CAP, JOIN and PING lines twitchio sends, and lets tests and
+    load runs put chat into a channel with `say` or `play`.
+
+    Run the bot against it with TWITCH_IRC_URL set to `url`. Messages the
+    bot posts are kept in `bot_messages`; `sent` counts chat lines delivered.
+    """
+
+    def __init__(self, port=0):
+        self.sent = 0
+        self.bot_messages = deque(maxlen=1000)  # (channel, text) the bot posted, newest last
+        self._channels = {}  # Channel name -> set of joined websockets
+        self._joined = {}  # Channel name -> threading.Event
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self._socket = socket.socket()
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", port))
+        self.url = f"ws://127.0.0.1:{self._socket.getsockname()[1]}"
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+
+    def __enter__(self):
+        self._thread.start()
+        self._call(self._start())
+        return self
+
+    def __exit__(self, *exc):
+        self._call(self._stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def joined(self, channel):
+        """Event set once a client has joined `channel`."""
+        with self._lock:
+            return self._joined.setdefault(channel.lower(), threading.Event())
+
+    def wait_joined(self, channel, timeout=10):
+        return self.joined(channel).wait(timeout)
+
+    def say(self, channel, user, text):
+        """Post one chat line to `channel` as `user`."""
+        self._call(self._broadcast(channel.lower(), [privmsg(channel.lower(), user, text, next(self._ids))]))
+
+    def play(self, channel, events):
+        """
+        Post timed chat to `channel` from the server's own thread. `events`
+        yields (seconds from start, user, text) in time order and may be a
+        lazy generator. Returns a concurrent.futures.Future with the number
+        of lines sent; wrap it with asyncio.wrap_future to await it.
+        """
+        return asyncio.run_coroutine_threadsafe(self._play(channel.lower(), events), self._loop)
+
+    async def _play(self, channel, events):
+        start = self._loop.time()
+        batch = []
+        count = 0
+        for at, user, text in events:
+            wait = start + at - self._loop.time()
+            if batch and (wait > BATCH_INTERVAL or len(batch) >= BATCH_LINES):
+                await self._broadcast(channel, batch)
+                batch = []
+                wait = start + at - self._loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            batch.append(privmsg(channel, user, text, next(self._ids)))
+            count += 1
+        if batch:
+            await self._broadcast(channel, batch)
+        return count
+
+    async def _broadcast(self, channel, lines):
+        payload = "\r\n".join(lines) + "\r\n"
+        for ws in list(self._channels.get(channel, ())):
+            if not ws.closed:
+                await ws.send_str(payload)
+        self.sent += len(lines)
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/", self._serve)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.SockSite(self._runner, self._socket).start()
+
+    async def _stop(self):
+        for clients in self._channels.values():
+            for ws in list(clients):
+                await ws.close()
+        await self._runner.cleanup()
+
+    async def _serve(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        nick = None
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                for line in message.data.split("\r\n"):
+                    if line:
+                        nick = await self._handle(ws, nick, line) or nick
+        finally:
+            for clients in self._channels.values():
+                clients.discard(ws)
+        return ws
+
+    async def _handle(self, ws, nick, line):
+        command, _, rest = line.partition(" ")
+        if command == "NICK":
+            nick = rest.strip().lower()
+            await self._reply(ws, *(f":tmi.twitch.tv {welcome.format(nick=nick)}" for welcome in WELCOME))
+            return nick
+        if command == "CAP":
+            await self._reply(ws, f":tmi.twitch.tv CAP * ACK {rest.partition(' ')[2]}")
+        elif command == "PING":
+            await self._reply(ws, "PONG :tmi.twitch.tv")
+        elif command == "JOIN":
+            for channel in rest.strip().split(","):
+                channel = channel.lstrip("#").lower()
+                self._channels.setdefault(channel, set()).add(ws)
+                await self._reply(
+                    ws,
+                    f":{nick}!{nick}@{nick}.tmi.twitch.tv JOIN #{channel}",
+                    f":{nick}.tmi.twitch.tv 353 {nick} = #{channel} :{nick}",
+                    f":{nick}.tmi.twitch.tv 366 {nick} #{channel} :End of /NAMES list",
+                )
+                self.joined(channel).set()
+        elif command == "PART":
+            self._channels.get(rest.strip().lstrip("#").lower(), set()).discard(ws)
+        elif command == "PRIVMSG":
+            channel, _, text = rest.partition(" :")
+            self.bot_messages.append((channel.lstrip("#"), text))
+
+    async def _reply(self, ws, *lines):
+        await ws.send_str("\r\n".join(lines) + "\r\n")
+
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # Load tests open many connections at once
+
+
+class FakeTwitch:
+    """
+    A local stand-in for id.twitch.tv and api.twitch.tv, serving the token
+    and /users endpoints on 127.0.0.1. Tests queue failures with `fail_next`
+    and read back what was requested from `requests`.
+
+    With `auto_users`, any authorization code logs in as a user whose
+    twitch_id and login are the code itself, which is how the load tests
+    sign in thousands of users without registering each one.
+    """
+
+    def __init__(self, port=0, auto_users=False):
+        self.auto_users = auto_users
+        self.users = {}  # twitch_id -> user dict
+        self.user_tokens = {}  # user access token -> twitch_id
+        self.app_tokens = set()
+        self.token_lifetime = 3600
+        self.requests = []  # (method, path, params) of every request served
+        self.connections = set()  # Client ports seen; fewer than requests means keep-alive works
+        self.delay = 0
+        self._failures = []  # Statuses to answer the next requests with
+        self._lock = threading.Lock()
+        self._issued = 0
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                fake._handle(self, "GET")
+
+            def do_POST(self):
+                fake._handle(self, "POST")
+
+        self.server = _Server(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_user(self, twitch_id, login, token=None):
+        self.users[twitch_id] = {"id": twitch_id, "login": login, "display_name": login.title()}
+        if token:
+            self.user_tokens[token] = twitch_id
+
+    def fail_next(self, *statuses):
+        with self._lock:
+            self._failures.extend(statuses)
+
+    def revoke_app_tokens(self):
+        self.app_tokens.clear()
+
+    def count(self, method, path):
+        return sum(1 for m, p, _ in self.requests if m == method and p == path)
+
+    def _handle(self, handler, method):
+        url = urlparse(handler.path)
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length).decode() if length else ""
+        params = parse_qs(body if method == "POST" else url.query)
+        with self._lock:
+            self.requests.append((method, url.path, params))
+            self.connections.add(handler.client_address[1])
+            failure = self._failures.pop(0) if self._failures else None
+        if self.delay:
+            time.sleep(self.delay)
+        if failure:
+            return self._reply(handler, failure, {"error": "Fake failure"})
+
+        if method == "POST" and url.path == "/oauth2/token":
+            return self._token(handler, params)
+        if method == "GET" and url.path == "/helix/users":
+            return self._users(handler, params)
+        self._reply(handler, 404, {"error": "Not Found"})
+
+    def _token(self, handler, params):
+        grant = params.get("grant_type", [None])[0]
+        with self._lock:
+            self._issued += 1
+            issued = self._issued
+        if grant == "client_credentials":
+            token = f"app-token-{issued}"
+            self.app_tokens.add(token)
+            return self._reply(handler, 200, {"access_token": token, "expires_in": self.token_lifetime})
+        if grant == "authorization_code":
+            code = params.get("code", [""])[0]
+            if self.auto_users and code and code not in self.user_tokens:
+                self.add_user(code, code, token=code)
+            if code not in self.user_tokens:
+                return self._reply(handler, 400, {"message": "Invalid authorization code"})
+            return self._reply(handler, 200, {"access_token": code, "expires_in": self.token_lifetime})
+        self._reply(handler, 400, {"message": "Unsupported grant type"})
+
+    def _users(self, handler, params):
+        token = handler.headers.get("Authorization", "").removeprefix("Bearer ")
+        if token in self.user_tokens:
+            users = [self.users[self.user_tokens[token]]]
+        elif token in self.app_tokens:
+            users = [self.users[twitch_id] for twitch_id in params.get("id", []) if twitch_id in self.users]
+        else:
+            return self._reply(handler, 401, {"message": "Invalid OAuth token"})
+        self._reply(handler, 200, {"data": users})
+
+    def _reply(self, handler, status, body):
+        payload = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+
+if __name__ == "__main__":
+    import collections
+    import sys
+
+    # Twitch for load tests: run the app with TWITCH_AUTH_URL=http://127.0.0.1:5001/oauth2
+    # and TWITCH_API_URL=http://127.0.0.1:5001/helix
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5001
+    with FakeTwitch(port=port, auto_users=True) as twitch:
+        twitch.requests = collections.deque(maxlen=1000)  # Bounded for long runs
+        print(f"Fake Twitch listening on {twitch.url}; any code logs in as the user it names")
+        try:
+            twitch._thread.join()
+        except KeyboardInterrupt:
+            pass
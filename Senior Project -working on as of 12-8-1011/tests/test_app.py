@@ -3,7 +3,7 @@ import time
 from unittest.mock import patch
 import os
 import threading
-from app import app, SessionLocal, chatbot_processes, subprocess  # Import SessionLocal for database operations
+from app import app, SessionLocal  # Import SessionLocal for database operations
 from models import Giveaway, Item, User  # Import models for database objects
 
 
@@ -739,47 +739,97 @@ class TestApp(unittest.TestCase):
             self.assertEqual(response.status_code, 400)
             self.assertIn(b"Invalid input detected", response.data, msg=f"SQL Injection succeeded with payload: {payload}")
 
-    def test_stop_giveaway(self):
-        """Test stopping a giveaway."""
+    def add_owned_giveaway(self):
+        """Log in as user 1 and give them giveaway 1."""
+        db_session = SessionLocal()
+        db_session.add(User(id=1, twitch_id="owner_twitch_id", username="Owner"))
+        db_session.add(Giveaway(id=1, title="Owned", frequency=10, threshold=1, creator_id=1))
+        db_session.commit()
+        db_session.close()
         with self.client.session_transaction() as session:
             session["user_id"] = 1
+        return 1
 
-        giveaway_id = 1
-        lock_file = "chatbot.lock"
-
-        # Create a mock lock file
-        with open(lock_file, "w") as f:
-            f.write("12345")
-
-        # Mock chatbot process
-        chatbot_processes[giveaway_id] = subprocess.Popen(["python", "-c", "import time; time.sleep(1)"])
+    def test_stop_giveaway(self):
+        """Test stopping a giveaway that has no running chatbot."""
+        giveaway_id = self.add_owned_giveaway()
 
-        # Test stopping the giveaway
-        response = self.client.get(f"/giveaway/stop/{giveaway_id}")
+        # The supervisor reports that nothing is running for this giveaway
+        with patch("app.supervisor_client.stop_giveaway") as mock_stop:
+            mock_stop.return_value = {"ok": False, "error": "No running chatbot found for this giveaway."}
+            response = self.client.post(f"/giveaway/stop/{giveaway_id}")
         self.assertEqual(response.status_code, 404, "Expected 404 when stopping a non-existent chatbot.")
+        mock_stop.assert_called_once_with(giveaway_id)
+
+    def test_stop_running_giveaway(self):
+        """Test stopping a giveaway whose chatbot is running on the supervisor."""
+        self.add_owned_giveaway()
+        with patch("app.supervisor_client.stop_giveaway") as mock_stop:
+            mock_stop.return_value = {"ok": True, "giveaway_id": 1, "channel": "test_user"}
+            response = self.client.post("/giveaway/stop/1")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/dashboard", response.location)
+        self.assertEqual(self.client.get("/giveaway/view/1").status_code, 400)
 
-        # Verify lock file removal
-        self.assertFalse(os.path.exists(lock_file), "Lock file was not removed.")
+    def test_start_giveaway_uses_creator_channel(self):
+        """Test that starting a giveaway asks the supervisor for the creator's channel."""
+        db_session = SessionLocal()
+        creator = User(twitch_id="start_twitch_id", username="Start_Streamer")
+        db_session.add(creator)
+        db_session.commit()
+        giveaway = Giveaway(title="Start Test", frequency=10, threshold=1, creator_id=creator.id)
+        db_session.add(giveaway)
+        db_session.commit()
+        giveaway_id = giveaway.id
+        creator_id = creator.id
+        db_session.close()
+        with self.client.session_transaction() as session:
+            session["user_id"] = creator_id
 
-        # Cleanup any remaining processes
-        if giveaway_id in chatbot_processes:
-            chatbot_processes[giveaway_id].terminate()
-            chatbot_processes[giveaway_id].wait()
+        with patch("app.supervisor_client.start_giveaway") as mock_start:
+            mock_start.return_value = {"ok": True}
+            response = self.client.post(f"/giveaway/start/{giveaway_id}")
+        self.assertEqual(response.status_code, 302)
+        mock_start.assert_called_once_with(giveaway_id, "start_streamer")
+        # A running giveaway can be viewed
+        self.assertEqual(self.client.get(f"/giveaway/view/{giveaway_id}").status_code, 200)
+
+        # A second giveaway in the same channel is rejected by the supervisor
+        with patch("app.supervisor_client.start_giveaway") as mock_start:
+            mock_start.return_value = {"ok": False, "error": "A chatbot is already running in #start_streamer."}
+            response = self.client.post(f"/giveaway/start/{giveaway_id}")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"already running", response.data)
 
-    @patch("requests.post")
-    @patch("requests.get")
-    def test_twitch_api_failure(self, mock_get, mock_post):
+    def test_start_and_stop_require_the_owner(self):
+        """Only a giveaway's creator can start or stop its chatbot."""
+        self.add_owned_giveaway()
+        with self.client.session_transaction() as session:
+            session["user_id"] = 2
+        with patch("app.supervisor_client.start_giveaway") as mock_start, \
+                patch("app.supervisor_client.stop_giveaway") as mock_stop:
+            self.assertEqual(self.client.post("/giveaway/start/1").status_code, 403)
+            self.assertEqual(self.client.post("/giveaway/stop/1").status_code, 403)
+            with self.client.session_transaction() as session:
+                session.clear()
+            self.assertIn("/auth/twitch", self.client.post("/giveaway/start/1").location)
+            self.assertIn("/auth/twitch", self.client.post("/giveaway/stop/1").location)
+            # Starting and stopping change state, so a link or prefetch cannot trigger them
+            self.assertEqual(self.client.get("/giveaway/start/1").status_code, 405)
+            self.assertEqual(self.client.get("/giveaway/stop/1").status_code, 405)
+        mock_start.assert_not_called()
+        mock_stop.assert_not_called()
+
+    @patch("app.twitch.sleep")
+    @patch("app.twitch.http.request")
+    def test_twitch_api_failure(self, mock_request, mock_sleep):
         """Test handling of Twitch API failure during authentication."""
         with self.client.session_transaction() as session:
             session["user_id"] = None  # Simulate no logged-in user
 
-        # Mock the Twitch token exchange to return an error
-        mock_post.return_value.status_code = 500
-        mock_post.return_value.json.return_value = {"error": "Internal Server Error"}
-
-        # Mock the user data fetch to fail as well
-        mock_get.return_value.status_code = 500
-        mock_get.return_value.json.return_value = {"error": "Internal Server Error"}
+        # Mock every Twitch call (token exchange and user fetch) to return an error
+        mock_request.return_value.status_code = 500
+        mock_request.return_value.json.return_value = {"error": "Internal Server Error"}
 
         # Attempt to authenticate via Twitch
         response = self.client.get("/auth/twitch/callback?code=testcode")
@@ -0,0 +1,319 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from flask import Flask
+
+import asgi
+from app import SessionLocal
+from models import Giveaway, User
+from status_feed import StatusHub
+from supervisor_client import SupervisorError
+from tests.fake_twitch import FakeTwitch
+from tests.test_status_feed import FakeUpstream
+from twitch_api import AsyncTwitchClient
+
+
+async def call(app, method, path, query=b"", headers=(), body=b""):
+    """Send one HTTP request through an ASGI app; returns (status, headers, body)."""
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": list(headers),
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+    }
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    done = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    start = sent[0]
+    return (
+        start["status"],
+        {name.decode(): value.decode() for name, value in start["headers"]},
+        b"".join(message.get("body", b"") for message in sent[1:]),
+    )
+
+
+async def watch(app, path, headers=(), events=1):
+    """Open an event stream through an ASGI app and hang up after `events` events; returns (status, body)."""
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": list(headers)}
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+    enough = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        await enough.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if sum(message.get("body", b"").startswith(b"event:") for message in sent) >= events:
+            enough.set()
+
+    await app(scope, receive, send)
+    return sent[0]["status"], b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def cookie_from(headers):
+    return (b"cookie", headers["set-cookie"].split(";", 1)[0].encode())
+
+
+class TestAsgiApp(unittest.TestCase):
+    def setUp(self):
+        self.twitch = FakeTwitch().__enter__()
+        self.addCleanup(self.twitch.__exit__)
+        self.twitch.add_user("asgi-user", "asgistreamer", token="good-code")
+        client = AsyncTwitchClient(
+            "client-id", "secret",
+            auth_url=f"{self.twitch.url}/oauth2", api_url=f"{self.twitch.url}/helix",
+            sleep=AsyncMock(),
+        )
+        self.app = asgi.AsgiApp(twitch=client, wsgi_threads=4)
+
+    def run_app(self, coroutine):
+        async def main():
+            try:
+                return await coroutine
+            finally:
+                await self.app.close()
+
+        return asyncio.run(main())
+
+    def lifespan(self):
+        """Messages the app sends for a startup and, if it starts, a shutdown."""
+        messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(self.app({"type": "lifespan"}, receive, send))
+        return sent
+
+    def test_several_workers_need_a_secret_key(self):
+        with patch("asgi.web.SECRET_KEY", None), patch.dict("os.environ", {"WEB_CONCURRENCY": "4"}):
+            self.assertEqual(self.lifespan(), ["lifespan.startup.failed"])
+        with patch("asgi.web.SECRET_KEY", "shared"), patch.dict("os.environ", {"WEB_CONCURRENCY": "4"}):
+            self.assertEqual(self.lifespan(), ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+
+    def test_cleanup_worker_runs_with_the_app(self):
+        with patch("giveaway_cleanup.DELETE_MODE", "archive"), patch("asgi.web.cleanup_worker") as worker:
+            self.assertEqual(self.lifespan(), ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        worker.start.assert_called_once()
+        worker.stop.assert_called_once()
+
+    def test_flask_routes_are_bridged(self):
+        async def scenario():
+            return await call(self.app, "GET", "/"), await call(self.app, "GET", "/dashboard")
+
+        (status, _, body), (redirect_status, headers, _) = self.run_app(scenario())
+        self.assertEqual(status, 200)
+        self.assertIn(b"Log in with Twitch", body)
+        self.assertEqual(redirect_status, 302)
+        self.assertIn("/auth/twitch", headers["location"])
+
+    def test_flask_requests_run_in_parallel(self):
+        """Bridged requests each get a thread, up to the limit, instead of queuing for one."""
+        slow = Flask(__name__)
+
+        @slow.route("/slow")
+        def slow_view():
+            time.sleep(0.2)
+            return "done"
+
+        app = asgi.AsgiApp(flask_app=slow, twitch=self.app.twitch, wsgi_threads=4)
+
+        async def scenario():
+            return await asyncio.gather(*[call(app, "GET", "/slow") for _ in range(8)])
+
+        start = time.perf_counter()
+        responses = asyncio.run(scenario())
+        elapsed = time.perf_counter() - start
+        self.assertEqual([body for _, _, body in responses], [b"done"] * 8)
+        # Two rounds of four; one at a time would take 1.6 seconds
+        self.assertLess(elapsed, 1.0)
+
+    def test_login_session_is_shared_with_flask(self):
+        async def scenario():
+            status, headers, _ = await call(self.app, "GET", "/auth/twitch/callback", b"code=good-code")
+            self.assertEqual(status, 302)
+            self.assertEqual(headers["location"], "/dashboard")
+            # The cookie set by the async route logs the user in to the Flask routes
+            status, _, body = await call(self.app, "GET", "/dashboard", headers=[cookie_from(headers)])
+            return status, body
+
+        status, body = self.run_app(scenario())
+        self.assertEqual(status, 200)
+        db_session = SessionLocal()
+        try:
+            self.assertIsNotNone(db_session.query(User).filter_by(twitch_id="asgi-user").first())
+        finally:
+            db_session.close()
+
+    def test_bridged_form_post(self):
+        body = b"title=ASGI+Giveaway&frequency=10&threshold=0"
+
+        async def scenario():
+            _, headers, _ = await call(self.app, "GET", "/auth/twitch/callback", b"code=good-code")
+            return await call(
+                self.app, "POST", "/giveaway/create",
+                headers=[
+                    cookie_from(headers),
+                    (b"content-type", b"application/x-www-form-urlencoded"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+                body=body,
+            )
+
+        status, _, _ = self.run_app(scenario())
+        self.assertEqual(status, 302)
+        db_session = SessionLocal()
+        try:
+            self.assertIsNotNone(db_session.query(Giveaway).filter_by(title="ASGI Giveaway").first())
+        finally:
+            db_session.close()
+
+    def test_callback_errors(self):
+        async def scenario():
+            return (
+                await call(self.app, "GET", "/auth/twitch/callback"),
+                await call(self.app, "GET", "/auth/twitch/callback", b"code=bad"),
+            )
+
+        (status, _, body), (bad_status, _, bad_body) = self.run_app(scenario())
+        self.assertEqual(status, 400)
+        self.assertIn(b"missing code", body)
+        self.assertEqual(bad_status, 400)
+        self.assertIn(b"Twitch API error", bad_body)
+
+    def test_logins_wait_concurrently(self):
+        """Slow Twitch calls overlap instead of queuing for threads."""
+        self.twitch.delay = 0.2
+
+        async def scenario():
+            return await asyncio.gather(*[
+                call(self.app, "GET", "/auth/twitch/callback", b"code=good-code") for _ in range(20)
+            ])
+
+        start = time.perf_counter()
+        responses = self.run_app(scenario())
+        elapsed = time.perf_counter() - start
+        self.assertEqual([status for status, _, _ in responses], [302] * 20)
+        # Two Twitch calls each: 8 seconds one after another
+        self.assertLess(elapsed, 3)
+
+    def test_event_streams_hold_no_threads(self):
+        """More viewers than the bridge has threads all get their events."""
+        upstream = FakeUpstream()
+        self.app.status_hub = StatusHub(connect=upstream)
+        db_session = SessionLocal()
+        streamer = User(twitch_id="asgi-other", username="Someone_Else")
+        db_session.add(streamer)
+        db_session.commit()
+        running = Giveaway(title="Running", frequency=10, threshold=0, creator_id=streamer.id, active=True)
+        stopped = Giveaway(title="Stopped", frequency=10, threshold=0, creator_id=streamer.id)
+        db_session.add_all([running, stopped])
+        db_session.commit()
+        running_id, stopped_id = running.id, stopped.id
+        db_session.close()
+
+        async def scenario():
+            _, headers, _ = await call(self.app, "GET", "/auth/twitch/callback", b"code=good-code")
+            cookie = cookie_from(headers)
+            path = f"/giveaway/{running_id}/events"
+            self.assertEqual((await watch(self.app, path))[0], 401)
+            self.assertEqual((await watch(self.app, f"/giveaway/{stopped_id}/events", [cookie]))[0], 404)
+
+            upstream.push({"type": "snapshot", "status": {"giveaway_id": running_id, "entries": 2}, "time": 0})
+            return await asyncio.wait_for(asyncio.gather(*[watch(self.app, path, [cookie]) for _ in range(10)]), 5)
+
+        streams = self.run_app(scenario())
+        for status, body in streams:
+            self.assertEqual(status, 200)
+            self.assertTrue(body.startswith(b"retry:"))
+            self.assertIn(b'"entries":2', body)
+        self.assertEqual(self.app.status_hub.snapshot()["listeners"], 0)
+
+    def test_start_and_stop(self):
+        db_session = SessionLocal()
+        other = User(twitch_id="asgi-other", username="Someone_Else")
+        db_session.add(other)
+        db_session.commit()
+        theirs = Giveaway(title="Not mine", frequency=10, threshold=0, creator_id=other.id)
+        db_session.add(theirs)
+        db_session.commit()
+        theirs_id = theirs.id
+        db_session.close()
+
+        async def scenario():
+            _, headers, _ = await call(self.app, "GET", "/auth/twitch/callback", b"code=good-code")
+            cookie = cookie_from(headers)
+            db_session = SessionLocal()
+            creator = db_session.query(User).filter_by(twitch_id="asgi-user").one()
+            giveaway = Giveaway(title="Start", frequency=10, threshold=0, creator_id=creator.id)
+            db_session.add(giveaway)
+            db_session.commit()
+            giveaway_id = giveaway.id
+            db_session.close()
+
+            with patch("asgi.supervisor_client.send_command_async", new=AsyncMock(return_value={"ok": True})) as command:
+                status, headers, _ = await call(self.app, "POST", f"/giveaway/start/{giveaway_id}", headers=[cookie])
+                self.assertEqual((status, headers["location"]), (302, "/dashboard"))
+                command.assert_awaited_once_with("start", giveaway_id=giveaway_id, channel="asgistreamer")
+
+                # Only the creator may control a giveaway, and only once logged in
+                status, _, _ = await call(self.app, "POST", f"/giveaway/start/{theirs_id}", headers=[cookie])
+                self.assertEqual(status, 403)
+                status, _, _ = await call(self.app, "POST", f"/giveaway/stop/{theirs_id}", headers=[cookie])
+                self.assertEqual(status, 403)
+                status, headers, _ = await call(self.app, "POST", f"/giveaway/start/{giveaway_id}")
+                self.assertEqual((status, headers["location"]), (302, "/auth/twitch"))
+                for action in ("start", "stop"):
+                    status, _, _ = await call(self.app, "GET", f"/giveaway/{action}/{giveaway_id}", headers=[cookie])
+                    self.assertEqual(status, 405)
+                self.assertEqual(command.await_count, 1)
+
+                status, _, _ = await call(self.app, "POST", f"/giveaway/stop/{giveaway_id}", headers=[cookie])
+                self.assertEqual(status, 302)
+                command.assert_awaited_with("stop", giveaway_id=giveaway_id)
+
+            down = AsyncMock(side_effect=SupervisorError("down"))
+            with patch("asgi.supervisor_client.send_command_async", new=down):
+                status, _, _ = await call(self.app, "POST", f"/giveaway/start/{giveaway_id}", headers=[cookie])
+                self.assertEqual(status, 500)
+                status, _, _ = await call(self.app, "POST", f"/giveaway/stop/{giveaway_id}", headers=[cookie])
+                self.assertEqual(status, 404)
+
+            status, _, _ = await call(self.app, "POST", "/giveaway/start/999999", headers=[cookie])
+            self.assertEqual(status, 404)
+
+        self.run_app(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
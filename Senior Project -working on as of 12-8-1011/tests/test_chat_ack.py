@@ -0,0 +1,128 @@
+import asyncio
+import unittest
+
+from chat_ack import AckBatcher, ChatBudget, RateLimitedSender, MAX_MESSAGE_LENGTH
+
+
+class FakeChannel:
+    """Stands in for a twitchio Channel and records what was sent."""
+
+    def __init__(self, clock=None):
+        self.name = "fake_channel"
+        self.sent = []
+        self.clock = clock
+
+    async def send(self, message):
+        self.sent.append((self.clock.now if self.clock else None, message))
+
+
+class FakeClock:
+    """Virtual time: sleeping advances the clock instead of waiting."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        wake_at = self.now + seconds
+        await asyncio.sleep(0)
+        self.now = max(self.now, wake_at)
+
+
+class TestRateLimitedSender(unittest.TestCase):
+    def test_stays_within_budget(self):
+        """No 30 second window ever holds more than the budget."""
+        clock = FakeClock()
+        channel = FakeChannel(clock)
+        sender = RateLimitedSender(channel, messages_per_30s=5, clock=clock, sleep=clock.sleep)
+
+        async def run():
+            await asyncio.gather(*(sender.send(f"msg {i}") for i in range(12)))
+
+        asyncio.run(run())
+
+        times = [at for at, _ in channel.sent]
+        self.assertEqual([message for _, message in channel.sent], [f"msg {i}" for i in range(12)])
+        for i, start in enumerate(times):
+            in_window = [at for at in times[i:] if at < start + 30]
+            self.assertLessEqual(len(in_window), 5)
+        self.assertEqual(times[5], 30.0)
+        self.assertGreater(sender.waited, 0)
+
+    def test_channels_share_the_account_budget(self):
+        """Senders for different channels together stay within the account's budget, each in its own order."""
+        clock = FakeClock()
+        account = ChatBudget(messages_per_30s=5, clock=clock)
+        channels = [FakeChannel(clock) for _ in range(3)]
+        senders = [RateLimitedSender(channel, clock=clock, sleep=clock.sleep, account=account) for channel in channels]
+
+        async def run():
+            await asyncio.gather(*(sender.send(f"msg {i}") for i in range(4) for sender in senders))
+
+        asyncio.run(run())
+
+        for channel in channels:
+            self.assertEqual([message for _, message in channel.sent], [f"msg {i}" for i in range(4)])
+        times = sorted(at for channel in channels for at, _ in channel.sent)
+        for i, start in enumerate(times):
+            self.assertLessEqual(len([at for at in times[i:] if at < start + 30]), 5)
+        self.assertEqual(times[5], 30.0)
+        self.assertEqual(account.queued, 0)
+
+    def test_rejects_empty_budget(self):
+        with self.assertRaises(ValueError):
+            RateLimitedSender(FakeChannel(), messages_per_30s=0)
+
+
+class TestAckBatcher(unittest.TestCase):
+    def test_coalesces_entries_into_one_message(self):
+        """Entries inside one window produce a single aggregated message."""
+        channel = FakeChannel()
+
+        async def run():
+            batcher = AckBatcher(RateLimitedSender(channel), window=0.01, max_names=3)
+            for i in range(415):
+                batcher.add(f"user{i}")
+            await asyncio.sleep(0.05)
+            return batcher
+
+        batcher = asyncio.run(run())
+        self.assertEqual([message for _, message in channel.sent], ["Entered: user0, user1, user2 +412 more"])
+        self.assertEqual(batcher.pending, 0)
+
+    def test_new_window_after_flush(self):
+        """Entries after a flush are acknowledged in the next message."""
+        channel = FakeChannel()
+
+        async def run():
+            batcher = AckBatcher(RateLimitedSender(channel), window=0.01)
+            batcher.add("a")
+            await asyncio.sleep(0.05)
+            batcher.add("b")
+            batcher.add("c")
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+        self.assertEqual([message for _, message in channel.sent], ["Entered: a", "Entered: b, c"])
+
+    def test_close_flushes_pending(self):
+        """Closing sends queued names without waiting for the window."""
+        channel = FakeChannel()
+
+        async def run():
+            batcher = AckBatcher(RateLimitedSender(channel), window=60)
+            batcher.add("late_viewer")
+            await batcher.close()
+
+        asyncio.run(run())
+        self.assertEqual([message for _, message in channel.sent], ["Entered: late_viewer"])
+
+    def test_message_length_is_capped(self):
+        """Long names never push the message past Twitch's limit."""
+        batcher = AckBatcher(None, max_names=50)
+        names = ["x" * 25 + str(i) for i in range(50)]
+        message = batcher.format(names)
+        self.assertLessEqual(len(message), MAX_MESSAGE_LENGTH)
+        self.assertTrue(message.endswith("more"))
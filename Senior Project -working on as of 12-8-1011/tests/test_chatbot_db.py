@@ -0,0 +1,113 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from chatbot_db import ChatbotDB
+from models import Base, Giveaway, Item, User
+
+# Simulated fsync cost of one SQLite commit on a slow disk
+SLOW_COMMIT_SECONDS = 0.05
+
+
+async def measure_loop_lag(stop, interval=0.005):
+    """Return the worst delay between when a timer should fire and when it did."""
+    worst = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - expected)
+    return worst
+
+
+class TestChatbotDB(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        Base.metadata.create_all(bind=self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+
+        @event.listens_for(self.session_factory, "before_commit")
+        def slow_commit(db_session):
+            time.sleep(SLOW_COMMIT_SECONDS)
+
+        db_session = self.session_factory()
+        user = User(twitch_id="owner", username="owner")
+        db_session.add(user)
+        db_session.commit()
+        giveaway = Giveaway(title="Lag Test", frequency=1, threshold=0, creator_id=user.id)
+        db_session.add(giveaway)
+        db_session.commit()
+        db_session.add_all([Item(name=f"Key {i}", code=f"CODE{i}", giveaway_id=giveaway.id) for i in range(10)])
+        db_session.commit()
+        self.giveaway_id = giveaway.id
+        db_session.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def test_queries_return_detached_objects(self):
+        db = ChatbotDB(self.session_factory)
+
+        async def run():
+            giveaway = await db.get_giveaway(self.giveaway_id)
+            user, giveaways = await db.list_giveaways_for("owner")
+            missing, none = await db.list_giveaways_for("nobody")
+            items = await db.open_items(self.giveaway_id)
+            return giveaway, user, giveaways, missing, none, items
+
+        giveaway, user, giveaways, missing, none, items = asyncio.run(run())
+        db.close()
+        self.assertEqual(giveaway.title, "Lag Test")
+        self.assertEqual(user.username, "owner")
+        self.assertEqual([g.id for g in giveaways], [self.giveaway_id])
+        self.assertIsNone(missing)
+        self.assertEqual(none, [])
+        self.assertEqual(len(items), 10)
+
+    def test_winner_commits_do_not_stall_event_loop(self):
+        """Chat keeps being serviced while slow winner commits run."""
+        db = ChatbotDB(self.session_factory)
+
+        async def run():
+            stop = asyncio.Event()
+            lag = asyncio.create_task(measure_loop_lag(stop))
+            items = await db.open_items(self.giveaway_id)
+            start = time.perf_counter()
+            for i, item in enumerate(items):
+                await db.apply_wins([{"item_id": item.id, "giveaway_id": self.giveaway_id, "winner": f"winner_{i}"}])
+            elapsed = time.perf_counter() - start
+            stop.set()
+            return await lag, elapsed
+
+        worst_lag, elapsed = asyncio.run(run())
+        db.close()
+
+        # The commits themselves took at least 10 x SLOW_COMMIT_SECONDS...
+        self.assertGreaterEqual(elapsed, 10 * SLOW_COMMIT_SECONDS)
+        # ...but the loop was never held up for anything close to one commit
+        self.assertLess(worst_lag, SLOW_COMMIT_SECONDS / 2, f"Event loop lagged {worst_lag * 1000:.1f}ms")
+
+        db_session = self.session_factory()
+        won = db_session.query(Item).filter_by(giveaway_id=self.giveaway_id, is_won=True).count()
+        db_session.close()
+        self.assertEqual(won, 10)
+
+    def test_failed_query_is_rolled_back(self):
+        db = ChatbotDB(self.session_factory)
+
+        def explode(db_session):
+            db_session.add(User(twitch_id="dup", username="owner"))  # Duplicate username
+            db_session.commit()
+
+        with self.assertRaises(Exception):
+            asyncio.run(db.run(explode))
+        self.assertIsNotNone(asyncio.run(db.get_user_by_username("owner")))
+        db.close()
@@ -0,0 +1,85 @@
+import unittest
+
+from app import app, SessionLocal
+from dashboard_queries import dashboard_page, recent_winners
+from models import Giveaway, Item, User, Winner
+
+
+class TestDashboardPages(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        db_session = SessionLocal()
+        db_session.add_all([
+            User(id=1, twitch_id="t1", username="streamer"),
+            User(id=2, twitch_id="t2", username="other"),
+        ])
+        for giveaway_id in range(1, 8):
+            db_session.add(Giveaway(id=giveaway_id, title=f"Giveaway {giveaway_id}", frequency=10, threshold=0, creator_id=1))
+        db_session.add(Giveaway(id=8, title="Not mine", frequency=10, threshold=0, creator_id=2))
+        db_session.add_all([
+            Item(id=1, name="Key A", code="A", giveaway_id=7, is_won=True, winner_username="viewer"),
+            Item(id=2, name="Key B", code="B", giveaway_id=7, is_won=False),
+            Item(id=3, name="Key C", code="C", giveaway_id=7, is_won=False),
+            Item(id=4, name="Key D", code="D", giveaway_id=8, is_won=True, winner_username="viewer"),
+        ])
+        db_session.add_all([
+            Winner(user_id=None, giveaway_id=7, item_id=1),
+            Winner(user_id=None, giveaway_id=8, item_id=4),
+        ])
+        db_session.commit()
+        self.db_session = db_session
+
+    def tearDown(self):
+        self.db_session.close()
+
+    def test_counts(self):
+        rows, _ = dashboard_page(self.db_session, 1)
+        newest = rows[0]
+        self.assertEqual(newest.id, 7)
+        self.assertEqual((newest.item_count, newest.won_count, newest.winner_count), (3, 1, 1))
+        self.assertEqual((rows[-1].item_count, rows[-1].won_count, rows[-1].winner_count), (0, 0, 0))
+
+    def test_keyset_pages_cover_every_giveaway_once(self):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = dashboard_page(self.db_session, 1, after=cursor, limit=3)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [7, 6, 5, 4, 3, 2, 1])
+
+    def test_exact_page_has_no_next(self):
+        rows, cursor = dashboard_page(self.db_session, 1, limit=7)
+        self.assertEqual(len(rows), 7)
+        self.assertIsNone(cursor)
+
+    def test_recent_winners_for_page(self):
+        winners = recent_winners(self.db_session, [7, 6])
+        self.assertEqual([(w.item_name, w.giveaway_title) for w in winners], [("Key A", "Giveaway 7")])
+        self.assertEqual(recent_winners(self.db_session, []), [])
+
+    def test_api(self):
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+        page = self.client.get("/api/dashboard?limit=5").get_json()
+        self.assertEqual([g["id"] for g in page["giveaways"]], [7, 6, 5, 4, 3])
+        self.assertEqual(page["next"], 3)
+        page = self.client.get(f"/api/dashboard?limit=5&after={page['next']}").get_json()
+        self.assertEqual([g["id"] for g in page["giveaways"]], [2, 1])
+        self.assertIsNone(page["next"])
+
+    def test_api_requires_login(self):
+        self.assertEqual(self.client.get("/api/dashboard").status_code, 401)
+
+    def test_html_dashboard(self):
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+        response = self.client.get("/dashboard")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Items: 3 (1 won), Winners: 1", response.data)
+        self.assertIn(b"viewer won Key A in Giveaway 7", response.data)
+        self.assertNotIn(b"Not mine", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from flask import Flask
+from sqlalchemy import text
+
+import db_scope
+from app import app
+from db_scope import ConnectionLeakError, db_session, pool_metrics
+from models import engine
+
+
+class TestRequestScopedSession(unittest.TestCase):
+    def setUp(self):
+        self.leaked = []
+        self.sessions = []
+        self.app = Flask(__name__)
+        self.app.config["DB_LEAK_CHECK"] = "raise"
+        db_scope.init_app(self.app)
+
+        @self.app.route("/clean")
+        def clean():
+            first = db_session()
+            first.execute(text("SELECT 1"))
+            self.sessions.append(first)
+            return {"same": first is db_session()}
+
+        @self.app.route("/leak")
+        def leak():
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            self.leaked.append(connection)
+            return "ok"
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        for connection in self.leaked:
+            connection.close()
+
+    def test_one_session_per_request(self):
+        self.assertTrue(self.client.get("/clean").get_json()["same"])
+        self.client.get("/clean")
+        self.assertIsNot(self.sessions[0], self.sessions[1])
+
+    def test_session_returns_connection_on_teardown(self):
+        before = pool_metrics.checkouts
+        self.client.get("/clean")
+        self.assertGreater(pool_metrics.checkouts, before)
+        self.assertEqual(pool_metrics.held_since(before), [])
+
+    def test_leak_raises(self):
+        with self.assertRaises(ConnectionLeakError):
+            self.client.get("/leak")
+
+    def test_leak_warns(self):
+        self.app.config["DB_LEAK_CHECK"] = "warn"
+        leaks = pool_metrics.leaks
+        with self.assertLogs("db", "WARNING") as logs:
+            self.assertEqual(self.client.get("/leak").status_code, 200)
+        self.assertIn("/leak", logs.output[0])
+        self.assertEqual(pool_metrics.leaks, leaks + 1)
+
+
+class TestPoolMetrics(unittest.TestCase):
+    def test_health_endpoint(self):
+        app.test_client().get("/dashboard")
+        metrics = app.test_client().get("/health/db").get_json()
+        for key in ("checked_out", "peak_checked_out", "checkouts", "wait_avg_ms", "wait_max_ms", "leaks"):
+            self.assertIn(key, metrics)
+
+    def test_counts_checkouts_and_waits(self):
+        checkouts, checked_out = pool_metrics.checkouts, pool_metrics.checked_out
+        with engine.connect() as connection:
+            self.assertEqual(pool_metrics.checked_out, checked_out + 1)
+            connection.execute(text("SELECT 1"))
+        self.assertEqual(pool_metrics.checkouts, checkouts + 1)
+        self.assertEqual(pool_metrics.checked_out, checked_out)
+        self.assertGreater(pool_metrics.wait_total, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
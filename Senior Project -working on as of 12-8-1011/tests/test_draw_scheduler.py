@@ -0,0 +1,245 @@
+import asyncio
+import random
+import time
+import unittest
+from unittest.mock import patch
+
+import chatbot
+from app import app
+from chatbot_db import ChatbotDB
+from draw_scheduler import DrawScheduler, next_deadline
+from models import Giveaway, SessionLocal, User
+from supervisor import Supervisor
+from tests.test_supervisor import FakeBot
+
+# Slack allowed between a draw's deadline and when it actually ran
+TOLERANCE = 0.05
+
+
+class FakeGiveaway:
+    def __init__(self, frequency, next_draw_at=None):
+        self.id = 1
+        self.title = "Timed Giveaway"
+        self.frequency = frequency
+        self.next_draw_at = next_draw_at
+
+
+class FakeItem:
+    def __init__(self, id):
+        self.id = id
+        self.name = f"Key {id}"
+
+
+class FakeDB:
+    def __init__(self, items):
+        self.items = items
+        self.schedule = []  # Every next_draw_at written
+
+    async def open_items(self, giveaway_id):
+        return self.items
+
+    async def set_next_draw(self, giveaway_id, next_draw_at):
+        self.schedule.append(next_draw_at)
+
+    async def end_giveaway(self, giveaway_id):
+        self.schedule.append(None)
+
+
+class FakeJournal:
+    def __init__(self):
+        self.draws = []  # (item_id, winner, time drawn)
+
+    async def record(self, item_id, giveaway_id, winner):
+        self.draws.append((item_id, winner, time.time()))
+
+    async def flush(self):
+        pass
+
+
+class SlowChatBot(chatbot.Bot):
+    """A bot whose chat messages each take a while to send."""
+
+    async def announce(self, session, message):
+        await asyncio.sleep(0.05)
+
+
+class TestNextDeadline(unittest.TestCase):
+    def test_on_time_deadline_is_kept(self):
+        self.assertEqual(next_deadline(100, 60, now=90, policy="skip", grace=1), 100)
+        self.assertEqual(next_deadline(100, 60, now=100.5, policy="skip", grace=1), 100)
+
+    def test_skip_waits_for_next_slot_ahead(self):
+        self.assertEqual(next_deadline(100, 60, now=250, policy="skip", grace=1), 280)
+
+    def test_catch_up_keeps_every_slot(self):
+        self.assertEqual(next_deadline(100, 60, now=250, policy="catch_up", grace=1), 100)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            next_deadline(100, 60, now=250, policy="later")
+        with self.assertRaises(ValueError):
+            DrawScheduler(policy="later")
+
+
+class TestDrawScheduler(unittest.TestCase):
+    def test_one_timer_wakes_thousands_in_order(self):
+        scheduler = DrawScheduler()
+        woken = []
+
+        async def wait(deadline):
+            await scheduler.wait_until(deadline)
+            woken.append((deadline, time.time()))
+
+        async def main():
+            start = time.time()
+            deadlines = [start + random.uniform(0.05, 0.3) for _ in range(2000)]
+            waiters = [asyncio.create_task(wait(deadline)) for deadline in deadlines]
+            await asyncio.sleep(0.01)
+            timers = [task for task in asyncio.all_tasks() if task.get_name() == "draw-scheduler"]
+            self.assertEqual(len(timers), 1)
+            await asyncio.gather(*waiters)
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.pending, 0)
+        self.assertEqual([deadline for deadline, _ in woken], sorted(deadline for deadline, _ in woken))
+        for deadline, at in woken:
+            self.assertGreaterEqual(at, deadline)
+            self.assertLess(at - deadline, 0.1)
+
+    def test_earlier_deadline_wakes_a_sleeping_timer(self):
+        scheduler = DrawScheduler()
+
+        async def main():
+            later = asyncio.create_task(scheduler.wait_until(time.time() + 60))
+            await asyncio.sleep(0.01)
+            lateness = await asyncio.wait_for(scheduler.wait_until(time.time() + 0.05), 1)
+            later.cancel()
+            # A cancelled wait does not hold up the ones behind it
+            await asyncio.wait_for(scheduler.wait_until(time.time() + 0.05), 1)
+            return lateness
+
+        self.assertLess(asyncio.run(main()), TOLERANCE)
+
+
+class TestDrawLoop(unittest.TestCase):
+    def run_giveaway(self, giveaway, items, scheduler):
+        db = FakeDB([FakeItem(item_id) for item_id in range(1, items + 1)])
+        journal = FakeJournal()
+
+        async def main():
+            bot = SlowChatBot(channel="timed", exit_on_shutdown=False, db=db, journal=journal, scheduler=scheduler)
+            session = bot.sessions.open("timed", giveaway)
+            for n in range(items):
+                await session.enter(f"viewer_{n}")
+            started = time.time()
+            session.task = asyncio.create_task(bot.manage_giveaways(session))
+            await asyncio.wait_for(session.task, 10)
+            return started
+
+        started = asyncio.run(main())
+        return started, [at for _, _, at in journal.draws], db.schedule
+
+    def test_draws_do_not_drift(self):
+        """Announcement time does not push later draws back."""
+        started, draws, schedule = self.run_giveaway(FakeGiveaway(frequency=0.2), items=5, scheduler=DrawScheduler())
+        self.assertEqual(len(draws), 5)
+        for n, at in enumerate(draws, start=1):
+            self.assertAlmostEqual(at, started + n * 0.2, delta=TOLERANCE)
+        # Each deadline is stored before waiting for it, and cleared when the giveaway ends
+        self.assertEqual(len(schedule), 6)
+        for n, deadline in enumerate(schedule[:-1], start=1):
+            self.assertAlmostEqual(deadline, started + n * 0.2, delta=TOLERANCE)
+        self.assertIsNone(schedule[-1])
+
+    def test_resumes_stored_schedule(self):
+        giveaway = FakeGiveaway(frequency=60, next_draw_at=time.time() + 0.1)
+        started, draws, _ = self.run_giveaway(giveaway, items=1, scheduler=DrawScheduler())
+        self.assertAlmostEqual(draws[0], giveaway.next_draw_at, delta=TOLERANCE)
+
+    def test_lag_policies_after_downtime(self):
+        """Resuming two slots late, catch_up draws the missed items at once and skip waits for the grid."""
+        missed = time.time() - 0.6
+        scheduler = DrawScheduler(policy="catch_up", grace=0.05)
+        started, draws, _ = self.run_giveaway(FakeGiveaway(0.5, missed), items=3, scheduler=scheduler)
+        self.assertLess(draws[1] - started, 0.2)
+        self.assertAlmostEqual(draws[2], missed + 1.0, delta=TOLERANCE)
+
+        missed = time.time() - 0.6
+        scheduler = DrawScheduler(policy="skip", grace=0.05)
+        started, draws, _ = self.run_giveaway(FakeGiveaway(0.5, missed), items=3, scheduler=scheduler)
+        for n, at in enumerate(draws, start=2):
+            self.assertAlmostEqual(at, missed + n * 0.5, delta=TOLERANCE)
+
+
+class TestStoredSchedules(unittest.TestCase):
+    def setUp(self):
+        db_session = SessionLocal()
+        db_session.add(User(id=1, twitch_id="t1", username="Streamer"))
+        db_session.add(Giveaway(id=1, title="Interrupted", frequency=60, threshold=0, creator_id=1, active=True))
+        db_session.add(Giveaway(id=2, title="Idle", frequency=60, threshold=0, creator_id=1))
+        db_session.commit()
+        db_session.close()
+
+    def next_draw_at(self, giveaway_id):
+        db_session = SessionLocal()
+        try:
+            return db_session.get(Giveaway, giveaway_id).next_draw_at
+        finally:
+            db_session.close()
+
+    def test_supervisor_resumes_interrupted_giveaways(self):
+        db = ChatbotDB()
+
+        async def main():
+            await db.set_next_draw(1, 1234.5)
+            supervisor = Supervisor(bot_factory=FakeBot, journal=None, db=db)
+            resumed = await supervisor.resume_scheduled()
+            channels = list(supervisor.runners)
+            await supervisor.shutdown()
+            return resumed, channels
+
+        self.assertEqual(asyncio.run(main()), ([1], ["streamer"]))
+        self.assertEqual(self.next_draw_at(1), 1234.5)
+        db.close()
+
+    def test_stopping_forgets_the_schedule(self):
+        asyncio.run(ChatbotDB().set_next_draw(1, 1234.5))
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = 1
+        with patch("app.supervisor_client.stop_giveaway", return_value={"ok": True}):
+            self.assertEqual(client.post("/giveaway/stop/1").status_code, 302)
+        self.assertIsNone(self.next_draw_at(1))
+
+    def test_failed_stop_keeps_the_schedule(self):
+        """A stop the supervisor did not carry out leaves the giveaway as it was."""
+        asyncio.run(ChatbotDB().set_next_draw(1, 1234.5))
+        client = app.test_client()
+        with patch("app.supervisor_client.stop_giveaway", return_value={"ok": False}):
+            # Not logged in
+            self.assertEqual(client.post("/giveaway/stop/1").status_code, 302)
+            with client.session_transaction() as session:
+                session["user_id"] = 1
+            self.assertEqual(client.post("/giveaway/stop/1").status_code, 404)
+        self.assertEqual(self.next_draw_at(1), 1234.5)
+        db_session = SessionLocal()
+        self.assertTrue(db_session.get(Giveaway, 1).active)
+        db_session.close()
+
+    def test_ended_giveaway_is_inactive(self):
+        db = ChatbotDB()
+
+        async def main():
+            await db.set_next_draw(1, 1234.5)
+            await db.end_giveaway(1)
+            return await db.scheduled_giveaways()
+
+        self.assertEqual(asyncio.run(main()), [])
+        db_session = SessionLocal()
+        self.assertFalse(db_session.get(Giveaway, 1).active)
+        db_session.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
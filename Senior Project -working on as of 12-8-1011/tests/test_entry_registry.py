@@ -0,0 +1,47 @@
+import random
+import unittest
+from collections import Counter
+
+from entry_registry import EntryRegistry
+
+
+class TestEntryRegistry(unittest.TestCase):
+    def test_add_rejects_duplicates(self):
+        """Entering twice only counts once."""
+        entries = EntryRegistry()
+        self.assertTrue(entries.add("alice"))
+        self.assertFalse(entries.add("alice"))
+        self.assertEqual(len(entries), 1)
+        self.assertIn("alice", entries)
+
+    def test_remove_keeps_index_consistent(self):
+        """Removing from the middle moves the last entrant into its slot."""
+        entries = EntryRegistry(["a", "b", "c", "d"])
+        self.assertTrue(entries.remove("b"))
+        self.assertFalse(entries.remove("b"))
+        self.assertEqual(sorted(entries), ["a", "c", "d"])
+        for name in ["a", "c", "d"]:
+            self.assertTrue(entries.remove(name))
+        self.assertEqual(len(entries), 0)
+        self.assertFalse(entries)
+
+    def test_draw_on_empty_registry(self):
+        """Drawing with no entrants returns None."""
+        entries = EntryRegistry()
+        self.assertIsNone(entries.draw())
+        self.assertIsNone(entries.pop_random())
+
+    def test_pop_random_drains_every_entrant_once(self):
+        """Each entrant can win at most once."""
+        names = [f"user_{i}" for i in range(500)]
+        entries = EntryRegistry(names, rng=random.Random(7))
+        winners = [entries.pop_random() for _ in range(len(names))]
+        self.assertEqual(sorted(winners), sorted(names))
+        self.assertIsNone(entries.pop_random())
+
+    def test_draw_is_uniform(self):
+        """Every entrant has roughly the same chance of being drawn."""
+        entries = EntryRegistry(["a", "b", "c", "d"], rng=random.Random(3))
+        counts = Counter(entries.draw() for _ in range(8000))
+        for name in "abcd":
+            self.assertAlmostEqual(counts[name] / 8000, 0.25, delta=0.03)
@@ -0,0 +1,129 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import giveaway_cleanup
+from app import app, SessionLocal, start_cleanup_worker
+from models import Giveaway, Item, User, Winner
+
+
+class TestGiveawayCleanup(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+        db_session = SessionLocal()
+        db_session.add(User(id=1, twitch_id="t1", username="streamer"))
+        db_session.add_all([
+            Giveaway(id=1, title="Big", frequency=10, threshold=0, creator_id=1),
+            Giveaway(id=2, title="Other", frequency=10, threshold=0, creator_id=1),
+        ])
+        db_session.add_all([Item(name=f"Key {n}", code="C", giveaway_id=1, is_won=False) for n in range(30)])
+        db_session.add_all([
+            Item(name=f"Won {n}", code="C", giveaway_id=1, is_won=True, winner_username="viewer") for n in range(3)
+        ])
+        db_session.add(Item(name="Keep", code="C", giveaway_id=2, is_won=False))
+        db_session.flush()
+        for item in db_session.query(Item).filter_by(is_won=True):
+            db_session.add(Winner(giveaway_id=1, item_id=item.id))
+        db_session.commit()
+        db_session.close()
+
+    def items_by_giveaway(self):
+        db_session = SessionLocal()
+        counts = {}
+        for item in db_session.query(Item):
+            counts[(item.giveaway_id, item.is_won)] = counts.get((item.giveaway_id, item.is_won), 0) + 1
+        giveaways = {g.id: g.archived_at for g in db_session.query(Giveaway)}
+        db_session.close()
+        return counts, giveaways
+
+    def test_delete_giveaway(self):
+        db_session = SessionLocal()
+        self.assertEqual(giveaway_cleanup.delete_giveaway(db_session, 1), (30, 3))
+        db_session.commit()
+        db_session.close()
+        counts, giveaways = self.items_by_giveaway()
+        self.assertEqual(counts, {(None, True): 3, (2, False): 1})
+        self.assertEqual(list(giveaways), [2])
+
+        # Winner rows stay, but no longer point at the deleted giveaway
+        db_session = SessionLocal()
+        winners = db_session.query(Winner).all()
+        self.assertEqual(len(winners), 3)
+        self.assertEqual({winner.giveaway_id for winner in winners}, {None})
+        self.assertEqual(db_session.query(Item).filter(Item.id.in_([w.item_id for w in winners])).count(), 3)
+        db_session.close()
+
+    def test_hard_delete_route(self):
+        with self.assertLogs(app.logger, "INFO") as logs:
+            response = self.client.post("/giveaway/delete/1")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("removed 30 items, retained 3 won items", logs.output[-1])
+        counts, giveaways = self.items_by_giveaway()
+        self.assertEqual(counts, {(None, True): 3, (2, False): 1})
+
+    def test_archive_route_hides_then_purges(self):
+        with patch.object(giveaway_cleanup, "DELETE_MODE", "archive"), \
+                patch("app.cleanup_worker") as worker:
+            response = self.client.post("/giveaway/delete/1")
+        self.assertEqual(response.status_code, 302)
+        worker.wake.assert_called_once()
+
+        counts, giveaways = self.items_by_giveaway()
+        self.assertEqual(counts[(1, False)], 30)  # Nothing deleted on the request path
+        self.assertIsNotNone(giveaways[1])
+        self.assertNotIn(b"Big", self.client.get("/giveaways").data)
+        self.assertEqual(self.client.get("/giveaway/edit/1").status_code, 404)
+        self.assertEqual(self.client.post("/giveaway/delete/1").status_code, 403)
+
+        self.assertEqual(giveaway_cleanup.purge_all(batch_size=1), 1)
+        counts, giveaways = self.items_by_giveaway()
+        self.assertEqual(counts, {(None, True): 3, (2, False): 1})
+        self.assertEqual(list(giveaways), [2])
+
+    def test_worker_purges_when_woken(self):
+        db_session = SessionLocal()
+        giveaway_cleanup.archive_giveaway(db_session, 1)
+        db_session.commit()
+        db_session.close()
+
+        worker = giveaway_cleanup.CleanupWorker(interval=60)
+        worker.wake()
+        try:
+            for _ in range(100):
+                if 1 not in self.items_by_giveaway()[1]:
+                    break
+                time.sleep(0.05)
+        finally:
+            worker.stop()
+        self.assertNotIn(1, self.items_by_giveaway()[1])
+
+    def test_worker_purges_on_its_own_timer(self):
+        db_session = SessionLocal()
+        giveaway_cleanup.archive_giveaway(db_session, 1)  # As if archived by another web process
+        db_session.commit()
+        db_session.close()
+
+        worker = giveaway_cleanup.CleanupWorker(interval=0.05)
+        worker.start()
+        try:
+            for _ in range(100):
+                if 1 not in self.items_by_giveaway()[1]:
+                    break
+                time.sleep(0.05)
+        finally:
+            worker.stop()
+        self.assertNotIn(1, self.items_by_giveaway()[1])
+
+    def test_worker_starts_with_the_app_in_archive_mode(self):
+        with patch("app.cleanup_worker") as worker:
+            start_cleanup_worker()
+            worker.start.assert_not_called()
+            with patch.object(giveaway_cleanup, "DELETE_MODE", "archive"):
+                start_cleanup_worker()
+            worker.start.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+
+from twitchio import Message
+
+import chatbot
+from giveaway_session import SessionRegistry
+
+
+class FakeGiveaway:
+    def __init__(self, id, title="Test Giveaway"):
+        self.id = id
+        self.title = title
+
+
+class FakeWebsocket:
+    nick = chatbot.BOT_NICK
+    _cache = {}
+
+
+class FakeAuthor:
+    _ws = FakeWebsocket()
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeChannel:
+    def __init__(self, name):
+        self.name = name
+        self._name = name
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class TestSessionRegistry(unittest.TestCase):
+    def test_one_session_per_channel(self):
+        sessions = SessionRegistry()
+        first = sessions.open("Streamer", FakeGiveaway(1))
+        self.assertIsNotNone(first)
+        self.assertIsNone(sessions.open("streamer", FakeGiveaway(2)))
+        self.assertIs(sessions.get("STREAMER"), first)
+        self.assertIs(sessions.get("streamer", 1), first)
+        self.assertIsNone(sessions.get("streamer", 2))
+
+        sessions.close(first)
+        self.assertEqual(len(sessions), 0)
+        self.assertIsNotNone(sessions.open("streamer", FakeGiveaway(2)))
+
+    def test_sessions_run_concurrently(self):
+        """Entries and draws in one session never leak into another."""
+        sessions = SessionRegistry()
+
+        async def run():
+            a = sessions.open("a", FakeGiveaway(1))
+            b = sessions.open("b", FakeGiveaway(2))
+            await asyncio.gather(
+                *(a.enter(f"a_{i}") for i in range(500)),
+                *(b.enter(f"b_{i}") for i in range(300)),
+                *(a.enter(f"a_{i}") for i in range(500)),  # Duplicate spam
+            )
+            winners = await asyncio.gather(*(a.draw_winner() for _ in range(500)))
+            return a, b, winners
+
+        a, b, winners = asyncio.run(run())
+        self.assertEqual(len(a.entries), 0)
+        self.assertEqual(len(b.entries), 300)
+        self.assertEqual(sorted(winners), sorted(f"a_{i}" for i in range(500)))
+
+    def test_lock_is_free_while_announcing(self):
+        """A slow announcement after a draw does not block new entries."""
+        sessions = SessionRegistry()
+
+        async def run():
+            session = sessions.open("chan", FakeGiveaway(1))
+            await session.enter("first")
+
+            async def draw_and_announce():
+                winner = await session.draw_winner()
+                await asyncio.sleep(0.05)  # Simulated network round-trip
+                return winner
+
+            announcing = asyncio.create_task(draw_and_announce())
+            await asyncio.sleep(0)
+            self.assertFalse(session.lock.locked())
+            entered = await asyncio.wait_for(session.enter("second"), 0.01)
+            return await announcing, entered
+
+        winner, entered = asyncio.run(run())
+        self.assertEqual(winner, "first")
+        self.assertTrue(entered)
+
+
+class TestBotSessions(unittest.TestCase):
+    def test_one_bot_serves_two_channels(self):
+        """!enter in each channel lands in that channel's session."""
+
+        async def run():
+            bot = chatbot.Bot()
+            channels = {name: FakeChannel(name) for name in ("chan_a", "chan_b")}
+            bot.sessions.open("chan_a", FakeGiveaway(1))
+            bot.sessions.open("chan_b", FakeGiveaway(2))
+
+            for i in range(20):
+                name = "chan_a" if i % 2 else "chan_b"
+                message = Message(content="!enter", author=FakeAuthor(f"viewer_{i}"), channel=channels[name], tags={})
+                await bot.event_message(message)
+            await bot.flush_acks()
+            return bot, channels
+
+        bot, channels = asyncio.run(run())
+        self.assertEqual(len(bot.sessions.get("chan_a").entries), 10)
+        self.assertEqual(len(bot.sessions.get("chan_b").entries), 10)
+        self.assertIn("viewer_1", bot.sessions.get("chan_a").entries)
+        self.assertEqual(len(channels["chan_a"].sent), 1)
+        self.assertTrue(channels["chan_a"].sent[0].startswith("Entered: viewer_1, viewer_3"))
+
+    def test_enter_without_giveaway_replies_once(self):
+        """A chat full of !enter with nothing running gets one rate-limited reply, not one each."""
+
+        async def run():
+            bot = chatbot.Bot()
+            channel = FakeChannel("idle_chan")
+            for i in range(50):
+                message = Message(content="!enter", author=FakeAuthor(f"viewer_{i}"), channel=channel, tags={})
+                await bot.event_message(message)
+            return bot.get_sender(channel), channel
+
+        sender, channel = asyncio.run(run())
+        self.assertEqual(channel.sent, ["There is no active giveaway to join."])
+        self.assertEqual(sender.sent, 1)
+        self.assertIs(sender.account, chatbot.default_chat_budget)  # Shared with every other channel
@@ -0,0 +1,107 @@
+import io
+import unittest
+from unittest.mock import patch
+
+import item_import
+from app import app, SessionLocal
+from models import Giveaway, Item, User
+
+
+def rows(text, fmt):
+    return list(item_import.parse_items(io.StringIO(text, newline=""), fmt))
+
+
+class TestParseItems(unittest.TestCase):
+    def test_csv(self):
+        parsed = rows('name,code\nGame A,KEY-A\n"Game, B",KEY-B\n\nGame C\n', "csv")
+        self.assertEqual(parsed[0], (2, {"name": "Game A", "code": "KEY-A"}, None))
+        self.assertEqual(parsed[1][1], {"name": "Game, B", "code": "KEY-B"})
+        self.assertEqual(parsed[2], (5, None, "Expected name,code"))
+
+    def test_jsonl(self):
+        parsed = rows('{"name": "Game A", "code": "KEY-A"}\nnot json\n[1]\n{"name": "Game B"}\n', "jsonl")
+        self.assertEqual(parsed[0][1], {"name": "Game A", "code": "KEY-A"})
+        self.assertEqual([error for _, _, error in parsed[1:]], [
+            "Invalid JSON", "Expected an object with name and code", "Item code is required.",
+        ])
+
+    def test_text(self):
+        parsed = rows("Game, with comma, KEY-A\r\nGame B\tKEY-B\nno separator\n", "text")
+        self.assertEqual(parsed[0][1], {"name": "Game, with comma", "code": "KEY-A"})
+        self.assertEqual(parsed[1][1], {"name": "Game B", "code": "KEY-B"})
+        self.assertEqual(parsed[2][0], 3)
+        self.assertIsNotNone(parsed[2][2])
+
+    def test_too_long(self):
+        (_, fields, error), = rows("x" * 300 + ",KEY\n", "text")
+        self.assertIsNone(fields)
+        self.assertIn("255", error)
+
+    def test_detect_format(self):
+        self.assertEqual(item_import.detect_format("keys.CSV"), "csv")
+        self.assertEqual(item_import.detect_format("keys.ndjson"), "jsonl")
+        self.assertEqual(item_import.detect_format("keys.txt"), "text")
+
+    def test_errors_are_capped(self):
+        result = item_import.ImportResult()
+        for line in range(item_import.MAX_REPORTED_ERRORS + 5):
+            result.add_error(line, "bad")
+        self.assertEqual(result.error_count, item_import.MAX_REPORTED_ERRORS + 5)
+        self.assertEqual(len(result.errors), item_import.MAX_REPORTED_ERRORS)
+
+
+class TestImportEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        db_session = SessionLocal()
+        db_session.add_all([
+            User(id=1, twitch_id="t1", username="streamer"),
+            User(id=2, twitch_id="t2", username="other"),
+        ])
+        db_session.add(Giveaway(id=1, title="Keys", frequency=10, threshold=0, creator_id=1))
+        db_session.commit()
+        db_session.close()
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+
+    def item_names(self):
+        db_session = SessionLocal()
+        names = [item.name for item in db_session.query(Item).filter_by(giveaway_id=1).order_by(Item.id)]
+        db_session.close()
+        return names
+
+    def test_csv_upload_in_chunks(self):
+        upload = "name,code\n" + "".join(f"Game {n},KEY-{n}\n" for n in range(25)) + ",missing name\n"
+        with patch.object(item_import, "IMPORT_CHUNK", 10):
+            response = self.client.post("/giveaway/import-items/1", data={
+                "file": (io.BytesIO(upload.encode()), "keys.csv"),
+            }, content_type="multipart/form-data")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {
+            "imported": 25, "error_count": 1, "errors": [{"line": 27, "error": "Item name is required."}],
+        })
+        self.assertEqual(len(self.item_names()), 25)
+
+    def test_pasted_text(self):
+        response = self.client.post("/giveaway/import-items/1", data={"items": "Game A, KEY-A\nGame B, KEY-B"})
+        self.assertEqual(response.get_json()["imported"], 2)
+        self.assertEqual(self.item_names(), ["Game A", "Game B"])
+
+    def test_nothing_valid(self):
+        response = self.client.post("/giveaway/import-items/1", data={"items": "no separator"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error_count"], 1)
+
+    def test_empty_request(self):
+        self.assertEqual(self.client.post("/giveaway/import-items/1", data={}).status_code, 400)
+
+    def test_other_creators_giveaway(self):
+        with self.client.session_transaction() as session:
+            session["user_id"] = 2
+        response = self.client.post("/giveaway/import-items/1", data={"items": "Game A, KEY-A"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.item_names(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import re
+import unittest
+
+from app import app, SessionLocal
+from item_queries import decode_cursor, encode_cursor, item_page
+from models import Giveaway, Item, User
+
+
+class TestItemPages(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        db_session = SessionLocal()
+        db_session.add_all([
+            User(id=1, twitch_id="t1", username="streamer"),
+            User(id=2, twitch_id="t2", username="other"),
+        ])
+        db_session.add_all([
+            Giveaway(id=1, title="Keys", frequency=10, threshold=0, creator_id=1),
+            Giveaway(id=2, title="Other keys", frequency=10, threshold=0, creator_id=1),
+        ])
+        names = ["Portal", "Halo", "Portal 2", "Hades", "Celeste", "Portal Stories"]
+        for item_id, name in enumerate(names, start=1):
+            db_session.add(Item(id=item_id, name=name, code=f"SECRET-{item_id}", giveaway_id=1,
+                                is_won=item_id == 3, winner_username="viewer" if item_id == 3 else None))
+        db_session.add(Item(id=7, name="Portal", code="SECRET-7", giveaway_id=2, is_won=False))
+        db_session.commit()
+        self.db_session = db_session
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+
+    def tearDown(self):
+        self.db_session.close()
+
+    def walk(self, **filters):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = item_page(self.db_session, 1, after=cursor, limit=2, **filters)
+            seen.extend(row.id for row in rows)
+            if cursor is None:
+                return seen
+
+    def test_pages_in_id_order(self):
+        self.assertEqual(self.walk(), [1, 2, 3, 4, 5, 6])
+
+    def test_search_by_name_prefix(self):
+        self.assertEqual(self.walk(search="Portal"), [1, 3, 6])
+        self.assertEqual(self.walk(search="H"), [4, 2])
+
+    def test_won_filter(self):
+        self.assertEqual(self.walk(won=False), [1, 2, 4, 5, 6])
+        self.assertEqual(self.walk(won=True, search="Portal"), [3])
+
+    def test_codes_only_when_requested(self):
+        rows, _ = item_page(self.db_session, 1)
+        self.assertNotIn("code", rows[0]._fields)
+        rows, _ = item_page(self.db_session, 1, include_codes=True)
+        self.assertEqual(rows[0].code, "SECRET-1")
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(["Portal", 3]), (str, int)), ["Portal", 3])
+        for forged in ("not a cursor", encode_cursor({"id": 3}), encode_cursor([]), encode_cursor([3, 4]),
+                       encode_cursor(["3"]), encode_cursor([True]), encode_cursor([[3]])):
+            with self.assertRaises(ValueError):
+                decode_cursor(forged, (int,))
+
+    def test_api(self):
+        page = self.client.get("/api/giveaway/1/items?limit=4").get_json()
+        self.assertEqual([item["id"] for item in page["items"]], [1, 2, 3, 4])
+        self.assertNotIn(b"SECRET", self.client.get("/api/giveaway/1/items").data)
+
+        page = self.client.get(f"/api/giveaway/1/items?limit=4&after={page['next']}").get_json()
+        self.assertEqual([item["id"] for item in page["items"]], [5, 6])
+        self.assertIsNone(page["next"])
+
+        page = self.client.get("/api/giveaway/1/items?q=Portal&won=false&codes=1").get_json()
+        self.assertEqual([(item["name"], item["code"]) for item in page["items"]],
+                         [("Portal", "SECRET-1"), ("Portal Stories", "SECRET-6")])
+
+    def test_api_errors(self):
+        self.assertEqual(self.client.get("/api/giveaway/1/items?after=garbage").status_code, 400)
+        # Well-formed cursors of the wrong shape, such as one from a search page
+        for forged in ([], ["Portal", 3], [{"id": 3}]):
+            self.assertEqual(self.client.get(f"/api/giveaway/1/items?after={encode_cursor(forged)}").status_code, 400)
+        self.assertEqual(self.client.get(f"/api/giveaway/1/items?q=P&after={encode_cursor([3])}").status_code, 400)
+        with self.client.session_transaction() as session:
+            session["user_id"] = 2
+        self.assertEqual(self.client.get("/api/giveaway/1/items").status_code, 404)
+
+    def test_edit_page_does_not_render_codes(self):
+        response = self.client.get("/giveaway/edit/1")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b"SECRET", response.data)
+        ids = re.findall(rb'\bid="([^"]+)"', response.data)
+        self.assertEqual(len(ids), len(set(ids)))
+
+
+if __name__ == "__main__":
+    unittest.main()
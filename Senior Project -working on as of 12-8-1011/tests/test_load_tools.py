@@ -0,0 +1,123 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, func, select
+
+import chatbot
+import migrations
+from benchmarks.load_compare import compare
+from benchmarks.load_seed import creator_code, seed
+from models import Giveaway, Item, User, Winner
+from tests.fake_tmi import FakeTMI, synthesize
+from tests.fake_twitch import FakeTwitch
+from twitch_api import TwitchClient
+
+
+def stats(requests=100, failures=0, p95=50):
+    return {"requests": requests, "failures": failures, "rps": 10.0, "avg": 20.0, "p50": 20, "p95": p95, "p99": 80}
+
+
+class TestLoadCompare(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {"endpoints": {"GET /dashboard": stats(), "POST /giveaway/create": stats(p95=100)}}
+
+    def test_unchanged_run_passes(self):
+        self.assertEqual(compare(self.baseline, self.baseline), [])
+
+    def test_slower_endpoint(self):
+        results = {"endpoints": {"GET /dashboard": stats(p95=80), "POST /giveaway/create": stats(p95=110)}}
+        regressions = compare(results, self.baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("GET /dashboard", regressions[0])
+
+    def test_small_absolute_changes_are_noise(self):
+        baseline = {"endpoints": {"GET /health/db": stats(p95=2)}}
+        self.assertEqual(compare({"endpoints": {"GET /health/db": stats(p95=5)}}, baseline), [])
+
+    def test_more_failures(self):
+        results = {"endpoints": {"GET /dashboard": stats(failures=5), "POST /giveaway/create": stats(p95=100)}}
+        self.assertIn("failed", compare(results, self.baseline)[0])
+
+    def test_missing_and_sparse_endpoints(self):
+        results = {"endpoints": {"GET /dashboard": stats(requests=5, p95=900)}}
+        self.assertEqual(compare(results, self.baseline), ["POST /giveaway/create: not exercised in this run"])
+
+
+class TestLoadSeed(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.path}")
+        migrations.upgrade(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def count(self, column):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count(column))).scalar()
+
+    def test_seed_and_reseed(self):
+        for _ in range(2):
+            self.assertEqual(seed(creators=3, giveaways=4, items=10, viewers=5, bind=self.engine), (3, 12))
+        self.assertEqual(self.count(User.id), 8)
+        self.assertEqual(self.count(Giveaway.id), 12)
+        self.assertEqual(self.count(Item.id), 120)
+        self.assertEqual(self.count(Winner.id), 24)
+
+
+class TestFakeTwitchLogins(unittest.TestCase):
+    def test_any_code_logs_in(self):
+        with FakeTwitch(auto_users=True) as twitch:
+            client = TwitchClient("id", "secret", auth_url=f"{twitch.url}/oauth2", api_url=f"{twitch.url}/helix")
+            try:
+                token = client.exchange_code(creator_code(7), "http://localhost/callback")
+                self.assertEqual(client.get_current_user(token["access_token"])["id"], "load-creator-7")
+            finally:
+                client.close()
+
+
+class FakeGiveaway:
+    id = 1
+    title = "Chat Giveaway"
+
+
+class TestFakeChat(unittest.TestCase):
+    def test_synthesized_chat(self):
+        events = list(synthesize(enters_per_minute=600, chat_per_minute=300, users=50, seconds=60))
+        self.assertTrue(800 < len(events) < 1000)
+        self.assertEqual([at for at, _, _ in events], sorted(at for at, _, _ in events))
+        enters = [user for _, user, text in events if text == "!enter"]
+        self.assertTrue(500 < len(enters) < 700)
+        self.assertLessEqual(len(set(enters)), 50)
+
+    def test_bot_enters_over_fake_chat(self):
+        async def run(tmi):
+            bot = chatbot.Bot(channel="fake_chat", exit_on_shutdown=False, irc_url=tmi.url)
+            bot.sessions.open("fake_chat", FakeGiveaway())
+            await bot.connect()
+            await asyncio.wrap_future(tmi.play("fake_chat", [
+                (n * 0.001, f"viewer_{n % 30}", "!enter" if n % 2 else "hello") for n in range(100)
+            ]))
+            session = bot.sessions.get("fake_chat")
+            for _ in range(100):
+                if len(session.entries) == 15:
+                    break
+                await asyncio.sleep(0.02)
+            await bot.flush_acks()
+            await asyncio.sleep(0.1)
+            entries = len(session.entries)
+            await bot.close()
+            return entries
+
+        with FakeTMI() as tmi:
+            self.assertEqual(asyncio.run(run(tmi)), 15)
+            self.assertEqual(tmi.sent, 100)
+            self.assertTrue(tmi.bot_messages[0][1].startswith("Entered: viewer_1, viewer_3"))
+
+
+if __name__ == "__main__":
+    unittest.main()
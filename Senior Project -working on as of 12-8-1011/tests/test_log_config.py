@@ -0,0 +1,53 @@
+import io
+import json
+import logging
+import unittest
+
+from log_config import configure_logging, sampled_logger, stop_logging
+
+
+class TestLogConfig(unittest.TestCase):
+    def tearDown(self):
+        stop_logging()
+
+    def test_sampled_logger_keeps_one_in_n(self):
+        """Only every Nth info line is written, warnings always are."""
+        stream = io.StringIO()
+        configure_logging(level="INFO", stream=stream)
+        log = sampled_logger("tests.sampled", 10)
+        for i in range(100):
+            log.info("line %d", i)
+        log.warning("always kept")
+        stop_logging()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 11)
+        self.assertIn("always kept", lines[-1])
+
+    def test_debug_arguments_are_not_formatted_at_info(self):
+        """Large collections passed to debug() are never turned into strings."""
+
+        class Exploding:
+            def __repr__(self):
+                raise AssertionError("formatted a debug argument")
+
+            __str__ = __repr__
+
+        stream = io.StringIO()
+        configure_logging(level="INFO", stream=stream)
+        logging.getLogger("tests.lazy").debug("entries: %s", Exploding())
+        sampled_logger("tests.lazy", 1).debug("entries: %s", Exploding())
+        stop_logging()
+        self.assertEqual(stream.getvalue(), "")
+
+    def test_json_format_includes_extra_fields(self):
+        """JSON output carries fields passed through extra=."""
+        stream = io.StringIO()
+        configure_logging(level="INFO", fmt="json", stream=stream)
+        logging.getLogger("tests.json").info("winner picked", extra={"giveaway_id": 7})
+        stop_logging()
+
+        record = json.loads(stream.getvalue().splitlines()[0])
+        self.assertEqual(record["msg"], "winner picked")
+        self.assertEqual(record["giveaway_id"], 7)
+        self.assertEqual(record["level"], "INFO")
@@ -0,0 +1,176 @@
+import asyncio
+import time
+import unittest
+
+from flask import Flask
+from sqlalchemy import text
+
+import db_scope
+import supervisor_client
+import web_metrics
+from app import app
+from chatbot import Bot, entries_total, messages_total
+from db_scope import db_session
+from metrics import COUNT_BUCKETS, Registry, registry, snapshot_gauge, watch_event_loop
+from supervisor import Supervisor
+from tests.test_supervisor import FakeBot
+
+
+def sample(rendered, line_start):
+    """Value of the first sample line starting with `line_start`."""
+    for line in rendered.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"No sample {line_start!r} in:\n{rendered}")
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_text_format(self):
+        self.registry.counter("hits_total", "Hits.", ["path"]).labels('/a"b').inc(3)
+        self.registry.gauge("depth", "Queue depth.").set(7)
+        histogram = self.registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value)
+
+        rendered = self.registry.render()
+        self.assertIn("# TYPE hits_total counter\nhits_total{path=\"/a\\\"b\"} 3\n", rendered)
+        self.assertIn("# HELP depth Queue depth.\n# TYPE depth gauge\ndepth 7\n", rendered)
+        self.assertIn(
+            'latency_seconds_bucket{le="0.1"} 1\nlatency_seconds_bucket{le="1.0"} 2\n'
+            'latency_seconds_bucket{le="+Inf"} 3\nlatency_seconds_sum 5.55\nlatency_seconds_count 3\n',
+            rendered,
+        )
+
+    def test_same_name_returns_same_metric(self):
+        counter = self.registry.counter("hits_total", "Hits.")
+        self.assertIs(self.registry.counter("hits_total", "Hits."), counter)
+        with self.assertRaises(ValueError):
+            self.registry.gauge("hits_total", "Hits.")
+        with self.assertRaises(ValueError):
+            counter.labels("extra")
+
+    def test_collectors_run_at_scrape_time(self):
+        depth = [1]
+        self.registry.collector(lambda: [snapshot_gauge("queue", "Queue depth.", depth[0])])
+        self.assertEqual(sample(self.registry.render(), "queue "), 1)
+        depth[0] = 4
+        self.assertEqual(sample(self.registry.render(), "queue "), 4)
+
+    def test_event_loop_lag(self):
+        histogram = self.registry.histogram("lag_seconds", "Lag.")
+
+        async def main():
+            watcher = asyncio.create_task(watch_event_loop(histogram, interval=0.01))
+            await asyncio.sleep(0.02)
+            time.sleep(0.2)  # Holds the loop, as a slow callback would
+            await asyncio.sleep(0.02)
+            watcher.cancel()
+
+        asyncio.run(main())
+        self.assertGreater(histogram.labels().sum, 0.1)
+
+
+class TestRequestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        db_scope.init_app(self.app)
+        web_metrics.init_app(self.app)
+
+        @self.app.route("/queries/<int:count>")
+        def queries(count):
+            for _ in range(count):
+                db_session.execute(text("SELECT 1"))
+            return "ok"
+
+        self.client = self.app.test_client()
+
+    def test_latency_and_queries_by_route(self):
+        route = "/queries/<int:count>"
+        before = web_metrics.request_queries.labels(route).count
+        self.client.get("/queries/3")
+        self.client.get("/queries/1")
+        self.client.get("/missing")
+
+        queries = web_metrics.request_queries.labels(route)
+        self.assertEqual(queries.count, before + 2)
+        self.assertGreaterEqual(queries.sum, 4)
+        self.assertGreater(web_metrics.request_query_time.labels(route).sum, 0)
+        self.assertGreaterEqual(web_metrics.request_duration.labels("GET", route, 200).count, 2)
+        self.assertGreaterEqual(web_metrics.request_duration.labels("GET", "unmatched", 404).count, 1)
+        self.assertEqual(web_metrics.request_queries.buckets, tuple(float(b) for b in COUNT_BUCKETS))
+
+    def test_metrics_endpoint(self):
+        client = app.test_client()
+        client.get("/")
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain; version=0.0.4"))
+        body = response.get_data(as_text=True)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/",status="200"}', body)
+        self.assertIn("# TYPE db_pool_checkouts_total counter", body)
+        self.assertIn("db_query_duration_seconds_bucket", body)
+
+    def test_chatbot_metrics_without_supervisor(self):
+        original = supervisor_client.SUPERVISOR_PORT
+        supervisor_client.SUPERVISOR_PORT = 1
+        try:
+            self.assertEqual(app.test_client().get("/metrics/chatbot").status_code, 503)
+        finally:
+            supervisor_client.SUPERVISOR_PORT = original
+
+
+class FakeChannel:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeGiveaway:
+    id = 1
+    title = "Metrics Giveaway"
+
+
+class TestChatbotMetrics(unittest.TestCase):
+    def test_metrics_command(self):
+        async def main():
+            bot = Bot(channel="metrics_chan", exit_on_shutdown=False)
+            session = bot.sessions.open("metrics_chan", FakeGiveaway())
+            await session.enter("viewer")
+            bot.get_ack_batcher(FakeChannel("metrics_chan")).add("viewer")
+
+            supervisor = Supervisor(bot_factory=FakeBot, journal=None)
+            server = await asyncio.start_server(supervisor.handle_client, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await supervisor_client.send_command_async("metrics", port=port)
+            finally:
+                server.close()
+                for batcher in bot._ack_batchers.values():
+                    batcher._flush_task.cancel()
+
+        reply = asyncio.run(main())
+        self.assertTrue(reply["ok"])
+        self.assertEqual(sample(reply["metrics"], 'chatbot_entrants{channel="metrics_chan"}'), 1)
+        self.assertEqual(sample(reply["metrics"], 'chatbot_ack_pending{channel="metrics_chan"}'), 1)
+        self.assertIn("# TYPE chatbot_event_loop_lag_seconds histogram", reply["metrics"])
+
+    def test_exited_bot_channel_series_are_removed(self):
+        async def main():
+            supervisor = Supervisor(bot_factory=FakeBot, journal=None)
+            supervisor.start(7, "gone_chan")
+            messages_total.labels("gone_chan").inc()
+            entries_total.labels("gone_chan", "entered").inc()
+            entries_total.labels("gone_chan", "no_giveaway").inc()
+            before = registry.render()
+            await supervisor.stop(7)
+            return before, registry.render()
+
+        before, after = asyncio.run(main())
+        self.assertEqual(sample(before, 'chatbot_messages_total{channel="gone_chan"}'), 1)
+        self.assertNotIn('channel="gone_chan"', after)
+
+
+if __name__ == "__main__":
+    unittest.main()
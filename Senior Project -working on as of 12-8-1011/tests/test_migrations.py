@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, inspect, text
+
+import migrations
+from models import Base
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.path}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def index_names(self):
+        inspector = inspect(self.engine)
+        return {index["name"] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+    def test_upgrade_fresh_database(self):
+        self.assertEqual(migrations.upgrade(self.engine), [1, 2, 3, 4, 5])
+        self.assertTrue(migrations.WINNER_INDEXES <= self.index_names())
+        with self.engine.connect() as conn:
+            self.assertEqual(migrations.current_version(conn), migrations.LATEST_VERSION)
+        # Running again is a no-op
+        self.assertEqual(migrations.upgrade(self.engine), [])
+
+    def test_upgrade_database_created_before_migrations(self):
+        """A database made by the old import-time create_all gains the indexes."""
+        Base.metadata.create_all(bind=self.engine)
+        with self.engine.begin() as conn:
+            for name in migrations.WINNER_INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text(
+                "INSERT INTO users (id, twitch_id, username) VALUES (1, 't1', 'viewer')"
+            ))
+        self.assertFalse(migrations.WINNER_INDEXES & self.index_names())
+
+        migrations.upgrade(self.engine)
+        self.assertTrue(migrations.WINNER_INDEXES <= self.index_names())
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT count(*) FROM users")).scalar(), 1)
+
+    def test_upgrade_adds_archive_column(self):
+        Base.metadata.create_all(bind=self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE giveaways DROP COLUMN archived_at"))
+        migrations.upgrade(self.engine)
+        columns = {column["name"] for column in inspect(self.engine).get_columns("giveaways")}
+        self.assertIn("archived_at", columns)
+
+    def test_upgrade_adds_draw_schedule_column(self):
+        Base.metadata.create_all(bind=self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE giveaways DROP COLUMN next_draw_at"))
+        migrations.upgrade(self.engine)
+        columns = {column["name"] for column in inspect(self.engine).get_columns("giveaways")}
+        self.assertIn("next_draw_at", columns)
+
+    def test_winner_lookups_use_indexes(self):
+        """The /winnings and /dashboard filters are index searches, not table scans."""
+        migrations.upgrade(self.engine)
+        plans = {
+            "winnings": "SELECT * FROM items WHERE is_won = 1 AND winner_username = 'viewer'",
+            "winners": "SELECT * FROM winners JOIN giveaways ON giveaways.id = winners.giveaway_id "
+                       "WHERE giveaways.creator_id = 1",
+        }
+        with self.engine.connect() as conn:
+            for name, sql in plans.items():
+                plan = " ".join(row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql)))
+                self.assertNotIn("SCAN", plan, f"{name} query scans a table: {plan}")
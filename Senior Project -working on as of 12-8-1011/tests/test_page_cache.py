@@ -0,0 +1,232 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from app import app, SessionLocal
+from chatbot_db import apply_wins
+from db_scope import pool_metrics
+from models import Giveaway, Item, User
+from page_cache import MemoryCache, SQLiteCache, make_cache, page_cache, user_tag, winner_tag
+from supervisor import check_page_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheBehaviour:
+    """Shared checks run against every backend."""
+
+    def make(self, **options):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = self.make(ttl=10, max_entries=3, clock=self.clock)
+
+    def test_read_through(self):
+        calls = []
+        produce = lambda: calls.append(1) or "page"
+        self.assertEqual(self.cache.get_or_set("k", "user:1", produce), "page")
+        self.assertEqual(self.cache.get_or_set("k", "user:1", produce), "page")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((self.cache.stats.hits, self.cache.stats.misses), (1, 1))
+
+    def test_ttl(self):
+        self.cache.set("k", "user:1", "page")
+        self.clock.now += 9
+        self.assertEqual(self.cache.get("k"), "page")
+        self.clock.now += 2
+        self.assertIsNone(self.cache.get("k"))
+
+    def test_lru_eviction(self):
+        for key in ("a", "b", "c"):
+            self.clock.now += 1
+            self.cache.set(key, "user:1", key)
+        self.clock.now += 1
+        self.cache.get("a")  # Now b is the least recently used
+        self.clock.now += 1
+        self.cache.set("d", "user:1", "d")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual([self.cache.get(key) for key in ("a", "c", "d")], ["a", "c", "d"])
+        self.assertEqual(self.cache.stats.evictions, 1)
+
+    def test_invalidate_by_tag(self):
+        self.cache.set("dashboard:1", "user:1", "one")
+        self.cache.set("giveaways:1", "user:1", "one")
+        self.cache.set("dashboard:2", "user:2", "two")
+        self.cache.invalidate("user:1")
+        self.assertIsNone(self.cache.get("dashboard:1"))
+        self.assertIsNone(self.cache.get("giveaways:1"))
+        self.assertEqual(self.cache.get("dashboard:2"), "two")
+
+    def test_versions_bump_on_invalidate(self):
+        token, modified = self.cache.version("user:1")
+        self.assertEqual(self.cache.version("user:1"), (token, modified))
+        self.cache.invalidate("user:1")
+        new_token, new_modified = self.cache.version("user:1")
+        self.assertNotEqual(new_token, token)
+        self.assertGreaterEqual(new_modified, modified + 1)  # Visible at Last-Modified's one-second resolution
+        self.assertEqual(self.cache.version("user:2")[0], self.cache.version("user:2")[0])
+
+    def test_versions_outlive_entries(self):
+        self.cache.set("k", "user:1", "page")
+        version = self.cache.version("user:1")
+        self.clock.now += 3600
+        self.assertIsNone(self.cache.get("k"))
+        self.assertEqual(self.cache.version("user:1"), version)
+
+
+class TestMemoryCache(CacheBehaviour, unittest.TestCase):
+    def make(self, **options):
+        return MemoryCache(**options)
+
+    def test_broken_backend_falls_through(self):
+        def broken(key):
+            raise RuntimeError("down")
+        self.cache.get = broken
+        self.assertEqual(self.cache.get_or_set("k", "user:1", lambda: "page"), "page")
+        self.assertEqual(self.cache.stats.errors, 1)
+
+    def test_versions_bounded(self):
+        first = self.cache.version("user:0")
+        for user_id in range(1, 12):
+            self.cache.version(f"user:{user_id}")
+        self.assertEqual(self.cache.version("user:0"), first)  # Recently used, so kept
+        self.cache.version("user:12")
+        self.assertEqual(len(self.cache._versions), 12)
+        self.assertNotIn("user:1", self.cache._versions)
+
+
+class TestSQLiteCache(CacheBehaviour, unittest.TestCase):
+    def make(self, **options):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.options = options
+        return SQLiteCache(self.path, **options)
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_shared_between_instances(self):
+        """Two workers opening the same file see each other's entries and invalidations."""
+        other = SQLiteCache(self.path, **self.options)
+        self.cache.set("dashboard:1", "user:1", "page")
+        self.assertEqual(other.get("dashboard:1"), "page")
+        other.invalidate("user:1")
+        self.assertIsNone(self.cache.get("dashboard:1"))
+
+    def test_make_cache(self):
+        self.assertEqual(make_cache("none").get_or_set("k", "t", lambda: 1), 1)
+        with self.assertRaises(ValueError):
+            make_cache("redis")
+
+
+class TestCrossProcess(unittest.TestCase):
+    def test_supervisor_invalidations_reach_the_web_app(self):
+        """The default backend carries an invalidation made in another process, as the supervisor's are."""
+        page_cache.set("dashboard:1", user_tag(1), "page")
+        token, _ = page_cache.version(user_tag(1))
+        env = {name: value for name, value in os.environ.items() if name != "CACHE_BACKEND"}
+        subprocess.run(
+            [sys.executable, "-c", "from page_cache import page_cache, user_tag; page_cache.invalidate(user_tag(1))"],
+            check=True, env=env,
+        )
+        self.assertIsNone(page_cache.get("dashboard:1"))
+        self.assertNotEqual(page_cache.version(user_tag(1))[0], token)
+
+    def test_supervisor_refuses_a_private_cache(self):
+        with self.assertRaises(RuntimeError):
+            check_page_cache(MemoryCache())
+        check_page_cache(make_cache("none"))
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        db_session = SessionLocal()
+        db_session.add(User(id=1, twitch_id="t1", username="streamer"))
+        db_session.commit()
+        db_session.close()
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+
+    def test_unchanged_page_is_304_without_queries(self):
+        first = self.client.get("/dashboard")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+        self.assertIn("no-cache", first.headers["Cache-Control"])
+
+        checkouts = pool_metrics.checkouts
+        again = self.client.get("/dashboard", headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+        self.assertEqual(pool_metrics.checkouts, checkouts)
+
+        modified = self.client.get("/dashboard", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+        self.assertEqual(modified.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get("/dashboard").headers["ETag"]
+        self.client.post("/giveaway/create", data={"title": "Fresh", "frequency": "10", "threshold": "0"})
+        response = self.client.get("/dashboard", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Fresh", response.data)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_pages_have_distinct_etags(self):
+        dashboard = self.client.get("/dashboard").headers["ETag"]
+        giveaways = self.client.get("/giveaways").headers["ETag"]
+        self.assertNotEqual(dashboard, giveaways)
+
+
+class TestPageCaching(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        db_session = SessionLocal()
+        db_session.add(User(id=1, twitch_id="t1", username="streamer"))
+        db_session.add(Giveaway(id=1, title="Keys", frequency=10, threshold=0, creator_id=1))
+        db_session.add(Item(id=1, name="Portal", code="A", giveaway_id=1, is_won=False))
+        db_session.commit()
+        db_session.close()
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+            session["username"] = "viewer"
+
+    def test_dashboard_cached_until_write(self):
+        self.client.get("/dashboard")
+        hits = page_cache.stats.hits
+        self.assertIn(b"Keys", self.client.get("/dashboard").data)
+        self.assertEqual(page_cache.stats.hits, hits + 1)
+
+        self.client.post("/giveaway/create", data={"title": "Fresh", "frequency": "10", "threshold": "0"})
+        self.assertIn(b"Fresh", self.client.get("/dashboard").data)
+
+    def test_chatbot_wins_invalidate_pages(self):
+        self.assertNotIn(b"Portal", self.client.get("/winnings").data)
+        self.client.get("/dashboard")
+
+        db_session = SessionLocal()
+        apply_wins(db_session, [{"item_id": 1, "giveaway_id": 1, "winner": "viewer"}])
+        db_session.close()
+
+        self.assertIn(b"Portal", self.client.get("/winnings").data)
+        self.assertIn(b"(1 won)", self.client.get("/dashboard").data)
+
+    def test_counters_exposed(self):
+        self.client.get("/giveaways")
+        stats = self.client.get("/health/cache").get_json()
+        self.assertEqual(stats["backend"], "sqlite")
+        self.assertGreaterEqual(stats["misses"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+from sqlalchemy import text
+
+import db_scope
+import request_profiler
+from app import app, SessionLocal
+from db_scope import db_session, query_metrics
+from models import Giveaway, Item, User, Winner
+from request_profiler import repeated_statements, statement_shape
+
+# Most SQL statements each page may run, however many giveaways, items and winners there are
+QUERY_BUDGETS = {
+    "/dashboard": 2,
+    "/api/dashboard": 2,
+    "/giveaways": 1,
+    "/giveaway/view/{giveaway_id}": 1,
+    "/giveaway/edit/{giveaway_id}": 1,
+    "/api/giveaway/{giveaway_id}/items": 2,
+    "/winnings": 1,
+}
+
+
+class TestStatementShapes(unittest.TestCase):
+    def test_literals_and_lists_collapse(self):
+        self.assertEqual(
+            statement_shape("SELECT * FROM items WHERE id = 12 AND name = 'it''s'"),
+            statement_shape("SELECT *\n  FROM items WHERE id = 7 AND name = 'other'"),
+        )
+        self.assertEqual(
+            statement_shape("SELECT * FROM items WHERE id IN (?, ?, ?)"),
+            statement_shape("SELECT * FROM items WHERE id IN (?)"),
+        )
+
+    def test_repeats_over_threshold(self):
+        statements = [(f"SELECT * FROM winners WHERE item_id = {n}", 0.001) for n in range(6)]
+        statements.append(("SELECT * FROM giveaways", 0.001))
+        self.assertEqual(repeated_statements(statements, threshold=5), [("SELECT * FROM winners WHERE item_id = ?", 6)])
+        self.assertEqual(repeated_statements(statements, threshold=6), [])
+
+
+class TestProfilingMode(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["REQUEST_PROFILING"] = "1"
+        db_scope.init_app(self.app)
+        request_profiler.init_app(self.app)
+
+        @self.app.route("/lazy")
+        def lazy():
+            for n in range(8):
+                db_session.execute(text(f"SELECT {n}"))
+            return "ok"
+
+        self.client = self.app.test_client()
+
+    def test_flags_repeated_statements(self):
+        with self.assertLogs("profiler", "WARNING") as logs:
+            response = self.client.get("/lazy")
+        self.assertEqual(response.headers["X-Query-Count"], "8")
+        self.assertEqual(response.headers["X-Repeated-Queries"], "1")
+        self.assertIn("GET /lazy ran 8 times: SELECT ?", logs.output[0])
+
+    def test_profile_dump(self):
+        with tempfile.TemporaryDirectory() as directory, patch.object(request_profiler, "PROFILE_DIR", directory):
+            response = self.client.get("/lazy?profile=1")
+            path = response.headers["X-Profile-File"]
+            self.assertEqual(os.path.dirname(path), directory)
+            self.assertTrue(path.endswith(".prof"))
+            self.assertGreater(os.path.getsize(path), 0)
+            self.assertNotIn("X-Profile-File", self.client.get("/lazy", headers={"X-Profile": ""}).headers)
+
+    def test_off_by_default(self):
+        self.app.config["REQUEST_PROFILING"] = ""
+        response = self.client.get("/lazy?profile=1")
+        self.assertNotIn("X-Query-Count", response.headers)
+        self.assertNotIn("X-Profile-File", response.headers)
+
+
+class TestQueryBudgets(unittest.TestCase):
+    """Pages must not run more queries as the data behind them grows."""
+
+    def setUp(self):
+        db = SessionLocal()
+        db.add(User(id=1, twitch_id="t1", username="streamer"))
+        for giveaway_id in range(1, 11):
+            db.add(Giveaway(
+                id=giveaway_id, title=f"Giveaway {giveaway_id}", frequency=10, threshold=0, creator_id=1, active=True
+            ))
+            for n in range(10):
+                item_id = giveaway_id * 100 + n
+                won = n < 4
+                db.add(Item(id=item_id, name=f"Item {n}", code=f"C{item_id}", giveaway_id=giveaway_id,
+                            is_won=won, winner_username="streamer" if won else None))
+                if won:
+                    db.add(Winner(giveaway_id=giveaway_id, item_id=item_id))
+        db.commit()
+        db.close()
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+            session["username"] = "streamer"
+
+    def test_query_budgets(self):
+        for url, budget in QUERY_BUDGETS.items():
+            with self.subTest(url=url), query_metrics.count() as queries:
+                response = self.client.get(url.format(giveaway_id=3))
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(queries.count, budget, [sql for sql, _ in queries.statements])
+
+
+if __name__ == "__main__":
+    unittest.main()
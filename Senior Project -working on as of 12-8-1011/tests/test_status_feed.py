@@ -0,0 +1,333 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+import supervisor_client
+from app import SessionLocal, app
+from db_scope import pool_metrics
+from models import Giveaway, User
+from status_feed import AsyncListener, Listener, StatusHub, StatusPublisher, diff, format_event
+from supervisor import Supervisor
+from tests.test_giveaway_session import FakeGiveaway
+from tests.test_supervisor import FakeBot
+
+
+class FakeItem:
+    def __init__(self, name):
+        self.name = name
+
+
+class TestStatusPublisher(unittest.TestCase):
+    def test_diff(self):
+        self.assertEqual(diff({"entries": 1, "active": True}, {"entries": 2, "active": True}), {"entries": 2})
+        self.assertEqual(diff({}, {"entries": 0}), {"entries": 0})
+
+    def test_snapshot_then_deltas(self):
+        async def main():
+            status = {"giveaway_id": 1, "active": True, "entries": 0, "current_item": None}
+            publisher = StatusPublisher(lambda giveaway_id: dict(status), interval=3600)
+            subscription = publisher.subscribe(1)
+            first = await subscription.get()
+            self.assertEqual(first["type"], "snapshot")
+            self.assertEqual(first["status"], status)
+
+            publisher.publish()
+            self.assertEqual(len(subscription), 0)  # Nothing changed, nothing sent
+
+            status["entries"] = 5
+            status["entries"] = 7  # Changes between samples coalesce
+            status["current_item"] = "Key"
+            publisher.publish()
+            delta = await subscription.get()
+            self.assertEqual(delta["type"], "delta")
+            self.assertEqual(delta["changes"], {"entries": 7, "current_item": "Key"})
+            publisher.unsubscribe(subscription)
+            await publisher.close()
+
+        asyncio.run(main())
+
+    def test_slow_subscriber_gets_snapshot(self):
+        async def main():
+            status = {"giveaway_id": 1, "active": True, "entries": 0}
+            publisher = StatusPublisher(lambda giveaway_id: dict(status), interval=3600, queue_size=3)
+            subscription = publisher.subscribe(1)
+            for entries in range(1, 11):
+                status["entries"] = entries
+                publisher.publish()
+            # The backlog never grows past the bound, and it ends in the current state
+            self.assertLessEqual(len(subscription), 3)
+            self.assertGreater(subscription.dropped, 0)
+            messages = [await subscription.get() for _ in range(len(subscription))]
+            state = {}
+            for message in messages:
+                state.update(message["status"] if message["type"] == "snapshot" else message["changes"])
+            self.assertEqual(state["entries"], 10)
+            await publisher.close()
+
+        asyncio.run(main())
+
+
+class TestSupervisorStatusFeed(unittest.TestCase):
+    def test_subscribe_streams_session_status(self):
+        """A subscription carries entries, current item, countdown and winners from the session."""
+
+        async def main():
+            supervisor = Supervisor(bot_factory=FakeBot, journal=None)
+            supervisor.publisher.interval = 0.01
+            server = await asyncio.start_server(supervisor.handle_client, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            supervisor.start(7, "chan")
+            session = supervisor.find_runner(7).bot.sessions.open("chan", FakeGiveaway(7, "Keys"))
+
+            def watch():
+                messages = supervisor_client.subscribe(7, port=port)
+                first = next(messages)
+                ready.set()
+                second = next(messages)
+                messages.close()
+                return first, second
+
+            ready = threading.Event()
+            watcher = asyncio.create_task(asyncio.to_thread(watch))
+            await asyncio.to_thread(ready.wait, 5)
+            session.entries.add("alice")
+            session.current_item = FakeItem("Game key")
+            session.next_draw_at = 1234.0
+            session.winners.append(("bob", "Sticker"))
+            try:
+                first, second = await asyncio.wait_for(watcher, 5)
+            finally:
+                server.close()
+                await supervisor.shutdown()
+            return first, second
+
+        first, second = asyncio.run(main())
+        self.assertEqual(first["type"], "snapshot")
+        self.assertEqual(first["status"]["title"], "Keys")
+        self.assertEqual(first["status"]["entries"], 0)
+        self.assertEqual(second["type"], "delta")
+        self.assertEqual(
+            second["changes"],
+            {
+                "entries": 1,
+                "current_item": "Game key",
+                "next_draw_at": 1234.0,
+                "winners": [{"winner": "bob", "item": "Sticker"}],
+            },
+        )
+
+    def test_subscribe_to_idle_giveaway(self):
+        async def main():
+            supervisor = Supervisor(bot_factory=FakeBot, journal=None)
+            server = await asyncio.start_server(supervisor.handle_client, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+
+            def watch():
+                messages = supervisor_client.subscribe(99, port=port)
+                try:
+                    return next(messages)
+                finally:
+                    messages.close()
+
+            try:
+                return await asyncio.to_thread(watch)
+            finally:
+                server.close()
+                await supervisor.shutdown()
+
+        first = asyncio.run(main())
+        self.assertEqual(first["status"], {"giveaway_id": 99, "active": False})
+
+
+class FakeUpstream:
+    """Stands in for a supervisor subscription; the test pushes messages into it."""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        self.closed = threading.Event()
+        self._condition = threading.Condition()
+
+    def push(self, message):
+        with self._condition:
+            self.messages.append(message)
+            self._condition.notify_all()
+
+    def __call__(self, giveaway_id):
+        self.connections += 1
+        sent = 0
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: len(self.messages) > sent, 0.05)
+                    pending = self.messages[sent:]
+                sent += len(pending)
+                for message in pending:
+                    yield message
+                if not pending:
+                    yield {"type": "ping"}
+        finally:
+            self.closed.set()
+
+
+class TestStatusHub(unittest.TestCase):
+    def setUp(self):
+        self.upstream = FakeUpstream()
+        self.hub = StatusHub(connect=self.upstream, queue_size=4, retry=0.01)
+
+    def tearDown(self):
+        # Viewers the test left connected; their feed threads stop on the next ping
+        for feed in list(self.hub._feeds.values()):
+            for listener in list(feed.listeners):
+                self.hub.unlisten(listener)
+
+    def snapshot(self, entries):
+        return {"type": "snapshot", "status": {"giveaway_id": 1, "active": True, "entries": entries}, "time": 0}
+
+    def test_one_upstream_for_many_viewers(self):
+        listeners = [self.hub.listen(1) for _ in range(50)]
+        self.upstream.push(self.snapshot(3))
+        self.upstream.push({"type": "delta", "changes": {"entries": 4}, "time": 0})
+        for listener in listeners:
+            self.assertEqual(listener.get(5)["status"]["entries"], 3)
+            self.assertEqual(listener.get(5)["changes"], {"entries": 4})
+        self.assertEqual(self.upstream.connections, 1)
+        self.assertEqual(self.hub.snapshot()["listeners"], 50)
+
+        # A late viewer starts from the merged state, not from the first snapshot
+        late = self.hub.listen(1)
+        self.assertEqual(late.get(5)["status"]["entries"], 4)
+        self.assertEqual(self.upstream.connections, 1)
+
+    def test_slow_viewer_is_resynced(self):
+        slow = self.hub.listen(1)
+        self.upstream.push(self.snapshot(0))
+        for entries in range(1, 21):
+            self.upstream.push({"type": "delta", "changes": {"entries": entries}, "time": 0})
+        # Nothing was read while 21 messages went out, so the backlog was cut to a snapshot
+        state = {}
+        while state.get("entries") != 20:
+            self.assertLessEqual(len(slow), 4)
+            message = slow.get(5)
+            state.update(message["status"] if message["type"] == "snapshot" else message["changes"])
+        self.assertGreater(slow.dropped, 0)
+
+        fast = self.hub.listen(1)
+        self.assertEqual(fast.get(5)["status"]["entries"], 20)
+
+    def test_feed_reconnects_after_any_error(self):
+        attempts = []
+
+        def connect(giveaway_id):
+            attempts.append(giveaway_id)
+            if len(attempts) == 1:
+                raise OSError("Connection reset by peer")
+            if len(attempts) == 2:
+                return garbled()
+            return self.upstream(giveaway_id)
+
+        def garbled():
+            yield {"type": "snapshot", "status": "not a dict"}
+
+        self.hub.connect = connect
+        with self.assertLogs("status", "ERROR"):
+            listener = self.hub.listen(1)
+            self.upstream.push(self.snapshot(5))
+            self.assertEqual(listener.get(5)["status"]["entries"], 5)
+        self.assertEqual(len(attempts), 3)
+
+    def test_feed_stops_after_last_viewer(self):
+        listener = self.hub.listen(1)
+        self.upstream.push(self.snapshot(1))
+        listener.get(5)
+        self.hub.unlisten(listener)
+        self.assertTrue(self.upstream.closed.wait(5))
+        self.assertEqual(self.hub.snapshot()["feeds"], 0)
+
+    def test_listener_timeout(self):
+        self.assertIsNone(Listener(1).get(0.01))
+
+    def test_async_listener_is_woken_from_the_feed_thread(self):
+        async def main():
+            listener = AsyncListener(1)
+            self.assertIsNone(await listener.get(0.01))
+            message = {"type": "delta", "changes": {"entries": 1}}
+            threading.Timer(0.05, listener.offer, (message, message)).start()
+            return await listener.get(5)
+
+        self.assertEqual(asyncio.run(main())["changes"], {"entries": 1})
+
+    def test_format_event(self):
+        event = format_event({"type": "delta", "changes": {"entries": 2}})
+        self.assertTrue(event.startswith("event: delta\ndata: "))
+        self.assertTrue(event.endswith("\n\n"))
+        self.assertEqual(json.loads(event.split("data: ", 1)[1])["changes"], {"entries": 2})
+
+
+class TestEventsRoute(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        self.upstream = FakeUpstream()
+        self.hub = StatusHub(connect=self.upstream)
+        patcher = patch.object(app_module, "status_hub", self.hub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        db_session = SessionLocal()
+        db_session.add_all([User(id=1, twitch_id="t1", username="owner"), User(id=2, twitch_id="t2", username="viewer")])
+        db_session.add(Giveaway(id=1, title="Live", frequency=10, threshold=0, creator_id=1, active=True))
+        db_session.add(Giveaway(id=2, title="Stopped", frequency=10, threshold=0, creator_id=1))
+        db_session.commit()
+        db_session.close()
+
+    def test_requires_login(self):
+        self.assertEqual(self.client.get("/giveaway/1/events").status_code, 401)
+
+    def test_viewers_watch_running_giveaways(self):
+        with self.client.session_transaction() as session:
+            session["user_id"] = 2
+        self.assertEqual(self.client.get("/giveaway/2/events").status_code, 404)
+        self.assertEqual(self.client.get("/giveaway/99/events").status_code, 404)
+        self.assertIn(b"EventSource", self.client.get("/giveaway/view/1").data)
+        response = self.client.get("/giveaway/1/events", buffered=False)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_access_is_checked_once_per_feed(self):
+        with self.client.session_transaction() as session:
+            session["user_id"] = 2
+        first = self.client.get("/giveaway/1/events", buffered=False)
+        next(iter(first.response))
+        # Viewers joining an open feed cost no query
+        checkouts = pool_metrics.checkouts
+        second = self.client.get("/giveaway/1/events", buffered=False)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(pool_metrics.checkouts, checkouts)
+        second.close()
+        first.close()
+
+    def test_streams_without_database_reads(self):
+        with self.client.session_transaction() as session:
+            session["user_id"] = 1
+        self.upstream.push({"type": "snapshot", "status": {"giveaway_id": 1, "entries": 2}, "time": 0})
+
+        response = self.client.get("/giveaway/1/events", buffered=False)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        # Only the check that the giveaway is live queries, before the stream starts
+        checkouts = pool_metrics.checkouts
+        chunks = iter(response.response)
+        self.assertTrue(next(chunks).decode().startswith("retry:"))
+        event = next(chunks).decode()
+        self.assertTrue(event.startswith("event: snapshot"))
+        self.assertIn('"entries":2', event)
+        response.close()
+
+        self.assertEqual(pool_metrics.checkouts, checkouts)
+        self.assertEqual(self.hub.snapshot()["listeners"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+
+import supervisor_client
+from giveaway_session import SessionRegistry
+from supervisor import Supervisor
+from supervisor_client import SupervisorError
+
+
+class FakeBot:
+    """Stands in for chatbot.Bot without connecting to Twitch."""
+
+    def __init__(self, giveaway_id=None, channel=None, exit_on_shutdown=True):
+        self.giveaway_id = giveaway_id
+        self.channel = channel
+        self.exit_on_shutdown = exit_on_shutdown
+        self.sessions = SessionRegistry()
+        self.finished = asyncio.Event()
+
+    async def start(self):
+        await self.finished.wait()
+
+    async def stop(self):
+        self.finished.set()
+
+
+class TestSupervisor(unittest.TestCase):
+    def run_with_server(self, scenario):
+        """Run `scenario(supervisor, port)` in a worker thread against a live control socket."""
+
+        async def main():
+            supervisor = Supervisor(bot_factory=FakeBot, journal=None)
+            server = await asyncio.start_server(supervisor.handle_client, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await asyncio.to_thread(scenario, supervisor, port)
+            finally:
+                server.close()
+                await supervisor.shutdown()
+
+        return asyncio.run(main())
+
+    def test_runs_many_giveaways_in_one_process(self):
+        """Hundreds of giveaways run side by side, one per channel."""
+
+        def scenario(supervisor, port):
+            for giveaway_id in range(1, 201):
+                reply = supervisor_client.send_command(
+                    "start", port=port, giveaway_id=giveaway_id, channel=f"Streamer{giveaway_id}"
+                )
+                self.assertTrue(reply["ok"], reply)
+
+            status = supervisor_client.send_command("status", port=port)
+            self.assertEqual(len(status["runners"]), 200)
+            # Hosted bots must never take the supervisor process down with them
+            self.assertFalse(any(runner.bot.exit_on_shutdown for runner in supervisor.runners.values()))
+
+            reply = supervisor_client.send_command("stop", port=port, giveaway_id=42)
+            self.assertTrue(reply["ok"])
+            status = supervisor_client.send_command("status", port=port)
+            self.assertEqual(len(status["runners"]), 199)
+            self.assertNotIn(42, [runner["giveaway_id"] for runner in status["runners"]])
+
+        self.run_with_server(scenario)
+
+    def test_one_giveaway_per_channel(self):
+        """A second giveaway in a busy channel is rejected."""
+
+        def scenario(supervisor, port):
+            self.assertTrue(supervisor_client.send_command("start", port=port, giveaway_id=1, channel="chan")["ok"])
+            reply = supervisor_client.send_command("start", port=port, giveaway_id=2, channel="CHAN")
+            self.assertFalse(reply["ok"])
+            self.assertIn("already running", reply["error"])
+            reply = supervisor_client.send_command("start", port=port, giveaway_id=1, channel="other")
+            self.assertFalse(reply["ok"])
+
+        self.run_with_server(scenario)
+
+    def test_stop_unknown_giveaway(self):
+        def scenario(supervisor, port):
+            reply = supervisor_client.send_command("stop", port=port, giveaway_id=99)
+            self.assertFalse(reply["ok"])
+            reply = supervisor_client.send_command("bogus", port=port)
+            self.assertFalse(reply["ok"])
+
+        self.run_with_server(scenario)
+
+    def test_finished_bot_frees_its_channel(self):
+        """When a giveaway ends on its own the runner is removed."""
+
+        async def main():
+            supervisor = Supervisor(bot_factory=FakeBot, journal=None)
+            supervisor.start(7, "chan")
+            runner = supervisor.runners["chan"]
+            runner.bot.finished.set()
+            await runner.task
+            return supervisor
+
+        supervisor = asyncio.run(main())
+        self.assertEqual(supervisor.runners, {})
+
+    def test_client_reports_unreachable_supervisor(self):
+        with self.assertRaises(SupervisorError):
+            supervisor_client.send_command("status", port=1, timeout=0.5)
@@ -0,0 +1,246 @@
+import asyncio
+import socket
+import unittest
+from unittest.mock import patch
+
+import app as app_module
+from app import app
+from models import User
+from tests.fake_twitch import FakeTwitch
+from twitch_api import AsyncTwitchClient, TwitchAPIError, TwitchClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTwitchClient(unittest.TestCase):
+    def setUp(self):
+        self.twitch = FakeTwitch().__enter__()
+        self.addCleanup(self.twitch.__exit__)
+        self.twitch.add_user("100", "alice", token="alice-code")
+        self.twitch.add_user("200", "bob")
+        self.clock = FakeClock()
+        self.sleeps = []
+        self.client = self.make_client()
+        self.addCleanup(self.client.close)
+
+    def make_client(self, **options):
+        options.setdefault("timeout", (1, 1))
+        return TwitchClient(
+            "client-id",
+            "secret",
+            auth_url=f"{self.twitch.url}/oauth2",
+            api_url=f"{self.twitch.url}/helix",
+            clock=self.clock,
+            sleep=self.sleeps.append,
+            **options,
+        )
+
+    def test_login_flow(self):
+        token = self.client.exchange_code("alice-code", "http://localhost/callback")
+        user = self.client.get_current_user(token["access_token"])
+        self.assertEqual(user["display_name"], "Alice")
+        # The login fills the user cache
+        self.assertEqual(self.client.get_user("100"), user)
+        self.assertEqual(self.twitch.count("GET", "/helix/users"), 1)
+
+    def test_bad_code_is_not_retried(self):
+        with self.assertRaises(TwitchAPIError) as raised:
+            self.client.exchange_code("wrong", "http://localhost/callback")
+        self.assertEqual(raised.exception.status, 400)
+        self.assertEqual(self.twitch.count("POST", "/oauth2/token"), 1)
+
+    def test_retries_transient_failures_with_backoff(self):
+        self.twitch.fail_next(503, 429)
+        self.assertEqual(self.client.get_user("200")["login"], "bob")
+        self.assertEqual(len(self.sleeps), 2)
+        # Jittered, and never above the doubled ceiling
+        self.assertLessEqual(self.sleeps[0], self.client.backoff)
+        self.assertLessEqual(self.sleeps[1], self.client.backoff * 2)
+
+    def test_gives_up_after_retries(self):
+        self.twitch.fail_next(500, 500, 500)
+        with self.assertRaises(TwitchAPIError) as raised:
+            self.client.app_access_token()
+        self.assertEqual(raised.exception.status, 500)
+        self.assertEqual(self.twitch.count("POST", "/oauth2/token"), self.client.retries + 1)
+
+    def test_read_timeout(self):
+        self.twitch.delay = 0.5
+        client = self.make_client(timeout=(1, 0.1), retries=1)
+        self.addCleanup(client.close)
+        with self.assertRaises(TwitchAPIError) as raised:
+            client.app_access_token()
+        self.assertIsNone(raised.exception.status)
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_code_exchange_is_not_retried_once_sent(self):
+        """An authorization code is single-use, so a failure after sending it is final."""
+        self.twitch.fail_next(503)
+        with self.assertRaises(TwitchAPIError):
+            self.client.exchange_code("alice-code", "http://localhost/callback")
+        self.twitch.delay = 0.5
+        client = self.make_client(timeout=(1, 0.1))
+        self.addCleanup(client.close)
+        with self.assertRaises(TwitchAPIError):
+            client.exchange_code("alice-code", "http://localhost/callback")
+        self.assertEqual(self.twitch.count("POST", "/oauth2/token"), 2)
+        self.assertEqual(self.sleeps, [])
+
+    def test_code_exchange_is_retried_when_the_connection_fails(self):
+        with socket.socket() as unused:
+            unused.bind(("127.0.0.1", 0))
+            port = unused.getsockname()[1]
+        client = self.make_client()
+        client.auth_url = f"http://127.0.0.1:{port}/oauth2"
+        self.addCleanup(client.close)
+        with self.assertRaises(TwitchAPIError):
+            client.exchange_code("alice-code", "http://localhost/callback")
+        self.assertEqual(len(self.sleeps), client.retries)
+
+    def test_login_time_is_capped(self):
+        self.twitch.fail_next(None, 503)
+        self.assertEqual(self.client.log_in("alice-code", "http://localhost/callback")["login"], "alice")
+        self.assertEqual(len(self.sleeps), 1)
+
+        # A retry that would end past the login's deadline is not made
+        client = self.make_client(login_timeout=1, backoff=10)
+        self.addCleanup(client.close)
+        self.twitch.fail_next(None, 503)
+        with patch("twitch_api.random.uniform", side_effect=lambda low, high: high):
+            with self.assertRaises(TwitchAPIError) as raised:
+                client.log_in("alice-code", "http://localhost/callback")
+        self.assertEqual(raised.exception.status, 503)
+        self.assertEqual(self.twitch.count("GET", "/helix/users"), 3)
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_user_cache(self):
+        users = self.client.get_users(["100", "200", "300"])
+        self.assertEqual(sorted(users), ["100", "200"])
+        self.assertEqual(self.client.get_users([100, 200]), {"100": users["100"], "200": users["200"]})
+        self.assertEqual(self.twitch.count("GET", "/helix/users"), 1)
+        self.assertEqual(self.client.snapshot()["user_cache"]["hits"], 2)
+
+        # Entries expire after the TTL
+        self.clock.now += self.client.users.ttl + 1
+        self.client.get_user("100")
+        self.assertEqual(self.twitch.count("GET", "/helix/users"), 2)
+
+    def test_batches_lookups(self):
+        for twitch_id in range(1000, 1250):
+            self.twitch.add_user(str(twitch_id), f"user{twitch_id}")
+        users = self.client.get_users(range(1000, 1250))
+        self.assertEqual(len(users), 250)
+        self.assertEqual(self.twitch.count("GET", "/helix/users"), 3)
+
+    def test_app_token_is_cached_and_refreshed(self):
+        first = self.client.app_access_token()
+        self.assertEqual(self.client.app_access_token(), first)
+        self.assertEqual(self.twitch.count("POST", "/oauth2/token"), 1)
+
+        # Refreshed shortly before Twitch would expire it
+        self.clock.now += self.twitch.token_lifetime - 30
+        self.assertNotEqual(self.client.app_access_token(), first)
+        self.assertEqual(self.twitch.count("POST", "/oauth2/token"), 2)
+
+    def test_revoked_app_token_is_replaced(self):
+        self.client.app_access_token()
+        self.twitch.revoke_app_tokens()
+        self.assertEqual(self.client.get_user("200")["login"], "bob")
+        self.assertEqual(self.twitch.count("POST", "/oauth2/token"), 2)
+
+    def test_reuses_connections(self):
+        for twitch_id in ("100", "200"):
+            self.client.get_user(twitch_id)
+            self.client.users.clear()
+        self.client.get_user("100")
+        # One connection for the token and three lookups
+        self.assertEqual(len(self.twitch.requests), 4)
+        self.assertEqual(len(self.twitch.connections), 1)
+
+
+class TestAsyncTwitchClient(unittest.TestCase):
+    def setUp(self):
+        self.twitch = FakeTwitch().__enter__()
+        self.addCleanup(self.twitch.__exit__)
+        self.twitch.add_user("100", "alice", token="alice-code")
+        self.sleeps = []
+
+    def run_client(self, call):
+        async def sleep(seconds):
+            self.sleeps.append(seconds)
+
+        async def run():
+            client = AsyncTwitchClient(
+                "client-id", "secret",
+                auth_url=f"{self.twitch.url}/oauth2", api_url=f"{self.twitch.url}/helix", sleep=sleep,
+            )
+            try:
+                return await call(client)
+            finally:
+                await client.close()
+
+        return asyncio.run(run())
+
+    def test_code_exchange_is_not_retried_once_sent(self):
+        self.twitch.fail_next(503)
+        with self.assertRaises(TwitchAPIError):
+            self.run_client(lambda client: client.log_in("alice-code", "http://localhost/callback"))
+        self.assertEqual(self.twitch.count("POST", "/oauth2/token"), 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_user_lookup_is_retried(self):
+        self.twitch.fail_next(None, 503)
+        user = self.run_client(lambda client: client.log_in("alice-code", "http://localhost/callback"))
+        self.assertEqual(user["login"], "alice")
+        self.assertEqual(len(self.sleeps), 1)
+
+
+class TestLoginCallback(unittest.TestCase):
+    def setUp(self):
+        app.config["TESTING"] = True
+        self.client = app.test_client()
+        self.twitch = FakeTwitch().__enter__()
+        self.addCleanup(self.twitch.__exit__)
+        self.twitch.add_user("callback-user", "streamer", token="good-code")
+        client = TwitchClient(
+            "client-id", "secret",
+            auth_url=f"{self.twitch.url}/oauth2", api_url=f"{self.twitch.url}/helix",
+            sleep=lambda seconds: None,
+        )
+        self.addCleanup(client.close)
+        patcher = patch.object(app_module, "twitch", client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_callback_logs_in(self):
+        response = self.client.get("/auth/twitch/callback?code=good-code")
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("/dashboard", response.location)
+        with self.client.session_transaction() as session:
+            user_id = session["user_id"]
+            self.assertEqual(session["username"], "Streamer")
+        db_session = app_module.SessionLocal()
+        try:
+            self.assertEqual(db_session.get(User, user_id).twitch_id, "callback-user")
+        finally:
+            db_session.close()
+
+    def test_callback_survives_a_blip(self):
+        self.twitch.fail_next(None, 502)  # The user lookup, after the code exchange
+        response = self.client.get("/auth/twitch/callback?code=good-code")
+        self.assertEqual(response.status_code, 302)
+
+    def test_callback_rejects_bad_code(self):
+        response = self.client.get("/auth/twitch/callback?code=bad-code")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"Twitch API error", response.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
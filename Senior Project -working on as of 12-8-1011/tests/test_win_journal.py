@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from chatbot_db import ChatbotDB
+from models import Base, Giveaway, Item, User, Winner
+from win_journal import WinJournal
+
+
+class TestWinJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.tmpdir.name, "wins.journal")
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmpdir.name, 'test.db')}")
+        Base.metadata.create_all(bind=self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+
+        self.commits = 0
+
+        @event.listens_for(self.session_factory, "after_commit")
+        def count_commit(db_session):
+            self.commits += 1
+
+        db_session = self.session_factory()
+        owner = User(twitch_id="owner", username="owner")
+        viewer = User(twitch_id="viewer", username="registered_viewer")
+        db_session.add_all([owner, viewer])
+        db_session.commit()
+        giveaway = Giveaway(title="Journal Test", frequency=1, threshold=0, creator_id=owner.id)
+        db_session.add(giveaway)
+        db_session.commit()
+        items = [Item(name=f"Key {i}", code=f"CODE{i}", giveaway_id=giveaway.id) for i in range(50)]
+        db_session.add_all(items)
+        db_session.commit()
+        self.giveaway_id = giveaway.id
+        self.item_ids = [item.id for item in items]
+        self.viewer_id = viewer.id
+        db_session.close()
+        self.commits = 0
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def make_journal(self, **kwargs):
+        return WinJournal(ChatbotDB(self.session_factory), path=self.journal_path, **kwargs)
+
+    def journal_lines(self):
+        with open(self.journal_path) as journal:
+            return [json.loads(line) for line in journal]
+
+    def won_items(self):
+        db_session = self.session_factory()
+        won = db_session.query(Item).filter_by(is_won=True).count()
+        winners = db_session.query(Winner).count()
+        db_session.close()
+        return won, winners
+
+    def test_batches_wins_into_one_transaction(self):
+        """Many wins are durable immediately and reach the database in one commit."""
+        journal = self.make_journal(interval=60)
+
+        async def run():
+            for i, item_id in enumerate(self.item_ids):
+                await journal.record(item_id, self.giveaway_id, f"viewer_{i}")
+            self.assertEqual(len(self.journal_lines()), 50)
+            self.assertEqual(self.won_items(), (0, 0))
+            await journal.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(self.won_items(), (50, 50))
+        self.assertEqual(self.journal_lines(), [])
+
+    def test_winner_rows_link_registered_users(self):
+        journal = self.make_journal(interval=60)
+
+        async def run():
+            await journal.record(self.item_ids[0], self.giveaway_id, "registered_viewer")
+            await journal.record(self.item_ids[1], self.giveaway_id, "anonymous_viewer")
+            await journal.close()
+
+        asyncio.run(run())
+        db_session = self.session_factory()
+        winners = {row.item_id: row for row in db_session.query(Winner)}
+        item = db_session.query(Item).filter_by(id=self.item_ids[0]).first()
+        self.assertEqual(winners[self.item_ids[0]].user_id, self.viewer_id)
+        self.assertIsNone(winners[self.item_ids[1]].user_id)
+        self.assertEqual(winners[self.item_ids[1]].giveaway_id, self.giveaway_id)
+        self.assertEqual(item.winner_username, "registered_viewer")
+        db_session.close()
+
+    def test_replays_wins_after_crash(self):
+        """Wins journaled by a process that died before flushing are not lost."""
+        crashed = self.make_journal(interval=60)
+
+        async def crash():
+            for item_id in self.item_ids[:5]:
+                await crashed.record(item_id, self.giveaway_id, "lucky_viewer")
+            # Simulate a hard crash: no flush, no close; a write was cut off mid-line
+            with open(self.journal_path, "a") as journal:
+                journal.write('{"seq": 6, "item_')
+
+        asyncio.run(crash())
+        self.assertEqual(self.won_items(), (0, 0))
+
+        async def restart():
+            journal = self.make_journal(interval=60)
+            await journal.start()
+            await journal.close()
+
+        asyncio.run(restart())
+        self.assertEqual(self.won_items(), (5, 5))
+        self.assertEqual(self.journal_lines(), [])
+
+    def test_replay_is_idempotent(self):
+        """Re-applying wins that already reached the database adds nothing."""
+        journal = self.make_journal(interval=60)
+
+        async def run():
+            for item_id in self.item_ids[:3]:
+                await journal.record(item_id, self.giveaway_id, "viewer")
+            await journal.flush()
+
+        asyncio.run(run())
+        # Crash between the commit and compacting the journal
+        with open(self.journal_path, "w") as journal_file:
+            for seq, item_id in enumerate(self.item_ids[:3], start=1):
+                journal_file.write(json.dumps({"seq": seq, "item_id": item_id, "giveaway_id": self.giveaway_id, "winner": "viewer"}) + "\n")
+
+        async def restart():
+            replay = self.make_journal(interval=60)
+            await replay.start()
+            await replay.close()
+
+        asyncio.run(restart())
+        self.assertEqual(self.won_items(), (3, 3))
+
+    def test_win_recorded_during_flush_stays_journaled(self):
+        """A win whose append finishes while the batch before it commits is kept in the file."""
+        journal = self.make_journal(interval=60)
+        appended = threading.Event()
+        apply_wins = journal.db.apply_wins
+        append = journal._append
+
+        async def slow_apply_wins(wins):
+            # The commit finishes only once the next win's line is on disk
+            await asyncio.get_running_loop().run_in_executor(None, appended.wait, 5)
+            return await apply_wins(wins)
+
+        def append_then_stall(entry):
+            append(entry)
+            appended.set()
+            time.sleep(0.05)  # `record` resumes only after the flush has moved on
+
+        async def run():
+            await journal.record(self.item_ids[0], self.giveaway_id, "first")
+            journal.db.apply_wins = slow_apply_wins
+            flushing = asyncio.create_task(journal.flush())
+            await asyncio.sleep(0)
+            journal._append = append_then_stall
+            await journal.record(self.item_ids[1], self.giveaway_id, "second")
+            await flushing
+
+            # Crash here: the second win is in neither the database nor, before the fix, the file
+            self.assertEqual(journal.pending, 1)
+            self.assertEqual([entry["winner"] for entry in self.journal_lines()], ["second"])
+            journal.db.apply_wins = apply_wins
+            await journal.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.won_items(), (2, 2))
+        self.assertEqual(self.journal_lines(), [])
+
+    def test_flushes_early_when_batch_is_full(self):
+        journal = self.make_journal(interval=60, batch_size=10)
+
+        async def run():
+            for item_id in self.item_ids[:10]:
+                await journal.record(item_id, self.giveaway_id, "viewer")
+            for _ in range(100):
+                if journal.flushed:
+                    break
+                await asyncio.sleep(0.01)
+            flushed = journal.flushed
+            await journal.close()
+            return flushed
+
+        self.assertEqual(asyncio.run(run()), 10)
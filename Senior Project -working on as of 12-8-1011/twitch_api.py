@@ -0,0 +1,396 @@
+"""
+Client for Twitch's OAuth and Helix APIs.
+
+All calls share one pooled requests.Session, so logins reuse keep-alive
+connections instead of doing a TLS handshake each. Every call has connect
+and read timeouts, and transient failures (connection errors, timeouts, 429
+and 5xx) are retried a few times with jittered exponential backoff, so a
+slow Twitch holds a web worker for a bounded time. A POST that may have
+reached Twitch is not retried, since the authorization code it carries
+can only be used once; it is retried only when the connection failed. A
+whole login is capped at TWITCH_LOGIN_TIMEOUT seconds, retries included.
+
+User lookups are cached by twitch_id, and the app access token used for
+them is cached until shortly before it expires.
+
+TwitchClient is for the Flask app; AsyncTwitchClient is the same client for
+the ASGI mode (asgi.py), on aiohttp.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from page_cache import MemoryCache
+
+log = logging.getLogger("twitch")
+
+TWITCH_AUTH_URL = os.getenv("TWITCH_AUTH_URL", "https://id.twitch.tv/oauth2")
+TWITCH_API_URL = os.getenv("TWITCH_API_URL", "https://api.twitch.tv/helix")
+TWITCH_CONNECT_TIMEOUT = float(os.getenv("TWITCH_CONNECT_TIMEOUT", "3.05"))
+TWITCH_READ_TIMEOUT = float(os.getenv("TWITCH_READ_TIMEOUT", "5"))
+TWITCH_RETRIES = int(os.getenv("TWITCH_RETRIES", "2"))  # Retries after the first attempt
+TWITCH_BACKOFF = float(os.getenv("TWITCH_BACKOFF", "0.25"))  # Base delay in seconds, doubled per retry
+TWITCH_LOGIN_TIMEOUT = float(os.getenv("TWITCH_LOGIN_TIMEOUT", "10"))  # Seconds a login may spend on Twitch, retries included
+TWITCH_POOL_SIZE = int(os.getenv("TWITCH_POOL_SIZE", "10"))  # Keep-alive connections per host
+# In ASGI mode the pool is the only limit on concurrent Twitch calls, so it is larger
+TWITCH_ASYNC_POOL_SIZE = int(os.getenv("TWITCH_ASYNC_POOL_SIZE", "100"))
+TWITCH_USER_CACHE_TTL = float(os.getenv("TWITCH_USER_CACHE_TTL", "300"))
+TWITCH_USER_CACHE_SIZE = int(os.getenv("TWITCH_USER_CACHE_SIZE", "10000"))
+
+TOKEN_EXPIRY_MARGIN = 60  # Refresh the app token this many seconds before Twitch expires it
+MAX_USERS_PER_REQUEST = 100  # Helix limit for /users
+
+
+class TwitchAPIError(Exception):
+    """A Twitch call failed. `status` is the HTTP status, or None if there was no response."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _retryable(status):
+    return status == 429 or status >= 500
+
+
+def _unsent(error):
+    """Whether a requests exception was raised before the request could reach Twitch."""
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(error, requests.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+# aiohttp errors raised before a request is sent; connect timeouts have their own class from aiohttp 3.10
+_ASYNC_UNSENT = (aiohttp.ClientConnectorError, getattr(aiohttp, "ConnectionTimeoutError", aiohttp.ClientConnectorError))
+
+
+class BaseTwitchClient:
+    """Configuration, caches and request building shared by the sync and async clients."""
+
+    def __init__(
+        self,
+        client_id=None,
+        client_secret=None,
+        auth_url=TWITCH_AUTH_URL,
+        api_url=TWITCH_API_URL,
+        timeout=(TWITCH_CONNECT_TIMEOUT, TWITCH_READ_TIMEOUT),
+        retries=TWITCH_RETRIES,
+        backoff=TWITCH_BACKOFF,
+        login_timeout=TWITCH_LOGIN_TIMEOUT,
+        pool_size=TWITCH_POOL_SIZE,
+        user_cache_ttl=TWITCH_USER_CACHE_TTL,
+        user_cache_size=TWITCH_USER_CACHE_SIZE,
+        clock=time.time,
+    ):
+        self.client_id = client_id or os.getenv("TWITCH_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("TWITCH_CLIENT_SECRET")
+        self.auth_url = auth_url.rstrip("/")
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.login_timeout = login_timeout
+        self.pool_size = pool_size
+        self.clock = clock
+        self.users = MemoryCache(ttl=user_cache_ttl, max_entries=user_cache_size, clock=clock)
+        self._app_token = None
+        self._app_token_expires = 0
+
+    def _remaining(self, deadline, error=None):
+        """Seconds left before `deadline`, or None without one. Raises `error` once it has passed."""
+        if deadline is None:
+            return None
+        remaining = deadline - self.clock()
+        if remaining <= 0:
+            raise error or TwitchAPIError("Twitch login timed out")
+        return remaining
+
+    def _attempt_timeout(self, deadline):
+        """(connect, read) timeouts for one attempt, cut short to end by `deadline`."""
+        remaining = self._remaining(deadline)
+        if remaining is None:
+            return self.timeout
+        return tuple(min(timeout, remaining) for timeout in self.timeout)
+
+    def _retry_delay(self, attempt, error, deadline=None):
+        # Full jitter, so workers that failed together do not retry together
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        remaining = self._remaining(deadline, error)
+        if remaining is not None and delay >= remaining:
+            raise error
+        log.warning("%s; retrying in %.2fs", error, delay)
+        return delay
+
+    def _code_grant(self, code, redirect_uri):
+        return {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": redirect_uri,
+        }
+
+    def _app_grant(self):
+        return {"client_id": self.client_id, "client_secret": self.client_secret, "grant_type": "client_credentials"}
+
+    def _headers(self, access_token):
+        return {"Authorization": f"Bearer {access_token}", "Client-Id": self.client_id or ""}
+
+    @staticmethod
+    def _check_token(token):
+        if "access_token" not in token:
+            raise TwitchAPIError("Twitch token response is missing access_token")
+        return token
+
+    def _current_user(self, body):
+        data = body.get("data")
+        if not data:
+            raise TwitchAPIError("Twitch user data is missing or empty")
+        user = data[0]
+        self.users.set(user["id"], "twitch", user)
+        return user
+
+    def _cached_app_token(self):
+        if self._app_token is None or self.clock() >= self._app_token_expires:
+            return None
+        return self._app_token
+
+    def _store_app_token(self, token):
+        self._check_token(token)
+        self._app_token = token["access_token"]
+        self._app_token_expires = self.clock() + token.get("expires_in", 3600) - TOKEN_EXPIRY_MARGIN
+        return self._app_token
+
+    def _split_cached(self, twitch_ids):
+        """(found, batches): cached users by twitch_id, and /users query params for the rest, 100 IDs each."""
+        found = {}
+        missing = []
+        for twitch_id in dict.fromkeys(str(twitch_id) for twitch_id in twitch_ids):
+            user = self.users.get(twitch_id)
+            if user is None:
+                self.users.stats.misses += 1
+                missing.append(twitch_id)
+            else:
+                self.users.stats.hits += 1
+                found[twitch_id] = user
+        batches = [
+            [("id", twitch_id) for twitch_id in missing[start:start + MAX_USERS_PER_REQUEST]]
+            for start in range(0, len(missing), MAX_USERS_PER_REQUEST)
+        ]
+        return found, batches
+
+    def _add_users(self, found, body):
+        for user in body.get("data", []):
+            self.users.set(user["id"], "twitch", user)
+            found[user["id"]] = user
+
+    def snapshot(self):
+        return {"user_cache": self.users.snapshot(), "app_token_cached": self._app_token is not None}
+
+
+class TwitchClient(BaseTwitchClient):
+    def __init__(self, client_id=None, client_secret=None, sleep=time.sleep, **options):
+        super().__init__(client_id, client_secret, **options)
+        self.sleep = sleep
+        # Retries are done here, with backoff, rather than by urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+        self.http = requests.Session()
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+        self._token_lock = threading.Lock()
+
+    def request(self, method, url, idempotent=None, deadline=None, **kwargs):
+        """
+        Make one API call with timeouts and retries and return the decoded
+        JSON body. Only GETs are idempotent unless `idempotent` says so; other
+        calls are retried only if the connection failed. No attempt or retry
+        runs past `deadline`, a time from the client's clock.
+        """
+        if idempotent is None:
+            idempotent = method == "GET"
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.http.request(method, url, timeout=self._attempt_timeout(deadline), **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = TwitchAPIError(f"Twitch request to {url} failed: {e}")
+                if not idempotent and not _unsent(e):
+                    raise error
+            else:
+                if response.status_code < 400:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        raise TwitchAPIError(f"Invalid JSON from Twitch at {url}", response.status_code)
+                error = TwitchAPIError(f"Twitch returned {response.status_code} for {url}", response.status_code)
+                if not idempotent or not _retryable(response.status_code):
+                    raise error
+            if attempt < self.retries:
+                self.sleep(self._retry_delay(attempt, error, deadline))
+        raise error
+
+    def exchange_code(self, code, redirect_uri, deadline=None):
+        """Trade an OAuth authorization code for the user's token response."""
+        return self._check_token(self.request(
+            "POST", f"{self.auth_url}/token", data=self._code_grant(code, redirect_uri), deadline=deadline
+        ))
+
+    def get_current_user(self, access_token, deadline=None):
+        """The user a user access token belongs to. Also caches them by twitch_id."""
+        return self._current_user(self.request(
+            "GET", f"{self.api_url}/users", headers=self._headers(access_token), deadline=deadline
+        ))
+
+    def log_in(self, code, redirect_uri):
+        """The user an OAuth authorization code belongs to, within `login_timeout` seconds."""
+        deadline = self.clock() + self.login_timeout
+        token = self.exchange_code(code, redirect_uri, deadline)
+        return self.get_current_user(token["access_token"], deadline)
+
+    def app_access_token(self):
+        """An app access token (client credentials grant), fetched once and reused until it nearly expires."""
+        with self._token_lock:
+            # Asking again for an app token is harmless, so it is retried like a GET
+            return self._cached_app_token() or self._store_app_token(
+                self.request("POST", f"{self.auth_url}/token", data=self._app_grant(), idempotent=True)
+            )
+
+    def helix(self, path, params=None):
+        """GET a Helix endpoint with the app access token, refreshing it once if Twitch revoked it."""
+        for attempt in range(2):
+            token = self.app_access_token()
+            try:
+                return self.request("GET", f"{self.api_url}/{path}", params=params, headers=self._headers(token))
+            except TwitchAPIError as e:
+                if e.status != 401 or attempt:
+                    raise
+                with self._token_lock:
+                    if self._app_token == token:
+                        self._app_token = None
+
+    def get_users(self, twitch_ids):
+        """Users by twitch_id as {twitch_id: user}; cached users are not requested again. Unknown IDs are left out."""
+        found, batches = self._split_cached(twitch_ids)
+        for batch in batches:
+            self._add_users(found, self.helix("users", params=batch))
+        return found
+
+    def get_user(self, twitch_id):
+        """One user by twitch_id, or None if Twitch does not know them."""
+        return self.get_users([twitch_id]).get(str(twitch_id))
+
+    def close(self):
+        self.http.close()
+
+
+class AsyncTwitchClient(BaseTwitchClient):
+    """
+    The same API as TwitchClient for asyncio code, on aiohttp. The connection
+    pool is created on first use, inside the running event loop.
+    """
+
+    def __init__(self, client_id=None, client_secret=None, sleep=asyncio.sleep, **options):
+        options.setdefault("pool_size", TWITCH_ASYNC_POOL_SIZE)
+        super().__init__(client_id, client_secret, **options)
+        self.sleep = sleep
+        self._http = None
+        self._token_lock = None
+
+    @property
+    def http(self):
+        if self._http is None or self._http.closed:
+            connect, read = self.timeout
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read),
+            )
+        return self._http
+
+    async def request(self, method, url, idempotent=None, deadline=None, **kwargs):
+        """Make one API call with timeouts and retries and return the decoded JSON body, as TwitchClient.request."""
+        if idempotent is None:
+            idempotent = method == "GET"
+        for attempt in range(self.retries + 1):
+            remaining = self._remaining(deadline)
+            if remaining is not None:
+                connect, read = self._attempt_timeout(deadline)
+                kwargs["timeout"] = aiohttp.ClientTimeout(total=remaining, sock_connect=connect, sock_read=read)
+            try:
+                async with self.http.request(method, url, **kwargs) as response:
+                    if response.status < 400:
+                        try:
+                            return await response.json(content_type=None)
+                        except ValueError:
+                            raise TwitchAPIError(f"Invalid JSON from Twitch at {url}", response.status)
+                    error = TwitchAPIError(f"Twitch returned {response.status} for {url}", response.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = TwitchAPIError(f"Twitch request to {url} failed: {e!r}")
+                if not idempotent and not isinstance(e, _ASYNC_UNSENT):
+                    raise error
+            else:
+                if not idempotent or not _retryable(error.status):
+                    raise error
+            if attempt < self.retries:
+                await self.sleep(self._retry_delay(attempt, error, deadline))
+        raise error
+
+    async def exchange_code(self, code, redirect_uri, deadline=None):
+        """Trade an OAuth authorization code for the user's token response."""
+        return self._check_token(await self.request(
+            "POST", f"{self.auth_url}/token", data=self._code_grant(code, redirect_uri), deadline=deadline
+        ))
+
+    async def get_current_user(self, access_token, deadline=None):
+        """The user a user access token belongs to. Also caches them by twitch_id."""
+        return self._current_user(await self.request(
+            "GET", f"{self.api_url}/users", headers=self._headers(access_token), deadline=deadline
+        ))
+
+    async def log_in(self, code, redirect_uri):
+        """The user an OAuth authorization code belongs to, within `login_timeout` seconds."""
+        deadline = self.clock() + self.login_timeout
+        token = await self.exchange_code(code, redirect_uri, deadline)
+        return await self.get_current_user(token["access_token"], deadline)
+
+    async def app_access_token(self):
+        """An app access token, fetched once and reused until it nearly expires."""
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            return self._cached_app_token() or self._store_app_token(
+                await self.request("POST", f"{self.auth_url}/token", data=self._app_grant(), idempotent=True)
+            )
+
+    async def helix(self, path, params=None):
+        """GET a Helix endpoint with the app access token, refreshing it once if Twitch revoked it."""
+        for attempt in range(2):
+            token = await self.app_access_token()
+            try:
+                return await self.request("GET", f"{self.api_url}/{path}", params=params, headers=self._headers(token))
+            except TwitchAPIError as e:
+                if e.status != 401 or attempt:
+                    raise
+                if self._app_token == token:
+                    self._app_token = None
+
+    async def get_users(self, twitch_ids):
+        """Users by twitch_id as {twitch_id: user}; cached users are not requested again. Unknown IDs are left out."""
+        found, batches = self._split_cached(twitch_ids)
+        for batch in batches:
+            self._add_users(found, await self.helix("users", params=batch))
+        return found
+
+    async def get_user(self, twitch_id):
+        """One user by twitch_id, or None if Twitch does not know them."""
+        return (await self.get_users([twitch_id])).get(str(twitch_id))
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
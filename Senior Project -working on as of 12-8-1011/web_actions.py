@@ -0,0 +1,101 @@
+"""
+Request logic shared by the Flask views (app.py) and the async routes of
+the ASGI mode (asgi.py), so the two entry points cannot drift apart.
+
+Each function takes a database session and does the checks and writes for
+one action; talking to Twitch or the chatbot supervisor is left to the
+caller, which does it blocking or awaited. A failed check raises
+ActionError with the message and HTTP status to respond with.
+"""
+from sqlalchemy.exc import IntegrityError
+
+from models import Giveaway, User
+from page_cache import page_cache, user_tag
+
+
+class ActionError(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def find_or_create_user(db_session, user_info):
+    """The User for a Twitch /users record, created on their first login."""
+    user = db_session.query(User).filter_by(twitch_id=user_info["id"]).first()
+    if not user:
+        # Create a new user
+        user = User(
+            twitch_id=user_info["id"],
+            username=user_info["display_name"],
+        )
+        db_session.add(user)
+        try:
+            db_session.commit()
+        except IntegrityError:
+            # A concurrent first login created them
+            db_session.rollback()
+            user = db_session.query(User).filter_by(twitch_id=user_info["id"]).one()
+    return user
+
+
+def log_in(db_session, user_info):
+    """
+    Session values for the viewer in a Twitch /users record: the user ID, and
+    the username that /winnings matches won items on.
+    """
+    user = find_or_create_user(db_session, user_info)
+    return {"user_id": user.id, "username": user.username}
+
+
+def owned_giveaway(db_session, giveaway_id, user_id):
+    """The visible giveaway `giveaway_id`, if `user_id` created it."""
+    giveaway = db_session.query(Giveaway).filter(Giveaway.visible()).filter_by(id=giveaway_id).first()
+    if not giveaway:
+        raise ActionError("Giveaway not found.", 404)
+    if giveaway.creator_id != user_id:
+        raise ActionError("Unauthorized to control this giveaway.", 403)
+    return giveaway
+
+
+def live_giveaway(db_session, giveaway_id):
+    """Whether `giveaway_id` is visible and running, so anyone logged in may watch its live status."""
+    return db_session.query(
+        db_session.query(Giveaway).filter(Giveaway.visible(), Giveaway.active.is_(True)).filter_by(id=giveaway_id).exists()
+    ).scalar()
+
+
+def start_channel(db_session, giveaway_id, user_id):
+    """
+    The channel a bot for `giveaway_id` joins: the creator's own, so
+    streamers can run giveaways side by side.
+    """
+    giveaway = owned_giveaway(db_session, giveaway_id, user_id)
+    return giveaway.creator.username.lower()
+
+
+def _set_active(db_session, giveaway_id, active):
+    giveaway = db_session.get(Giveaway, giveaway_id)
+    giveaway.active = active
+    if not active:
+        # Forget the draw schedule, so the giveaway does not resume when the supervisor restarts
+        giveaway.next_draw_at = None
+    db_session.commit()
+    page_cache.invalidate(user_tag(giveaway.creator_id))
+
+
+def record_start(db_session, giveaway_id, reply):
+    """Mark the giveaway active once the supervisor's reply to "start" says its bot is running."""
+    if not reply.get("ok"):
+        raise ActionError(reply.get("error", "Failed to start chatbot."), 400)
+    _set_active(db_session, giveaway_id, True)
+
+
+def record_stop(db_session, giveaway_id, reply):
+    """
+    Mark the giveaway inactive and clear its next draw once the supervisor's
+    reply to "stop" says its bot has stopped. Nothing is written otherwise.
+    """
+    if not reply.get("ok"):
+        raise ActionError("No running chatbot found for this giveaway.", 404)
+    _set_active(db_session, giveaway_id, False)
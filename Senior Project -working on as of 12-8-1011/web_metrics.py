@@ -0,0 +1,54 @@
+"""
+Request metrics for the Flask app, served with everything else in the
+metrics registry at /metrics.
+
+Every request is timed by its route pattern rather than its URL, so one
+series covers every giveaway's page. The SQL statements a request runs and
+the time they take come from db_scope.query_metrics.
+"""
+import time
+
+from flask import g, request
+
+from db_scope import query_metrics
+from metrics import COUNT_BUCKETS, registry
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to handle a request, until the response starts.",
+    ["method", "route", "status"],
+)
+request_queries = registry.histogram(
+    "http_request_db_queries", "SQL statements run by one request.", ["route"], buckets=COUNT_BUCKETS
+)
+request_query_time = registry.histogram(
+    "http_request_db_seconds", "Time one request spent in SQL statements.", ["route"]
+)
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def init_app(app):
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = query_metrics.begin()
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        # Without an after_request call the request failed before producing a response
+        status = g.pop("metrics_status", 500)
+        route = _route()
+        request_duration.labels(request.method, route, status).observe(time.perf_counter() - start)
+        queries = query_metrics.end(g.pop("metrics_queries"))
+        request_queries.labels(route).observe(queries.count)
+        request_query_time.labels(route).observe(queries.seconds)
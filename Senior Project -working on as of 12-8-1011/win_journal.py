@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger("chatbot.journal")
+
+# Journal settings
+WIN_JOURNAL_PATH = os.getenv("WIN_JOURNAL_PATH", "wins.journal")
+WIN_FLUSH_INTERVAL = float(os.getenv("WIN_FLUSH_INTERVAL", "2.0"))  # Seconds between DB flushes
+WIN_FLUSH_BATCH = int(os.getenv("WIN_FLUSH_BATCH", "200"))  # Flush early once this many wins are waiting
+
+
+class WinJournal:
+    """
+    Write-behind persistence for giveaway wins.
+
+    `record` appends the win to an append-only local file and fsyncs it, so
+    the win survives a crash as soon as `record` returns. The database is
+    updated later by `flush`, which applies every waiting win in one
+    transaction and then compacts the file down to whatever arrived since.
+    On start, anything left in the file by a crashed process is replayed.
+
+    File I/O runs on its own thread, never on the event loop. One process
+    should own a journal file at a time.
+    """
+
+    def __init__(self, db, path=WIN_JOURNAL_PATH, interval=WIN_FLUSH_INTERVAL, batch_size=WIN_FLUSH_BATCH):
+        self.db = db
+        self.path = path
+        self.interval = interval
+        self.batch_size = batch_size
+        self._pending = []
+        self._seq = 0
+        self._file = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="win-journal")
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        self._wake = None
+        self.flushed = 0  # Wins written to the database so far
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    async def _io_call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io, func, *args)
+
+    async def start(self):
+        """Replay any wins left over from a previous run and start the periodic flusher."""
+        if self._flush_task:
+            return
+        self._wake = asyncio.Event()
+        leftover = await self._io_call(self._read)
+        if leftover:
+            log.warning("Replaying %d journaled wins from %s", len(leftover), self.path)
+            self._seq = max(entry["seq"] for entry in leftover)
+            self._pending.extend(leftover)
+            await self.flush()
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def record(self, item_id, giveaway_id, winner_name):
+        """Durably journal a win. The database catches up on the next flush."""
+        if not self._flush_task:
+            await self.start()
+        self._seq += 1
+        entry = {
+            "seq": self._seq,
+            "item_id": item_id,
+            "giveaway_id": giveaway_id,
+            "winner": winner_name,
+            "ts": time.time(),
+        }
+        await self._io_call(self._append, entry)
+        self._pending.append(entry)
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+        return entry
+
+    async def flush(self):
+        """Write every waiting win to the database in one transaction."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            try:
+                await self.db.apply_wins(batch)
+            except Exception:
+                # Keep them for the next attempt; they are still in the journal file
+                self._pending = batch + self._pending
+                raise
+            self.flushed += len(batch)
+            # Keep every line newer than the batch, including wins whose append finished while
+            # the transaction ran but which `record` has not added to the pending list yet
+            await self._io_call(self._compact, max(entry["seq"] for entry in batch))
+            log.info("Flushed %d wins to the database", len(batch))
+            return len(batch)
+
+    async def _flush_periodically(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Error flushing win journal, will retry: %s", e)
+
+    async def close(self):
+        """Stop the periodic flusher and flush what is left."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        await self._io_call(self._close_file)
+
+    # The methods below run on the journal thread
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _append(self, entry):
+        journal = self._open()
+        journal.write(json.dumps(entry) + "\n")
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    def _read(self):
+        entries = []
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A crash mid-write leaves a partial last line; it was never acknowledged
+                    log.warning("Skipping unreadable journal line: %r", line)
+        return entries
+
+    def _compact(self, applied_seq):
+        remaining = [entry for entry in self._read() if entry["seq"] > applied_seq]
+        self._close_file()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as journal:
+            for entry in remaining:
+                journal.write(json.dumps(entry) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temp_path, self.path)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None